@@ -3,12 +3,15 @@
 """
 import asyncio
 import logging
-from typing import List, Dict, Any, Callable, Optional
+from typing import List, Dict, Any, Callable, Optional, Iterator
 from dataclasses import dataclass
 import time
+import threading
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 from task_manager import task_manager
 from security import SecurityValidator
+from config import AppConfig
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +27,7 @@ class BatchRequest:
     openai_model: str = "gpt-4o"
     batch_id: str = ""
 
-@dataclass
+@dataclass(slots=True)
 class BatchStatus:
     """批量狀態數據類"""
     batch_id: str
@@ -60,91 +63,95 @@ class BatchProcessor:
     """批量處理器"""
     
     def __init__(self):
-        self.batches: Dict[str, BatchStatus] = {}
+        # 按最近使用順序排列，超過 MAX_BATCHES 時淘汰最久未使用的已完成記錄
+        self.batches: "OrderedDict[str, BatchStatus]" = OrderedDict()
         self.executor = ThreadPoolExecutor(max_workers=2)  # 限制批量處理並發數
+        # 保護 batches 與計數：子任務結束的回調在背景線程執行
+        self.lock = threading.Lock()
+        # 子任務結束時增量更新計數，查詢狀態時無需掃描所有子任務
+        task_manager.add_terminal_listener(self._on_task_finished)
     
     def create_batch(self, batch_request: BatchRequest) -> BatchStatus:
         """創建批量處理任務"""
-        # 驗證 URLs
-        valid_urls = []
+        batch_id = SecurityValidator.generate_task_id()
+        
+        # 驗證 URLs 並同時組裝任務參數
+        specs = []
         for url in batch_request.urls:
             validation = SecurityValidator.validate_youtube_url(url)
-            if validation["valid"]:
-                valid_urls.append(validation["normalized_url"])
-            else:
+            if not validation["valid"]:
                 logger.warning(f"跳過無效 URL: {url} - {validation['error']}")
-        
-        if not valid_urls:
+                continue
+            specs.append({
+                "task_id": SecurityValidator.generate_task_id(),
+                "url": validation["normalized_url"],
+                "keep_audio": batch_request.keep_audio,
+                "openai_api_key": batch_request.openai_api_key,
+                "google_api_key": batch_request.google_api_key,
+                "model_type": batch_request.model_type,
+                "gemini_model": batch_request.gemini_model,
+                "openai_model": batch_request.openai_model,
+                "batch_id": batch_id
+            })
+        
+        if not specs:
             raise ValueError("沒有有效的 YouTube URL")
         
-        # 生成批量 ID
-        batch_id = SecurityValidator.generate_task_id()
-        
         # 創建批量狀態
         batch_status = BatchStatus(
             batch_id=batch_id,
-            total_tasks=len(valid_urls)
+            total_tasks=len(specs),
+            task_ids=[spec["task_id"] for spec in specs]
         )
         
-        # 為每個 URL 創建任務
-        for url in valid_urls:
-            task_id = SecurityValidator.generate_task_id()
-            task = task_manager.create_task(
-                task_id=task_id,
-                url=url,
-                keep_audio=batch_request.keep_audio,
-                openai_api_key=batch_request.openai_api_key,
-                google_api_key=batch_request.google_api_key,
-                model_type=batch_request.model_type,
-                gemini_model=batch_request.gemini_model,
-                openai_model=batch_request.openai_model
-            )
-            batch_status.task_ids.append(task_id)
+        # 一次性創建所有任務
+        task_manager.create_tasks_bulk(specs)
         
-        self.batches[batch_id] = batch_status
-        logger.info(f"創建批量處理任務: {batch_id}，包含 {len(valid_urls)} 個任務")
+        with self.lock:
+            self.batches[batch_id] = batch_status
+            self._evict_batches()
+        logger.info(f"創建批量處理任務: {batch_id}，包含 {len(specs)} 個任務")
         
         return batch_status
     
     def get_batch_status(self, batch_id: str) -> Optional[BatchStatus]:
         """獲取批量狀態"""
-        if batch_id not in self.batches:
-            return None
-        
-        batch_status = self.batches[batch_id]
-        
-        # 更新統計
-        completed = 0
-        failed = 0
-        cancelled = 0
-        
-        for task_id in batch_status.task_ids:
-            task = task_manager.get_task(task_id)
-            if task:
-                if task.status == "complete":
-                    completed += 1
-                elif task.status == "error":
-                    failed += 1
-                elif task.status == "cancelled":
-                    cancelled += 1
-        
-        batch_status.completed_tasks = completed
-        batch_status.failed_tasks = failed
-        batch_status.cancelled_tasks = cancelled
-        batch_status.updated_at = time.time()
-        
-        return batch_status
+        with self.lock:
+            batch_status = self.batches.get(batch_id)
+            if batch_status is not None:
+                self.batches.move_to_end(batch_id)
+            return batch_status
+    
+    def _on_task_finished(self, task):
+        """子任務進入終止狀態時更新所屬批量的計數"""
+        if not task.batch_id:
+            return
+        
+        with self.lock:
+            batch_status = self.batches.get(task.batch_id)
+            if batch_status is None:
+                return
+            if task.status == "complete":
+                batch_status.completed_tasks += 1
+            elif task.status == "error":
+                batch_status.failed_tasks += 1
+            elif task.status == "cancelled":
+                batch_status.cancelled_tasks += 1
+            batch_status.updated_at = time.time()
     
     def cancel_batch(self, batch_id: str) -> bool:
         """取消批量處理"""
-        if batch_id not in self.batches:
+        with self.lock:
+            batch_status = self.batches.get(batch_id)
+        if batch_status is None:
             return False
         
-        batch_status = self.batches[batch_id]
         cancelled_count = 0
         
-        for task_id in batch_status.task_ids:
-            if task_manager.cancel_task(task_id):
+        # 先批量取得狀態，只對仍在執行的任務發出取消
+        tasks = task_manager.get_tasks(batch_status.task_ids)
+        for task_id, task in zip(batch_status.task_ids, tasks):
+            if task and task.status in ["pending", "processing"] and task_manager.cancel_task(task_id):
                 cancelled_count += 1
         
         logger.info(f"批量取消任務: {batch_id}，已取消 {cancelled_count} 個任務")
@@ -152,28 +159,49 @@ class BatchProcessor:
     
     def get_batch_results(self, batch_id: str) -> List[Dict[str, Any]]:
         """獲取批量處理結果"""
-        if batch_id not in self.batches:
-            return []
-        
-        batch_status = self.batches[batch_id]
-        results = []
-        
-        for task_id in batch_status.task_ids:
-            task = task_manager.get_task(task_id)
+        return list(self.iter_batch_results(batch_id))
+    
+    def iter_batch_results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        """逐一產生批量中各任務的結果，供串流回應使用"""
+        with self.lock:
+            batch_status = self.batches.get(batch_id)
+        if batch_status is None:
+            return
+        
+        tasks = task_manager.get_tasks(batch_status.task_ids)
+        for task_id, task in zip(batch_status.task_ids, tasks):
             if task:
-                result_data = {
+                yield {
                     "task_id": task_id,
                     "url": task.url,
                     "status": task.status,
                     "result": task.result,
                     "error": task.error
                 }
-                results.append(result_data)
-        
-        return results
+    
+    def _evict_batches(self):
+        """清理過期記錄，並在超過容量時淘汰最久未使用的已完成批量記錄（需持有鎖）
+        
+        仍有子任務在執行的批量不會被淘汰，全部都在執行時暫時超過上限
+        """
+        self._remove_expired(AppConfig.MAX_TASK_AGE)
+        while len(self.batches) > AppConfig.MAX_BATCHES:
+            victim = next(
+                (batch_id for batch_id, batch_status in self.batches.items() if batch_status.is_complete),
+                None
+            )
+            if victim is None:
+                break  # 其餘都是執行中的批量，不淘汰
+            del self.batches[victim]
+            logger.info(f"批量記錄數量超過上限，已淘汰: {victim}")
     
     def cleanup_old_batches(self, max_age: int = 86400):
         """清理舊的批量處理記錄"""
+        with self.lock:
+            self._remove_expired(max_age)
+    
+    def _remove_expired(self, max_age: int):
+        """移除超過 max_age 的批量記錄（需持有鎖）"""
         current_time = time.time()
         expired_batches = []
         
@@ -187,6 +215,8 @@ class BatchProcessor:
     
     def get_all_batches(self) -> List[Dict[str, Any]]:
         """獲取所有批量處理狀態"""
+        with self.lock:
+            batches = list(self.batches.items())
         return [
             {
                 "batch_id": batch_id,
@@ -199,7 +229,7 @@ class BatchProcessor:
                 "created_at": status.created_at,
                 "updated_at": status.updated_at
             }
-            for batch_id, status in self.batches.items()
+            for batch_id, status in batches
         ]
 
 # 全局批量處理器實例
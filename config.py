@@ -11,18 +11,47 @@ class AppConfig:
     HOST = "0.0.0.0"
     PORT = 8000
     DEBUG = os.getenv("DEBUG", "False").lower() == "true"
+    ENV = os.getenv("ENV", "dev").lower()  # dev 或 prod
+    IS_PRODUCTION = ENV in ("prod", "production")
+    # 多 worker 需搭配 REDIS_URL；生產環境且已設定 REDIS_URL 時預設為 2 * CPU + 1
+    WORKERS = int(
+        os.getenv("UVICORN_WORKERS")
+        or os.getenv("WEB_CONCURRENCY")
+        or (2 * (os.cpu_count() or 1) + 1 if IS_PRODUCTION and os.getenv("REDIS_URL") else 1)
+    )
     
     # 任務配置
     MAX_CONCURRENT_TASKS = int(os.getenv("MAX_CONCURRENT_TASKS", "3"))
+    MAX_QUEUED_TASKS = int(os.getenv("MAX_QUEUED_TASKS", "50"))  # 等待中與處理中任務的總數上限，超過時拒絕新請求
+    MAX_EXECUTION_TIME = int(os.getenv("MAX_EXECUTION_TIME", "1800"))  # 單一任務處理時間上限（秒），0 表示不限制
+    CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 1)))  # CPU 密集工作（DOCX 轉換）的進程數
+    DOCX_PROCESS_MIN_CHARS = int(os.getenv("DOCX_PROCESS_MIN_CHARS", "50000"))  # 摘要達到此長度才交給進程池轉換，較短的在線程中轉換
+    CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "5"))  # 連續失敗幾個任務後暫停處理
+    CIRCUIT_BREAKER_TIMEOUT = float(os.getenv("CIRCUIT_BREAKER_TIMEOUT", "60"))  # 暫停多少秒後再嘗試
     TASK_CLEANUP_INTERVAL = int(os.getenv("TASK_CLEANUP_INTERVAL", "3600"))  # 1小時
+    TASK_SAVE_INTERVAL = float(os.getenv("TASK_SAVE_INTERVAL", "0.5"))  # 任務檔案合併寫入的間隔（秒）
     MAX_TASK_AGE = int(os.getenv("MAX_TASK_AGE", "86400"))  # 24小時
+    MAX_TASKS = int(os.getenv("MAX_TASKS", "1000"))  # 記憶體中保留的最大任務數
+    MAX_BATCHES = int(os.getenv("MAX_BATCHES", "200"))  # 記憶體中保留的最大批量數
+    MAX_TASK_CACHE_BYTES = int(os.getenv("MAX_TASK_CACHE_BYTES", str(256 * 1024 * 1024)))  # 任務結果佔用的記憶體上限
+    
+    # 共享任務存儲配置（設定後多個 worker 可共享任務狀態）
+    REDIS_URL = os.getenv("REDIS_URL", "")
+    TASK_RECORD_TTL = int(os.getenv("TASK_RECORD_TTL", str(MAX_TASK_AGE)))
+    REMOTE_CANCEL_CHECK_INTERVAL = float(os.getenv("REMOTE_CANCEL_CHECK_INTERVAL", "2"))  # 向共享存儲查詢其他 worker 取消的間隔（秒）
+    REMOTE_TASK_CACHE_TTL = float(os.getenv("REMOTE_TASK_CACHE_TTL", "1"))  # 其他 worker 的任務記錄在本地重用的秒數
     
     # 檔案配置
     UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
     COOKIES_DIR = os.path.join(os.path.dirname(__file__), "cookies")
     TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+    CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache", "summaries"))
+    SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", "86400"))  # 摘要快取保留 24 小時，設為 0 停用
     MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB
     
+    # CORS 允許的來源，以逗號分隔；未設定時允許所有來源
+    CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "*").split(",") if origin.strip()]
+    
     # API 配置
     OPENAI_API_KEY_MIN_LENGTH = 20
     GOOGLE_API_KEY_MIN_LENGTH = 20
@@ -38,5 +67,5 @@ class AppConfig:
     @classmethod
     def ensure_directories(cls):
         """確保必要的目錄存在"""
-        for directory in [cls.UPLOAD_DIR, cls.COOKIES_DIR, cls.TEMPLATES_DIR]:
+        for directory in [cls.UPLOAD_DIR, cls.COOKIES_DIR, cls.TEMPLATES_DIR, cls.CACHE_DIR]:
             os.makedirs(directory, exist_ok=True)
\ No newline at end of file
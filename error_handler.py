@@ -1,13 +1,24 @@
 """
 錯誤處理和重試機制模塊
 """
+import re
 import time
+import random
+import asyncio
 import logging
+import threading
 import traceback
-from typing import Callable, Any, Optional, Dict, List
+from typing import Callable, Any, Optional, Dict, List, Tuple
 from functools import wraps
 from enum import Enum
 
+try:
+    import psutil  # 可選依賴（不在 requirements.txt 中），未安裝時 get_system_info 只返回錯誤訊息
+    # 預熱 CPU 使用率計數：之後以 interval=None 取得自上次調用以來的使用率，不必阻塞取樣
+    psutil.cpu_percent(interval=None)
+except ImportError:
+    psutil = None
+
 logger = logging.getLogger(__name__)
 
 class ErrorType(Enum):
@@ -20,14 +31,32 @@ class ErrorType(Enum):
     SYSTEM_ERROR = "system_error"
     UNKNOWN_ERROR = "unknown_error"
 
+def _compile_keyword_pattern(error_keywords: Dict["ErrorType", List[str]]) -> "re.Pattern":
+    """將所有錯誤關鍵字編譯為單一正則，每個錯誤類型對應一個命名群組
+    
+    使用零寬前瞻，使重疊的關鍵字在每個位置都能被檢查到
+    """
+    groups = "|".join(
+        f"(?P<{error_type.name}>" + "|".join(re.escape(keyword) for keyword in keywords) + ")"
+        for error_type, keywords in error_keywords.items()
+    )
+    return re.compile(f"(?=(?:{groups}))", re.IGNORECASE)
+
 class RetryConfig:
     """重試配置"""
     def __init__(self, max_attempts: int = 3, delay: float = 1.0, 
-                 backoff_factor: float = 2.0, max_delay: float = 60.0):
+                 backoff_factor: float = 2.0, max_delay: float = 60.0,
+                 jitter: float = 0.0):
         self.max_attempts = max_attempts
         self.delay = delay
         self.backoff_factor = backoff_factor
         self.max_delay = max_delay
+        # 在每次等待上隨機增加至多 jitter 倍的延遲，避免多個任務同時重試
+        self.jitter = jitter
+    
+    def wait_time(self, delay: float) -> float:
+        """計算本次重試前實際等待的秒數"""
+        return delay + random.uniform(0, self.jitter * delay) if self.jitter > 0 else delay
 
 class ErrorHandler:
     """錯誤處理器"""
@@ -64,16 +93,23 @@ class ErrorHandler:
         ]
     }
     
+    # 單次掃描即可找出所有關鍵字；類型優先順序與 ERROR_KEYWORDS 的順序一致
+    _KEYWORD_PATTERN = _compile_keyword_pattern(ERROR_KEYWORDS)
+    _KEYWORD_PRIORITY = {error_type: index for index, error_type in enumerate(ERROR_KEYWORDS)}
+    
     @classmethod
     def classify_error(cls, error: Exception) -> ErrorType:
         """分類錯誤類型"""
-        error_message = str(error).lower()
+        best_type = None
         
-        for error_type, keywords in cls.ERROR_KEYWORDS.items():
-            if any(keyword in error_message for keyword in keywords):
-                return error_type
+        for match in cls._KEYWORD_PATTERN.finditer(str(error)):
+            error_type = ErrorType[match.lastgroup]
+            if best_type is None or cls._KEYWORD_PRIORITY[error_type] < cls._KEYWORD_PRIORITY[best_type]:
+                best_type = error_type
+                if cls._KEYWORD_PRIORITY[best_type] == 0:
+                    break
         
-        return ErrorType.UNKNOWN_ERROR
+        return best_type or ErrorType.UNKNOWN_ERROR
     
     @classmethod
     def is_retryable(cls, error: Exception) -> bool:
@@ -122,37 +158,53 @@ def retry_on_error(config: RetryConfig = None,
     if error_types is None:
         error_types = list(ErrorHandler.RETRYABLE_ERRORS)
     
+    def should_retry(func: Callable, error: Exception, attempt: int) -> bool:
+        """記錄錯誤並判斷是否繼續重試"""
+        ErrorHandler.log_error(error, {
+            "function": func.__name__,
+            "attempt": attempt + 1,
+            "max_attempts": config.max_attempts
+        })
+        error_type = ErrorHandler.classify_error(error)
+        return error_type in error_types and attempt < config.max_attempts - 1
+    
     def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            # 協程版本：以 asyncio.sleep 等待，不佔用事件循環或工作線程
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                delay = config.delay
+                
+                for attempt in range(config.max_attempts):
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        if not should_retry(func, e, attempt):
+                            raise e
+                    
+                    wait = config.wait_time(delay)
+                    logger.info(f"第 {attempt + 1} 次嘗試失敗，{wait:.1f} 秒後重試...")
+                    await asyncio.sleep(wait)
+                    delay = min(delay * config.backoff_factor, config.max_delay)
+            
+            return async_wrapper
+        
+        # 同步版本只應在工作線程中執行（例如 run_in_executor），sleep 只阻塞該線程
         @wraps(func)
         def wrapper(*args, **kwargs):
-            last_error = None
             delay = config.delay
             
             for attempt in range(config.max_attempts):
                 try:
                     return func(*args, **kwargs)
-                
                 except Exception as e:
-                    last_error = e
-                    error_type = ErrorHandler.classify_error(e)
-                    
-                    # 記錄錯誤
-                    ErrorHandler.log_error(e, {
-                        "function": func.__name__,
-                        "attempt": attempt + 1,
-                        "max_attempts": config.max_attempts
-                    })
-                    
-                    # 檢查是否可重試
-                    if error_type not in error_types or attempt == config.max_attempts - 1:
+                    if not should_retry(func, e, attempt):
                         raise e
-                    
-                    # 等待後重試
-                    logger.info(f"第 {attempt + 1} 次嘗試失敗，{delay:.1f} 秒後重試...")
-                    time.sleep(delay)
-                    delay = min(delay * config.backoff_factor, config.max_delay)
-            
-            raise last_error
+                
+                wait = config.wait_time(delay)
+                logger.info(f"第 {attempt + 1} 次嘗試失敗，{wait:.1f} 秒後重試...")
+                time.sleep(wait)
+                delay = min(delay * config.backoff_factor, config.max_delay)
         
         return wrapper
     return decorator
@@ -167,15 +219,20 @@ class GracefulDegradation:
             return "無法生成摘要：內容為空"
         
         # 簡單的文本摘要：取前幾個句子
-        sentences = text.split('。')
+        # 逐句向後查找，達到長度上限即停止，不需切分整份逐字稿
         summary_sentences = []
         current_length = 0
+        start = 0
         
-        for sentence in sentences:
-            if current_length + len(sentence) > max_length:
+        while start <= len(text):
+            end = text.find('。', start)
+            if end == -1:
+                end = len(text)
+            if current_length + (end - start) > max_length:
                 break
-            summary_sentences.append(sentence.strip())
-            current_length += len(sentence)
+            summary_sentences.append(text[start:end].strip())
+            current_length += end - start
+            start = end + 1
         
         if not summary_sentences:
             # 如果沒有句子，則截取前 max_length 個字符
@@ -194,59 +251,126 @@ class GracefulDegradation:
     
     @staticmethod
     def get_system_info() -> Dict[str, Any]:
-        """獲取系統信息以協助故障排除"""
+        """獲取系統信息以協助故障排除（短時間內重複調用直接返回快取）"""
+        global _sysinfo_cache
+        
+        cached_at, cached_info = _sysinfo_cache
+        if cached_info is not None and time.monotonic() - cached_at < _SYSINFO_TTL:
+            return cached_info
+        
+        if psutil is None:
+            return {"error": "無法獲取系統信息（未安裝 psutil）"}
+        
         import platform
-        import psutil
         import sys
         
         try:
-            return {
+            info = {
                 "platform": platform.platform(),
                 "python_version": sys.version,
-                "cpu_percent": psutil.cpu_percent(),
+                "cpu_percent": psutil.cpu_percent(interval=None),
                 "memory_percent": psutil.virtual_memory().percent,
                 "disk_usage": psutil.disk_usage('/').percent
             }
         except Exception as e:
             logger.error(f"獲取系統信息失敗: {e}")
             return {"error": "無法獲取系統信息"}
+        
+        _sysinfo_cache = (time.monotonic(), info)
+        return info
+
+# 系統信息快取：(取得時間, 內容)，錯誤集中爆發時避免重複讀取 /proc
+_SYSINFO_TTL = 5.0
+_sysinfo_cache: Tuple[float, Optional[Dict[str, Any]]] = (0.0, None)
+
+class CircuitOpenError(Exception):
+    """斷路器開啟期間拒絕調用"""
+    
+    def __init__(self, message: str = "服務暫時不可用，請稍後再試"):
+        super().__init__(message)
 
 class CircuitBreaker:
     """斷路器模式實現"""
     
     def __init__(self, failure_threshold: int = 5, 
-                 recovery_timeout: float = 60.0):
+                 recovery_timeout: float = 60.0,
+                 is_failure: Optional[Callable[[Exception], bool]] = None):
         self.failure_threshold = failure_threshold
         self.recovery_timeout = recovery_timeout
+        # 判斷異常是否計入失敗次數；未指定時所有異常都計入
+        self.is_failure = is_failure
         self.failure_count = 0
         self.last_failure_time = 0
         self.state = "CLOSED"  # CLOSED, OPEN, HALF_OPEN
+        # 只保護狀態轉換，被調用的函數在鎖外執行
+        self._lock = threading.Lock()
     
-    def call(self, func: Callable, *args, **kwargs):
-        """通過斷路器調用函數"""
-        if self.state == "OPEN":
-            if time.time() - self.last_failure_time > self.recovery_timeout:
-                self.state = "HALF_OPEN"
-                logger.info("斷路器進入半開狀態")
-            else:
-                raise Exception("服務暫時不可用，請稍後再試")
+    def _before_call(self):
+        """開啟期間拒絕調用，超過恢復時間後進入半開狀態"""
+        with self._lock:
+            if self.state == "OPEN":
+                if time.time() - self.last_failure_time > self.recovery_timeout:
+                    self.state = "HALF_OPEN"
+                    logger.info("斷路器進入半開狀態")
+                else:
+                    raise CircuitOpenError()
+    
+    def _on_failure(self, error: Exception):
+        """記錄失敗，連續失敗達到閾值時開啟"""
+        if self.is_failure is not None and not self.is_failure(error):
+            return
         
-        try:
-            result = func(*args, **kwargs)
-            
-            if self.state == "HALF_OPEN":
-                self.state = "CLOSED"
-                self.failure_count = 0
-                logger.info("斷路器恢復為關閉狀態")
-            
-            return result
-            
-        except Exception as e:
+        with self._lock:
             self.failure_count += 1
             self.last_failure_time = time.time()
             
             if self.failure_count >= self.failure_threshold:
                 self.state = "OPEN"
                 logger.warning(f"斷路器開啟，失敗次數: {self.failure_count}")
-            
-            raise e
\ No newline at end of file
+    
+    def _on_success(self):
+        """只累計連續失敗，任何一次成功都會重置計數"""
+        with self._lock:
+            if self.state == "HALF_OPEN":
+                self.state = "CLOSED"
+                logger.info("斷路器恢復為關閉狀態")
+            self.failure_count = 0
+    
+    def call(self, func: Callable, *args, **kwargs):
+        """通過斷路器調用函數"""
+        self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._on_failure(e)
+            raise e
+        
+        self._on_success()
+        return result
+    
+    async def call_async(self, func: Callable, *args, **kwargs):
+        """通過斷路器調用協程函數"""
+        self._before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            self._on_failure(e)
+            raise e
+        
+        self._on_success()
+        return result
+
+# 每個下游服務各自一個斷路器，避免互不相關的服務共用同一把鎖
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(name: str, failure_threshold: int = 5,
+                        recovery_timeout: float = 60.0,
+                        is_failure: Optional[Callable[[Exception], bool]] = None) -> CircuitBreaker:
+    """獲取指定服務的斷路器，不存在時建立"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(failure_threshold, recovery_timeout, is_failure)
+            _breakers[name] = breaker
+        return breaker
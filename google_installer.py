@@ -4,53 +4,73 @@
 """
 import sys
 import subprocess
-import time
+import importlib
+import importlib.util
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("google_installer")
 
+# 與 requirements.txt 相同的版本要求，避免安裝時降級應用需要的 SDK
+GENAI_PACKAGE = "google-generativeai>=0.4.0"
+
+# (模組名稱, pip 套件)，按安裝順序排列
+REQUIRED_PACKAGES = [
+    ("google.protobuf", "protobuf"),
+    ("google.rpc", "googleapis-common-protos"),
+    ("google.api_core", "google-api-core"),
+    ("googleapiclient", "google-api-python-client"),
+    ("google.auth", "google-auth"),
+    ("google_auth_httplib2", "google-auth-httplib2"),
+    ("google.generativeai", GENAI_PACKAGE),
+]
+
+def _is_installed(module_name: str) -> bool:
+    """檢查模組是否可被導入（不實際導入）"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        # 父套件（例如 google 命名空間）不存在
+        return False
+
 def ensure_google_package():
     """確保 google-generativeai 包已安裝"""
     try:
         import google.generativeai
-        logger.info(f"成功載入 google.generativeai, 位置: {google.generativeai.__file__}")
+        logger.info("成功載入 google.generativeai, 位置: %s", google.generativeai.__file__)
         return True
     except ImportError:
         logger.warning("無法導入 google.generativeai，嘗試安裝...")
         
-        packages = [
-            "protobuf",
-            "googleapis-common-protos",
-            "google-api-core",
-            "google-api-python-client",
-            "google-auth",
-            "google-auth-httplib2",
-            "google-generativeai==0.3.1"
-        ]
+        # 只安裝缺少的套件，並以單次 pip 調用完成，讓 pip 只解析一次依賴
+        missing = [package for module_name, package in REQUIRED_PACKAGES if not _is_installed(module_name)]
+        if not missing:
+            missing = [GENAI_PACKAGE]
         
-        for package in packages:
-            logger.info(f"安裝 {package}...")
-            try:
-                subprocess.run(
-                    [sys.executable, "-m", "pip", "install", "--no-cache-dir", package],
-                    check=True,
-                    capture_output=True
-                )
-                logger.info(f"{package} 安裝成功")
-                time.sleep(1)  # 簡單延遲，確保安裝完成
-            except subprocess.CalledProcessError as e:
-                logger.error(f"安裝 {package} 失敗: {e}")
-                logger.error(f"錯誤輸出: {e.stderr.decode('utf-8') if e.stderr else 'None'}")
-                return False
+        package_list = " ".join(missing)
+        logger.info("安裝 %s...", package_list)
+        try:
+            result = subprocess.run(
+                [sys.executable, "-m", "pip", "install", "--no-cache-dir", *missing],
+                check=True,
+                capture_output=True,
+                text=True
+            )
+            logger.info("安裝成功")
+            logger.debug("pip 輸出: %s", result.stdout)
+        except subprocess.CalledProcessError as e:
+            logger.error("安裝 %s 失敗: %s", package_list, e)
+            logger.error("錯誤輸出: %s", e.stderr or "None")
+            return False
         
         # 再次嘗試導入
+        importlib.invalidate_caches()
         try:
             import google.generativeai
-            logger.info(f"現在成功載入 google.generativeai, 位置: {google.generativeai.__file__}")
+            logger.info("現在成功載入 google.generativeai, 位置: %s", google.generativeai.__file__)
             return True
         except ImportError as e:
-            logger.error(f"安裝後仍無法導入 google.generativeai: {e}")
+            logger.error("安裝後仍無法導入 google.generativeai: %s", e)
             return False
 
 if __name__ == "__main__":
@@ -58,4 +78,4 @@ if __name__ == "__main__":
         print("Google 包安裝/檢查成功")
     else:
         print("Google 包安裝/檢查失敗")
-        sys.exit(1) 
\ No newline at end of file
+        sys.exit(1)
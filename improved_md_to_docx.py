@@ -5,28 +5,115 @@ Improved Markdown to DOCX Converter using markdown-it-py
 基於 markdown-it-py 的改進版 Markdown 轉 DOCX 轉換器
 """
 
+import functools
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 from io import BytesIO
 from docx import Document
 from docx.shared import Inches, Pt
 from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
 from markdown_it import MarkdownIt
 from markdown_it.token import Token
 
 logger = logging.getLogger(__name__)
 
+# 標題標籤 -> 標題層級
+_H_LEVEL = {f'h{level}': level for level in range(1, 7)}
+
+# 標題層級 -> 段落樣式名稱
+_HEADING_STYLES = {level: f"Heading {level}" for level in range(1, 7)}
+
+# 內聯格式位元
+FORMAT_BOLD = 1
+FORMAT_ITALIC = 2
+FORMAT_CODE = 4
+FORMAT_STRIKE = 8
+
+# 開啟/關閉格式的內聯 token 與對應格式位元
+_FORMAT_OPEN_TOKENS = {
+    'strong_open': FORMAT_BOLD,
+    'em_open': FORMAT_ITALIC,
+    's_open': FORMAT_STRIKE,
+}
+_FORMAT_CLOSE_TOKENS = {
+    'strong_close': FORMAT_BOLD,
+    'em_close': FORMAT_ITALIC,
+    's_close': FORMAT_STRIKE,
+}
+
+
+def _set_code_font(run: Run) -> None:
+    run.font.name = 'Consolas'
+    run.font.size = Pt(10)
+
+# 各格式位元對應的 run 設置
+_FORMAT_SETTERS = (
+    (FORMAT_BOLD, lambda run: setattr(run, 'bold', True)),
+    (FORMAT_ITALIC, lambda run: setattr(run, 'italic', True)),
+    (FORMAT_STRIKE, lambda run: setattr(run.font, 'strike', True)),
+    (FORMAT_CODE, _set_code_font),
+)
+
+
+def _build_run_configurator(mask: int) -> Callable[[Run], None]:
+    """為指定格式組合建立只包含所需設置的 run 配置函數"""
+    setters = tuple(setter for bit, setter in _FORMAT_SETTERS if mask & bit)
+    
+    def configure(run: Run) -> None:
+        for setter in setters:
+            setter(run)
+    
+    return configure
+
+# 以格式位元遮罩索引的 run 配置函數表（0..15）
+_CONFIGURE_RUN = [_build_run_configurator(mask) for mask in range(16)]
+
 
 class ImprovedMarkdownToDocxConverter:
     """改進的 Markdown 轉 DOCX 轉換器"""
     
-    def __init__(self):
+    # 解析器不保存解析狀態，所有轉換器實例共用同一個，避免重複編譯規則表
+    _MD = MarkdownIt()
+    
+    # 水平線文字
+    _HR = "━" * 50
+    
+    def __init__(self) -> None:
         self.doc = Document()
-        self.md = MarkdownIt()
         self.setup_styles()
+        
+        # 樣式是否存在對整份文件都相同，只檢查一次
+        style_names = {style.name for style in self.doc.styles}
+        self._has_list_bullet = 'List Bullet' in style_names
+        self._has_list_number = 'List Number' in style_names
+        self._has_quote = 'Quote' in style_names
+        self._has_code_block = 'CodeBlock' in style_names
+        self._normal_style = self.doc.styles['Normal']
+        
+        # 直接在 oxml 層新增段落，並快取樣式名稱 -> 樣式 ID，
+        # 避免每個段落都經過 python-docx 的樣式名稱解析
+        self._body = self.doc.element.body
+        self._style_ids: Dict[str, Optional[str]] = {}
+        
+        # 開啟 token 索引 -> 對應關閉 token 索引，每次處理 token 列表時重建
+        self._close_idx: Dict[int, int] = {}
+        
+        # 區塊 token 分派表：token.type -> 處理函數，返回下一個 token 的索引
+        self._block_handlers: Dict[str, Callable[[List[Token], int], int]] = {
+            'heading_open': self._process_heading,
+            'paragraph_open': self._process_paragraph,
+            'bullet_list_open': lambda tokens, i: self._process_list(tokens, i, ordered=False),
+            'ordered_list_open': lambda tokens, i: self._process_list(tokens, i, ordered=True),
+            'blockquote_open': self._process_blockquote,
+            'fence': self._process_code_block_at,
+            'code_block': self._process_code_block_at,
+            'hr': self._process_hr_at,
+        }
     
-    def setup_styles(self):
+    def setup_styles(self) -> None:
         """設置 Word 文檔樣式"""
         try:
             # 設置正文樣式
@@ -35,8 +122,8 @@ class ImprovedMarkdownToDocxConverter:
             normal_font.name = '微軟正黑體'
             normal_font.size = Pt(11)
             
-            # 創建代碼塊樣式
-            try:
+            # 創建代碼塊樣式（樣式可能已存在）
+            if 'CodeBlock' not in self.doc.styles:
                 code_style = self.doc.styles.add_style('CodeBlock', WD_STYLE_TYPE.PARAGRAPH)
                 code_font = code_style.font
                 code_font.name = 'Consolas'
@@ -44,8 +131,6 @@ class ImprovedMarkdownToDocxConverter:
                 code_style.paragraph_format.left_indent = Inches(0.5)
                 code_style.paragraph_format.space_before = Pt(6)
                 code_style.paragraph_format.space_after = Pt(6)
-            except:
-                pass  # 樣式可能已存在
             
         except Exception as e:
             logger.warning(f"設置樣式時發生錯誤: {e}")
@@ -68,7 +153,7 @@ class ImprovedMarkdownToDocxConverter:
                 title_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
             
             # 使用 markdown-it-py 解析 Markdown
-            tokens = self.md.parse(markdown_content)
+            tokens = self._MD.parse(markdown_content)
             
             # 處理解析後的 tokens
             self._process_tokens(tokens)
@@ -84,40 +169,62 @@ class ImprovedMarkdownToDocxConverter:
             logger.error(f"轉換 Markdown 到 DOCX 時發生錯誤: {e}")
             raise
     
-    def _process_tokens(self, tokens: List[Token]):
+    def _process_tokens(self, tokens: List[Token]) -> None:
         """處理解析後的 tokens"""
+        handlers = self._block_handlers
+        token_count = len(tokens)
+        self._match_closing_tokens(tokens)
         i = 0
-        while i < len(tokens):
-            token = tokens[i]
-            
-            if token.type == 'heading_open':
-                i = self._process_heading(tokens, i)
-            elif token.type == 'paragraph_open':
-                i = self._process_paragraph(tokens, i)
-            elif token.type == 'bullet_list_open':
-                i = self._process_list(tokens, i, ordered=False)
-            elif token.type == 'ordered_list_open':
-                i = self._process_list(tokens, i, ordered=True)
-            elif token.type == 'blockquote_open':
-                i = self._process_blockquote(tokens, i)
-            elif token.type == 'fence' or token.type == 'code_block':
-                self._process_code_block(token)
-                i += 1
-            elif token.type == 'hr':
-                self._add_horizontal_line()
-                i += 1
-            else:
-                i += 1
+        while i < token_count:
+            handler = handlers.get(tokens[i].type)
+            i = handler(tokens, i) if handler else i + 1
+    
+    def _new_paragraph(self, style: Optional[str] = None, text: str = "") -> Paragraph:
+        """在文件末尾新增段落，等同 doc.add_paragraph 但樣式 ID 只解析一次"""
+        p = self._body.add_p()
+        if text:
+            p.add_r().text = text
+        if style is not None:
+            style_id = self._style_ids.get(style)
+            if style_id is None and style not in self._style_ids:
+                style_id = self.doc.part.get_style_id(style, WD_STYLE_TYPE.PARAGRAPH)
+                self._style_ids[style] = style_id
+            p.style = style_id
+        return Paragraph(p, self.doc)
+    
+    def _match_closing_tokens(self, tokens: List[Token]) -> None:
+        """單次掃描建立 開啟 token 索引 -> 對應關閉 token 索引 的對照表"""
+        self._close_idx = {}
+        open_stack: List[int] = []
+        for idx, token in enumerate(tokens):
+            if token.nesting == 1:
+                open_stack.append(idx)
+            elif token.nesting == -1 and open_stack:
+                self._close_idx[open_stack.pop()] = idx
+    
+    def _block_end(self, tokens: List[Token], start_idx: int) -> int:
+        """返回區塊對應關閉 token 的索引"""
+        return self._close_idx.get(start_idx, len(tokens))
+    
+    def _process_code_block_at(self, tokens: List[Token], idx: int) -> int:
+        """處理單個代碼塊 token"""
+        self._process_code_block(tokens[idx])
+        return idx + 1
+    
+    def _process_hr_at(self, tokens: List[Token], idx: int) -> int:
+        """處理單個水平線 token"""
+        self._add_horizontal_line()
+        return idx + 1
     
     def _process_heading(self, tokens: List[Token], start_idx: int) -> int:
         """處理標題"""
         open_token = tokens[start_idx]
-        level = int(open_token.tag[1])  # h1 -> 1, h2 -> 2, etc.
+        level = _H_LEVEL[open_token.tag]  # h1 -> 1, h2 -> 2, etc.
         
         # 找到標題內容
         content_idx = start_idx + 1
         if content_idx < len(tokens) and tokens[content_idx].type == 'inline':
-            heading = self.doc.add_heading(level=min(level, 6))
+            heading = self._new_paragraph(_HEADING_STYLES[level])
             self._process_inline_content(tokens[content_idx], heading)
         
         # 跳過 heading_close
@@ -128,7 +235,7 @@ class ImprovedMarkdownToDocxConverter:
         # 找到段落內容
         content_idx = start_idx + 1
         if content_idx < len(tokens) and tokens[content_idx].type == 'inline':
-            para = self.doc.add_paragraph()
+            para = self._new_paragraph()
             self._process_inline_content(tokens[content_idx], para)
         
         # 跳過 paragraph_close
@@ -136,223 +243,154 @@ class ImprovedMarkdownToDocxConverter:
     
     def _process_list(self, tokens: List[Token], start_idx: int, ordered: bool = False) -> int:
         """處理列表"""
+        end = self._block_end(tokens, start_idx)
         i = start_idx + 1
         
-        while i < len(tokens):
-            token = tokens[i]
-            
-            if token.type == 'list_item_open':
+        while i < end:
+            if tokens[i].type == 'list_item_open':
                 i = self._process_list_item(tokens, i, ordered)
-            elif token.type in ['bullet_list_close', 'ordered_list_close']:
-                return i + 1
             else:
                 i += 1
         
-        return i
+        return end + 1
     
     def _process_list_item(self, tokens: List[Token], start_idx: int, ordered: bool = False) -> int:
         """處理列表項"""
+        end = self._block_end(tokens, start_idx)
         i = start_idx + 1
         
-        # 找到列表項的段落內容
-        while i < len(tokens) and tokens[i].type != 'list_item_close':
+        # 找到列表項的段落內容（包括嵌套列表中的段落）
+        while i < end:
             if tokens[i].type == 'paragraph_open':
                 content_idx = i + 1
                 if content_idx < len(tokens) and tokens[content_idx].type == 'inline':
-                    style = 'List Number' if ordered else 'List Bullet'
-                    try:
-                        para = self.doc.add_paragraph(style=style)
-                        self._process_inline_content(tokens[content_idx], para)
-                    except:
+                    if ordered and self._has_list_number:
+                        para = self._new_paragraph('List Number')
+                    elif not ordered and self._has_list_bullet:
+                        para = self._new_paragraph('List Bullet')
+                    else:
                         # 如果樣式不存在，使用普通段落
-                        para = self.doc.add_paragraph()
-                        marker = "• " if not ordered else ""
-                        if marker:
-                            run = para.add_run(marker)
-                        self._process_inline_content(tokens[content_idx], para)
+                        para = self._new_paragraph()
+                        if not ordered:
+                            para.add_run("• ")
+                    self._process_inline_content(tokens[content_idx], para)
                 i += 3  # 跳過 paragraph_open, inline, paragraph_close
             else:
                 i += 1
         
-        return i + 1  # 跳過 list_item_close
+        return end + 1  # 跳過 list_item_close
     
     def _process_blockquote(self, tokens: List[Token], start_idx: int) -> int:
         """處理引用塊"""
+        end = self._block_end(tokens, start_idx)
         i = start_idx + 1
         
-        while i < len(tokens) and tokens[i].type != 'blockquote_close':
+        while i < end:
             if tokens[i].type == 'paragraph_open':
                 content_idx = i + 1
                 if content_idx < len(tokens) and tokens[content_idx].type == 'inline':
-                    try:
-                        para = self.doc.add_paragraph(style='Quote')
-                    except:
-                        para = self.doc.add_paragraph()
-                        para.style = self.doc.styles['Normal']
+                    if self._has_quote:
+                        para = self._new_paragraph('Quote')
+                    else:
+                        para = self._new_paragraph()
+                        para.style = self._normal_style
                     self._process_inline_content(tokens[content_idx], para)
                 i += 3
             else:
                 i += 1
         
-        return i + 1
+        return end + 1
     
-    def _process_code_block(self, token: Token):
+    def _process_code_block(self, token: Token) -> None:
         """處理代碼塊"""
         code_text = token.content.rstrip('\n')
-        try:
-            para = self.doc.add_paragraph(code_text, style='CodeBlock')
-        except:
-            para = self.doc.add_paragraph(code_text)
-            para.style = self.doc.styles['Normal']
+        if self._has_code_block:
+            para = self._new_paragraph('CodeBlock', code_text)
+        else:
+            para = self._new_paragraph(text=code_text)
+            para.style = self._normal_style
     
-    def _process_inline_content(self, token: Token, paragraph):
+    def _process_inline_content(self, token: Token, paragraph: Paragraph) -> None:
         """處理內聯內容（粗體、斜體等）"""
-        if hasattr(token, 'children') and token.children:
-            # 使用堆疊來跟踪格式狀態
-            self._process_formatted_children(token.children, paragraph)
+        children = token.children
+        if children and len(children) == 1 and children[0].type == 'text':
+            # 最常見的純文字段落，不需經過格式狀態機，也不建立 Run 物件
+            text = children[0].content
+            run_element = paragraph._p.add_r()
+            if text:
+                run_element.text = text
+            return
+        
+        if children:
+            # 以位元遮罩跟踪格式狀態
+            self._process_formatted_children(children, paragraph)
         else:
             # 如果沒有子元素，直接添加內容
             if token.content:
                 paragraph.add_run(token.content)
     
-    def _process_formatted_children(self, children, paragraph):
-        """處理格式化的子元素，正確跟踪格式狀態"""
-        format_stack = []
-        current_formats = set()
+    def _process_formatted_children(self, children: List[Token], paragraph: Paragraph) -> None:
+        """單次線性掃描內聯 token，以位元遮罩跟踪格式狀態並輸出 run
         
-        i = 0
-        while i < len(children):
-            token = children[i]
-            
-            if token.type == 'text':
-                # 添加文本，應用當前的所有格式
-                run = paragraph.add_run(token.content)
-                if 'bold' in current_formats:
-                    run.bold = True
-                if 'italic' in current_formats:
-                    run.italic = True
-                if 'strikethrough' in current_formats:
-                    run.font.strike = True
-                if 'code' in current_formats:
-                    run.font.name = 'Consolas'
-                    run.font.size = Pt(10)
-            
-            elif token.type == 'strong_open':
-                current_formats.add('bold')
-                format_stack.append('bold')
-            
-            elif token.type == 'strong_close':
-                if 'bold' in current_formats:
-                    current_formats.remove('bold')
-                if format_stack and format_stack[-1] == 'bold':
-                    format_stack.pop()
-            
-            elif token.type == 'em_open':
-                current_formats.add('italic')
-                format_stack.append('italic')
-            
-            elif token.type == 'em_close':
-                if 'italic' in current_formats:
-                    current_formats.remove('italic')
-                if format_stack and format_stack[-1] == 'italic':
-                    format_stack.pop()
-            
-            elif token.type == 'code_inline':
-                # 行內代碼，直接處理
-                run = paragraph.add_run(token.content)
-                run.font.name = 'Consolas'
-                run.font.size = Pt(10)
-            
-            elif token.type == 's_open':
-                current_formats.add('strikethrough')
-                format_stack.append('strikethrough')
+        相鄰且格式相同的文字會合併為同一個 run
+        """
+        mask = 0
+        pending: List[str] = []
+        pending_mask = 0
+        
+        for token in children:
+            token_type = token.type
             
-            elif token.type == 's_close':
-                if 'strikethrough' in current_formats:
-                    current_formats.remove('strikethrough')
-                if format_stack and format_stack[-1] == 'strikethrough':
-                    format_stack.pop()
+            if token_type in _FORMAT_OPEN_TOKENS:
+                mask |= _FORMAT_OPEN_TOKENS[token_type]
+                continue
+            if token_type in _FORMAT_CLOSE_TOKENS:
+                mask &= ~_FORMAT_CLOSE_TOKENS[token_type]
+                continue
             
+            if token_type == 'text':
+                text, run_mask = token.content, mask
+            elif token_type == 'code_inline':
+                # 行內代碼只套用代碼格式
+                text, run_mask = token.content, FORMAT_CODE
+            elif token.children:
+                # 其他帶子元素的 token（例如圖片替代文字）以獨立格式狀態處理
+                if pending:
+                    self._emit_run(paragraph, "".join(pending), pending_mask)
+                    pending = []
+                self._process_formatted_children(token.children, paragraph)
+                continue
+            elif token.content:
+                text, run_mask = token.content, mask
             else:
-                # 其他類型的 token，遞歸處理
-                if hasattr(token, 'children') and token.children:
-                    self._process_formatted_children(token.children, paragraph)
-                elif token.content:
-                    run = paragraph.add_run(token.content)
-                    if 'bold' in current_formats:
-                        run.bold = True
-                    if 'italic' in current_formats:
-                        run.italic = True
-                    if 'strikethrough' in current_formats:
-                        run.font.strike = True
-                    if 'code' in current_formats:
-                        run.font.name = 'Consolas'
-                        run.font.size = Pt(10)
+                continue
             
-            i += 1
-
-    def _process_inline_token(self, token: Token, paragraph):
-        """處理單個內聯 token（已棄用，使用 _process_formatted_children）"""
-        # 保留舊方法以防兼容性問題
-        if token.type == 'text':
-            paragraph.add_run(token.content)
-        elif token.type == 'code_inline':
-            run = paragraph.add_run(token.content)
-            run.font.name = 'Consolas'
-            run.font.size = Pt(10)
-        else:
-            # 處理嵌套的格式化內容
-            if hasattr(token, 'children') and token.children:
-                self._process_nested_formatting(token, paragraph)
-    
-    def _process_nested_formatting(self, token: Token, paragraph):
-        """處理嵌套的格式化內容"""
-        # 收集所有文本內容和格式
-        content_parts = []
-        self._collect_formatted_content(token, content_parts, [])
+            if pending and run_mask != pending_mask:
+                self._emit_run(paragraph, "".join(pending), pending_mask)
+                pending = []
+            pending.append(text)
+            pending_mask = run_mask
         
-        # 添加格式化的內容到段落
-        for text, formats in content_parts:
-            if text:
-                run = paragraph.add_run(text)
-                if 'bold' in formats:
-                    run.bold = True
-                if 'italic' in formats:
-                    run.italic = True
-                if 'code' in formats:
-                    run.font.name = 'Consolas'
-                    run.font.size = Pt(10)
-                if 'strikethrough' in formats:
-                    run.font.strike = True
+        if pending:
+            self._emit_run(paragraph, "".join(pending), pending_mask)
     
-    def _collect_formatted_content(self, token: Token, content_parts: List, current_formats: List):
-        """遞歸收集格式化內容"""
-        new_formats = current_formats.copy()
-        
-        # 根據 token 類型添加格式
-        if token.type == 'strong_open':
-            new_formats.append('bold')
-        elif token.type == 'em_open':
-            new_formats.append('italic')
-        elif token.type == 'code_inline':
-            content_parts.append((token.content, new_formats + ['code']))
-            return
-        elif token.type == 's_open':
-            new_formats.append('strikethrough')
-        elif token.type == 'text':
-            content_parts.append((token.content, new_formats))
-            return
-        
-        # 處理子元素
-        if hasattr(token, 'children') and token.children:
-            for child in token.children:
-                self._collect_formatted_content(child, content_parts, new_formats)
+    @staticmethod
+    def _emit_run(paragraph: Paragraph, text: str, mask: int) -> None:
+        """按格式位元添加 run"""
+        _CONFIGURE_RUN[mask](paragraph.add_run(text))
     
-    def _add_horizontal_line(self):
+    def _add_horizontal_line(self) -> None:
         """添加水平線"""
-        para = self.doc.add_paragraph()
+        para = self._new_paragraph()
         para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        run = para.add_run("━" * 50)
+        para.add_run(self._HR)
+
+
+@functools.lru_cache(maxsize=8)
+def _convert_to_docx_bytes(markdown_content: str, title: str) -> bytes:
+    """轉換並快取 DOCX 位元組（相同內容與標題重複下載時直接返回）"""
+    converter = ImprovedMarkdownToDocxConverter()
+    return converter.convert_markdown_to_docx(markdown_content, title).getvalue()
 
 
 def convert_markdown_to_docx_improved(markdown_content: str, title: str = "文檔") -> BytesIO:
@@ -366,5 +404,18 @@ def convert_markdown_to_docx_improved(markdown_content: str, title: str = "文
     Returns:
         BytesIO: DOCX 文檔流
     """
-    converter = ImprovedMarkdownToDocxConverter()
-    return converter.convert_markdown_to_docx(markdown_content, title)
\ No newline at end of file
+    return BytesIO(_convert_to_docx_bytes(markdown_content, title))
+
+
+def convert_markdown_to_docx_bytes(markdown_content: str, title: str = "文檔") -> bytes:
+    """
+    將 Markdown 轉換為 DOCX 位元組，可直接提交到進程池執行
+    
+    Args:
+        markdown_content (str): Markdown 內容
+        title (str): 文檔標題
+        
+    Returns:
+        bytes: DOCX 文檔內容
+    """
+    return _convert_to_docx_bytes(markdown_content, title)
@@ -1,56 +1,99 @@
 import sys
 from fastapi import (
-    FastAPI, BackgroundTasks, Request, HTTPException, UploadFile, File
+    FastAPI, Request, HTTPException, UploadFile, File,
+    WebSocket, WebSocketDisconnect
 )
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse, Response
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
 import uvicorn
 import os
+import re
+import gzip
+import hashlib
+import threading
 import time
-from typing import Dict, Any, Optional
+import asyncio
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
+from functools import lru_cache
 from pydantic import BaseModel, HttpUrl
 import logging
+import queue
+import atexit
+from logging.handlers import QueueHandler, QueueListener
 import uuid
+import orjson
 from contextlib import asynccontextmanager  # Added for lifespan
 
+try:
+    import brotli  # 可選依賴，安裝後首頁額外提供 br 壓縮版本
+except ImportError:
+    brotli = None
+
 # 導入新的模塊
 from config import AppConfig
-from security import SecurityValidator, CookiesValidator
-from task_manager import task_manager
-from error_handler import ErrorHandler, retry_on_error, RetryConfig
+from security import SecurityValidator, CookiesValidator, CookiesContentParser
+from task_manager import task_manager, TERMINAL_STATUSES
+from summary_cache import SummaryCache
+from error_handler import ErrorHandler, retry_on_error, RetryConfig, get_circuit_breaker, CircuitOpenError
 from batch_processor import batch_processor, BatchRequest
 from utils import SystemChecker, metrics_collector
-from improved_md_to_docx import convert_markdown_to_docx_improved as convert_markdown_to_docx
-
-# 配置日誌
-logging.basicConfig(
-    level=getattr(logging, AppConfig.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(AppConfig.LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
+from improved_md_to_docx import convert_markdown_to_docx_bytes
+
+# 配置日誌：記錄時只放入佇列，寫檔與終端輸出由 QueueListener 的背景線程執行，不阻塞事件循環
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [logging.FileHandler(AppConfig.LOG_FILE), logging.StreamHandler()]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+_log_queue = queue.Queue(-1)
+_queue_handler = QueueHandler(_log_queue)
+# 佇列中只保存訊息本身（含異常堆疊），完整格式由背景線程的處理器套用
+_queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=getattr(logging, AppConfig.LOG_LEVEL), handlers=[_queue_handler])
+
+log_listener = QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+log_listener.start()
+# 進程結束時寫出佇列中剩餘的日誌
+atexit.register(log_listener.stop)
+
 logger = logging.getLogger(__name__)
 
+def _write_text_file(path: str, content: str):
+    """寫入文字檔（在工作線程中執行）"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
 # --- 新增：啟動時處理 Cookie 文件 (移到 app 創建之前) ---
+# 檔案讀寫都透過 asyncio.to_thread 執行，不阻塞事件循環
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 在應用程式啟動時執行
     logger.info("正在啟動應用程式...")
     
     # 確保必要的目錄存在
-    AppConfig.ensure_directories()
+    await asyncio.to_thread(AppConfig.ensure_directories)
+    
+    # 多 worker 時各進程不共享記憶體，任務狀態必須經由 Redis 共享
+    if task_manager.store is not None:
+        logger.info(f"任務狀態使用 Redis 共享存儲 (workers: {AppConfig.WORKERS})")
+    elif AppConfig.WORKERS > 1:
+        logger.warning(
+            f"已啟用 {AppConfig.WORKERS} 個 worker 但未設定 REDIS_URL，"
+            "任務狀態只存在於建立它的 worker，查詢可能落到其他 worker 而找不到任務"
+        )
+    else:
+        logger.info("任務狀態使用本地記憶體存儲 (單一 worker)")
     
     # 處理環境變數中的 Cookie 文件
     cookie_content = os.environ.get("COOKIE_FILE_CONTENT")
     cookie_file_path = "/app/cookies.txt"  # 在容器內的路徑
     if cookie_content:
         try:
-            with open(cookie_file_path, "w", encoding="utf-8") as f:
-                f.write(cookie_content)
+            await asyncio.to_thread(_write_text_file, cookie_file_path, cookie_content)
             logger.info(f"已成功從環境變數 COOKIE_FILE_CONTENT 寫入 {cookie_file_path}")
         except Exception as e:
             logger.error(f"從環境變數寫入 Cookie 文件失敗: {e}")
@@ -58,23 +101,22 @@ async def lifespan(app: FastAPI):
         logger.info("未找到環境變數 COOKIE_FILE_CONTENT，跳過寫入 Cookie 文件")
     
     # 載入持久化的任務
-    task_manager.load_tasks_from_file("tasks.json")
+    await asyncio.to_thread(task_manager.load_tasks_from_file, "tasks.json")
+    # 之後的任務變更由背景線程合併寫入，不在請求或進度回調中直接寫檔
+    task_manager.enable_autosave("tasks.json", AppConfig.TASK_SAVE_INTERVAL)
     
     yield
     
     # 在應用程式關閉時執行
     logger.info("正在關閉應用程式...")
     
-    # 保存任務到檔案
-    task_manager.save_tasks_to_file("tasks.json")
-    
-    # 關閉任務管理器
-    task_manager.shutdown()
+    # 關閉任務管理器（等待執行中的任務結束、關閉進程池、停止背景寫入器後保存任務到檔案）
+    await asyncio.to_thread(task_manager.shutdown)
     
     # 清理 Cookie 文件
     if os.path.exists(cookie_file_path):
         try:
-            os.remove(cookie_file_path)
+            await asyncio.to_thread(os.remove, cookie_file_path)
             logger.info(f"已清理 Cookie 文件: {cookie_file_path}")
         except Exception as e:
             logger.error(f"清理 Cookie 文件失敗: {e}")
@@ -88,7 +130,7 @@ print(f"當前工作目錄: {os.getcwd()}")
 try:
     # 導入我們的 YouTube 摘要處理函數
     print("嘗試導入 YouTubeSummarizer...")
-    from yt_summarizer import run_summary_process
+    from yt_summarizer import run_summary_process, TaskCancelledError, SummaryProcessError
     print("成功導入 YouTubeSummarizer")
 except Exception as e:
     print(f"導入 YouTubeSummarizer 失敗: {e}")
@@ -98,15 +140,33 @@ except Exception as e:
 
 # 創建應用
 print("創建 FastAPI 應用...")
-app = FastAPI(title="YouTube 影片摘要服務", lifespan=lifespan)
+class OrjsonResponse(JSONResponse):
+    """以 orjson 直接序列化為 bytes 的 JSON 回應（任務結果包含大量中文摘要文字）"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+app = FastAPI(title="YouTube 影片摘要服務", lifespan=lifespan, default_response_class=OrjsonResponse)
 
-# 添加 CORS 配置
+# 添加 CORS 配置：只列出實際使用的方法與標頭，並讓瀏覽器快取預檢結果 24 小時
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # 在生產環境中應當指定具體域名
+    allow_origins=AppConfig.CORS_ORIGINS,  # 在生產環境中應透過 CORS_ORIGINS 指定具體域名
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["Content-Type", "Authorization", "If-None-Match"],
+    expose_headers=["ETag"],
+    max_age=86400,
+)
+
+# 壓縮較大的回應（任務結果包含完整摘要與轉錄文字）；已設置 Content-Encoding 的回應（例如預壓縮的首頁）不會重複壓縮。
+# DOCX 本身就是 zip 壓縮檔，再壓縮只浪費 CPU，與預設排除的類型一併跳過
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=1024,
+    compresslevel=6,
+    exclude_content_types=(*DEFAULT_EXCLUDED_CONTENT_TYPES, DOCX_MEDIA_TYPE)
 )
 
 # 設置模板
@@ -121,11 +181,54 @@ class SummaryRequest(BaseModel):
     google_api_key: Optional[str] = None
     whisper_model: Optional[str] = "gpt-4o-transcribe"
 
+# 已完成摘要的快取，同一影片與模型選項重複提交時直接返回
+summary_cache = SummaryCache(AppConfig.CACHE_DIR, AppConfig.SUMMARY_CACHE_TTL)
+
+def summary_cache_key(url: str, keep_audio: bool, **model_options) -> Optional[str]:
+    """計算摘要快取鍵；需要保留音訊檔時必須實際下載，不使用快取"""
+    if keep_audio:
+        return None
+    return SummaryCache.make_key(SecurityValidator.canonical_video_key(url), **model_options)
+
+# 進行中的任務：相同影片與選項的重複提交共用同一個任務，不重複下載與轉錄
+_inflight_tasks: Dict[str, str] = {}
+_inflight_lock = threading.Lock()
+
+def _inflight_key(url: str, keep_audio: bool, model_type: str, gemini_model: str,
+                  openai_model: str, whisper_model: str) -> str:
+    """計算進行中任務的去重鍵"""
+    return SummaryCache.make_key(
+        SecurityValidator.canonical_video_key(url), keep_audio=keep_audio, model_type=model_type, gemini_model=gemini_model,
+        openai_model=openai_model, whisper_model=whisper_model
+    )
+
+def _release_inflight(task):
+    """任務結束時移除其去重記錄"""
+    key = _inflight_key(task.url, task.keep_audio, task.model_type, task.gemini_model,
+                        task.openai_model, task.whisper_model)
+    with _inflight_lock:
+        if _inflight_tasks.get(key) == task.id:
+            del _inflight_tasks[key]
+
+task_manager.add_terminal_listener(_release_inflight)
+
+# 限制同時處理的任務數；超出的任務保持 pending 排隊，而不是直接拒絕
+summary_semaphore = asyncio.Semaphore(AppConfig.MAX_CONCURRENT_TASKS)
+
+# 下游服務（YouTube、OpenAI、Gemini）連續故障時直接讓新任務失敗，不再逐一耗盡重試時間；
+# 只有可重試類型的錯誤（網絡、API、系統）計入，無效金鑰、取消等不會觸發
+summary_breaker = get_circuit_breaker(
+    "summary",
+    failure_threshold=AppConfig.CIRCUIT_BREAKER_THRESHOLD,
+    recovery_timeout=AppConfig.CIRCUIT_BREAKER_TIMEOUT,
+    is_failure=ErrorHandler.is_retryable
+)
+
 # API 端點: 提交摘要請求
 @app.post("/api/summarize")
-async def summarize_video(request: Request, background_tasks: BackgroundTasks):
+async def summarize_video(request: Request):
     try:
-        data = await request.json()
+        data = orjson.loads(await request.body())
         url = data.get("url")
         keep_audio = data.get("keep_audio", False)
         openai_api_key = data.get("openai_api_key")
@@ -150,16 +253,28 @@ async def summarize_video(request: Request, background_tasks: BackgroundTasks):
         if not google_validation["valid"]:
             return {"status": "error", "message": google_validation["error"]}
         
-        # 檢查同時處理的任務數量
+        # 相同請求仍在處理中時直接返回該任務
+        inflight_key = _inflight_key(url_validation["normalized_url"], keep_audio, model_type,
+                                     gemini_model, openai_model, whisper_model)
+        with _inflight_lock:
+            existing_task_id = _inflight_tasks.get(inflight_key)
+        if existing_task_id:
+            existing_task = await asyncio.to_thread(task_manager.get_task, existing_task_id)
+            if existing_task and existing_task.status in ("pending", "processing"):
+                logger.info(f"重複提交，沿用進行中的任務: {existing_task_id}")
+                return {"task_id": existing_task_id, "message": "existing task"}
+        
+        # 處理名額由 summary_semaphore 排隊分配，這裡只限制排隊長度
         task_stats = task_manager.get_task_stats()
-        if task_stats["processing"] >= AppConfig.MAX_CONCURRENT_TASKS:
+        if task_stats["pending"] + task_stats["processing"] >= AppConfig.MAX_QUEUED_TASKS:
             return {"status": "error", "message": "系統繁忙，請稍後再試"}
         
         # 生成安全的任務 ID
         task_id = SecurityValidator.generate_task_id()
         
-        # 創建任務
-        task = task_manager.create_task(
+        # 創建任務（啟用 Redis 時會寫入共享存儲，在工作線程中進行，不阻塞事件循環）
+        task = await asyncio.to_thread(
+            task_manager.create_task,
             task_id=task_id,
             url=url_validation["normalized_url"],
             keep_audio=keep_audio,
@@ -170,27 +285,82 @@ async def summarize_video(request: Request, background_tasks: BackgroundTasks):
             openai_model=openai_model,
             whisper_model=whisper_model
         )
+        with _inflight_lock:
+            _inflight_tasks[inflight_key] = task_id
         
         # 啟動背景處理任務
-        background_tasks.add_task(
-            process_video, 
-            task_id, 
-            url_validation["normalized_url"], 
-            keep_audio, 
-            openai_api_key=openai_validation["sanitized_key"], 
-            google_api_key=google_validation["sanitized_key"],
+        schedule_video(task)
+        
+        response = {"task_id": task_id}
+        cache_key = summary_cache_key(
+            url_validation["normalized_url"],
+            keep_audio,
             model_type=model_type,
             gemini_model=gemini_model,
             openai_model=openai_model,
             whisper_model=whisper_model
         )
-        
-        return {"task_id": task_id}
+        if cache_key:
+            response["cache_key"] = cache_key
+        return response
         
     except Exception as e:
         logger.error(f"提交摘要請求時發生錯誤: {e}")
         return {"status": "error", "message": "處理請求時發生錯誤"}
 
+# 只使用標準名稱的 cookies 文件，避免使用到舊的、名稱不規範的檔案 (如 www.youtube.com_cookies (6).txt)
+COOKIE_PRIORITY_NAMES = ("cookies.txt", "youtube_cookies.txt", "yt_cookies.txt")
+# 查找結果的快取：本進程上傳或刪除時立即失效，其他 worker 的變更最多延遲 TTL 秒生效
+_COOKIE_PATH_TTL = 30.0
+_cookie_path_cache: Optional[Tuple[float, Optional[str]]] = None
+# /api/cookies-status 回應的快取，同樣在上傳或刪除時失效
+_COOKIE_STATUS_TTL = 2.0
+_cookie_status_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+
+def resolve_cookie_path() -> Optional[str]:
+    """按優先順序查找 cookies 文件，結果快取 _COOKIE_PATH_TTL 秒"""
+    global _cookie_path_cache
+    now = time.monotonic()
+    if _cookie_path_cache is not None and now - _cookie_path_cache[0] < _COOKIE_PATH_TTL:
+        return _cookie_path_cache[1]
+    
+    cookie_path = next(
+        (path for path in (os.path.join(AppConfig.COOKIES_DIR, name) for name in COOKIE_PRIORITY_NAMES)
+         if os.path.isfile(path)),
+        None
+    )
+    _cookie_path_cache = (now, cookie_path)
+    return cookie_path
+
+def invalidate_cookie_path():
+    """cookies 文件變更後清除查找與狀態快取"""
+    global _cookie_path_cache, _cookie_status_cache
+    _cookie_path_cache = None
+    _cookie_status_cache = None
+
+# 執行中的處理協程；事件循環只保留弱引用，需自行持有直到完成
+_video_jobs = set()
+
+def schedule_video(task):
+    """
+    排程影片處理，參數全部取自任務記錄，單一與批量請求共用。
+    處理狀態都經由 task_manager（可搭配 Redis 共享）讀寫，改用外部任務佇列時只需替換此處。
+    每個任務獨立建立協程（BackgroundTasks 會逐一等待，批量任務將被串行執行），並行數由 summary_semaphore 控制。
+    """
+    job = asyncio.create_task(process_video(
+        task.id,
+        task.url,
+        task.keep_audio,
+        openai_api_key=task.openai_api_key,
+        google_api_key=task.google_api_key,
+        model_type=task.model_type,
+        gemini_model=task.gemini_model,
+        openai_model=task.openai_model,
+        whisper_model=task.whisper_model
+    ))
+    _video_jobs.add(job)
+    job.add_done_callback(_video_jobs.discard)
+
 # 背景處理函數
 async def process_video(
     task_id: str, 
@@ -204,78 +374,123 @@ async def process_video(
     whisper_model: str = "gpt-4o-transcribe"
 ):
     try:
-        # 更新任務狀態
-        task_manager.update_task_status(task_id, "processing")
+        # 處理線程在下載、轉錄等檢查點查詢此事件，取消後盡快中止
+        cancel_event = task_manager.get_cancel_event(task_id)
+        if cancel_event.is_set():
+            return
         
         # 記錄開始時間
         start_time = time.time()
         
-        # 進度更新回調函數
-        def progress_callback(stage, percentage, message):
-            # 檢查任務是否已取消
-            if task_manager.is_task_cancelled(task_id):
-                raise Exception("任務已被取消")
-                
-            task_manager.update_task_progress(task_id, stage, percentage, message)
-            logger.info(f"進度更新: [{task_id}] {stage} {percentage}% - {message}")
-        
-        # 檢查是否有 cookies 文件
-        cookie_file_path = None
+        # 先查詢摘要快取，命中時無需重新下載、轉錄與摘要（快取檔案的讀寫在工作線程中進行，不阻塞事件循環）
+        cache_key = summary_cache_key(
+            url,
+            keep_audio,
+            model_type=model_type,
+            gemini_model=gemini_model,
+            openai_model=openai_model,
+            whisper_model=whisper_model
+        )
+        if cache_key:
+            cached_result = await asyncio.to_thread(summary_cache.get, cache_key)
+            if cached_result is not None:
+                logger.info(f"使用快取的摘要結果: [{task_id}] {cache_key}")
+                metrics_collector.record_request(True, time.time() - start_time)
+                await asyncio.to_thread(task_manager.update_task_status, task_id, "complete", result=cached_result)
+                return
         
-        # 檢查 cookies 目錄中的 .txt 文件
-        if os.path.exists(AppConfig.COOKIES_DIR):
-            # 優先使用特定名稱的文件
-            # 解決問題：避免使用到舊的、名稱不規範的 cookie 檔案 (如 www.youtube.com_cookies (6).txt)
-            priority_names = ["cookies.txt", "youtube_cookies.txt", "yt_cookies.txt"]
+        # 超過同時處理上限的任務在此排隊，取得名額後才佔用處理線程
+        async with summary_semaphore:
+            # 排隊期間可能已被取消
+            if cancel_event.is_set():
+                return
             
-            # 直接檢查這些檔案是否存在
-            for name in priority_names:
-                potential_path = os.path.join(AppConfig.COOKIES_DIR, name)
-                if os.path.isfile(potential_path):
-                    cookie_file_path = potential_path
-                    logger.info(f"找到優先 cookies 文件: {cookie_file_path}")
-                    break
+            # 更新任務狀態，處理時間從取得名額後開始計算
+            await asyncio.to_thread(task_manager.update_task_status, task_id, "processing")
+            start_time = time.time()
             
-            # 移除自動使用任意檔案的邏輯，確保只使用標準名稱的 cookies
-            if not cookie_file_path:
-                logger.debug("未找到標準名稱的 cookies 文件 (cookies.txt 等)")
-        
-        if not cookie_file_path:
-            logger.info("未找到 cookies 文件，將不使用 cookies")
-        
-        # 使用重試機制調用 YouTubeSummarizer 處理影片
-        @retry_on_error(RetryConfig(max_attempts=3, delay=2.0))
-        def process_with_retry():
-            return run_summary_process(
-                url=url,
-                keep_audio=keep_audio,
-                progress_callback=progress_callback,
-                cookie_file_path=cookie_file_path,
-                openai_api_key=openai_api_key,
-                google_api_key=google_api_key,
-                model_type=model_type,
-                gemini_model=gemini_model,
-                openai_model=openai_model,
-                whisper_model=whisper_model
-            )
-        
-        try:
-            result = process_with_retry()
-        except Exception as e:
-            # 如果重試後仍然失敗，嘗試優雅降級
-            if ErrorHandler.is_retryable(e):
-                logger.warning(f"處理失敗，嘗試優雅降級: {e}")
-                # 這裡可以實現基本的降級邏輯，例如僅提取音頻或提供基本信息
-                raise e
+            # 進度更新回調函數
+            def progress_callback(stage, percentage, message):
+                # 檢查任務是否已取消
+                if task_manager.is_task_cancelled(task_id):
+                    raise TaskCancelledError()
+                    
+                task_manager.update_task_progress(task_id, stage, percentage, message)
+                logger.info(f"進度更新: [{task_id}] {stage} {percentage}% - {message}")
+            
+            # 檢查是否有 cookies 文件（查找結果有快取，不必每個任務都掃描目錄）
+            cookie_file_path = resolve_cookie_path()
+            if cookie_file_path:
+                logger.info(f"找到優先 cookies 文件: {cookie_file_path}")
             else:
-                raise e
-        
-        # 記錄成功指標
-        processing_time = time.time() - start_time if 'start_time' in locals() else 0
-        metrics_collector.record_request(True, processing_time)
+                logger.info("未找到 cookies 文件，將不使用 cookies")
+            
+            loop = asyncio.get_running_loop()
+            # 與下方 wait_for 相同的時間上限，處理線程內的等待（例如 Gemini 金鑰配置）不超過此期限
+            deadline = time.monotonic() + AppConfig.MAX_EXECUTION_TIME if AppConfig.MAX_EXECUTION_TIME else None
+            
+            def run_once():
+                result = run_summary_process(
+                    url=url,
+                    keep_audio=keep_audio,
+                    progress_callback=progress_callback,
+                    cookie_file_path=cookie_file_path,
+                    openai_api_key=openai_api_key,
+                    google_api_key=google_api_key,
+                    model_type=model_type,
+                    gemini_model=gemini_model,
+                    openai_model=openai_model,
+                    whisper_model=whisper_model,
+                    cancel_event=cancel_event,
+                    deadline=deadline
+                )
+                # run_summary_process 以錯誤結果表示失敗，改為拋出異常，讓重試與斷路器依錯誤類型判斷
+                if result.get("status") == "error":
+                    raise SummaryProcessError(result)
+                return result
+            
+            # 使用重試機制調用 YouTubeSummarizer 處理影片：每次嘗試在任務管理器的線程池中執行，
+            # 重試之間以 asyncio.sleep 等待（加上隨機抖動），不佔用處理線程
+            @retry_on_error(RetryConfig(max_attempts=3, delay=2.0, jitter=0.3))
+            async def process_with_retry():
+                return await loop.run_in_executor(task_manager.executor, run_once)
+            
+            try:
+                # 經由斷路器執行，超過時間上限時中止
+                result = await asyncio.wait_for(
+                    summary_breaker.call_async(process_with_retry),
+                    timeout=AppConfig.MAX_EXECUTION_TIME or None
+                )
+            except asyncio.TimeoutError:
+                # 線程無法被強制終止，設置取消事件讓它在下一個檢查點退出並釋放工作線程
+                cancel_event.set()
+                logger.warning(f"任務處理超時: [{task_id}] 超過 {AppConfig.MAX_EXECUTION_TIME} 秒")
+                metrics_collector.record_request(False, time.time() - start_time)
+                await asyncio.to_thread(
+                    task_manager.update_task_status, task_id, "error",
+                    error=f"處理時間超過 {AppConfig.MAX_EXECUTION_TIME} 秒上限，已中止"
+                )
+                return
+            except Exception as e:
+                # 如果重試後仍然失敗，嘗試優雅降級
+                if ErrorHandler.is_retryable(e):
+                    logger.warning(f"處理失敗，嘗試優雅降級: {e}")
+                    # 這裡可以實現基本的降級邏輯，例如僅提取音頻或提供基本信息
+                    raise e
+                else:
+                    raise e
+            
+            # 記錄成功指標
+            processing_time = time.time() - start_time if 'start_time' in locals() else 0
+            metrics_collector.record_request(True, processing_time)
+            
+            # 只快取成功的結果，失敗的請求下次仍會重新處理
+            if cache_key and result.get("status") == "success":
+                await asyncio.to_thread(summary_cache.set, cache_key, result)
+            
+            # 更新任務結果
+            await asyncio.to_thread(task_manager.update_task_status, task_id, "complete", result=result)
         
-        # 更新任務結果
-        task_manager.update_task_status(task_id, "complete", result=result)
     
     except Exception as e:
         # 記錄詳細錯誤信息
@@ -289,53 +504,112 @@ async def process_video(
         processing_time = time.time() - start_time if 'start_time' in locals() else 0
         metrics_collector.record_request(False, processing_time)
         
-        error_message = str(e)
         user_friendly_message = ErrorHandler.get_user_friendly_message(e)
         
-        if "任務已被取消" in error_message:
-            task_manager.update_task_status(task_id, "cancelled")
+        if isinstance(e, TaskCancelledError):
+            await asyncio.to_thread(task_manager.update_task_status, task_id, "cancelled")
+        elif isinstance(e, (CircuitOpenError, SummaryProcessError)):
+            # 處理流程的錯誤訊息已說明失敗的階段，直接顯示給用戶
+            await asyncio.to_thread(task_manager.update_task_status, task_id, "error", error=str(e))
         else:
-            task_manager.update_task_status(task_id, "error", 
-                                          error=user_friendly_message)
+            await asyncio.to_thread(task_manager.update_task_status, task_id, "error",
+                                    error=user_friendly_message)
 
 # API 端點: 獲取任務狀態
 @app.get("/api/tasks/{task_id}")
-async def get_task_status(task_id: str):
-    task = task_manager.get_task(task_id)
-    if not task:
+async def get_task_status(task_id: str, request: Request):
+    # 本地沒有的任務會查詢共享存儲，在工作線程中進行
+    snapshot = await asyncio.to_thread(task_manager.get_task_json, task_id)
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="任務不存在")
+    
+    # 任務未變更時返回 304，輪詢請求無需重新傳輸整份記錄；
+    # 允許瀏覽器快取 1 秒以合併重複的請求，之後再以 ETag 重新驗證（任務記錄含使用者資料，不給共享快取）
+    etag, body = snapshot
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=1, must-revalidate"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# WebSocket 端點: 推送任務狀態變更（取代輪詢，/api/tasks/{task_id} 保留作為備援）
+@app.websocket("/ws/tasks/{task_id}")
+async def task_status_ws(websocket: WebSocket, task_id: str):
+    # 先訂閱再取快照，避免遺漏兩者之間的更新；快照同時用於確認任務存在
+    queue = task_manager.subscribe(task_id)
+    try:
+        message = await asyncio.to_thread(task_manager.get_task_snapshot, task_id)
+        if message is None:
+            await websocket.close(code=4404)
+            return
+        
+        await websocket.accept()
+        await websocket.send_json(message)
+        while message.get("status") not in TERMINAL_STATUSES:
+            message = await queue.get()
+            await websocket.send_json(message)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        task_manager.unsubscribe(task_id, queue)
+
+# SSE 端點: 與 WebSocket 推送相同的任務狀態變更，供無法建立 WebSocket 的環境（例如代理不支援 Upgrade）使用
+@app.get("/api/tasks/{task_id}/events")
+async def task_status_events(task_id: str):
+    queue = task_manager.subscribe(task_id)
+    message = await asyncio.to_thread(task_manager.get_task_snapshot, task_id)
+    if message is None:
+        task_manager.unsubscribe(task_id, queue)
         raise HTTPException(status_code=404, detail="任務不存在")
     
-    return task.to_dict()
+    async def event_stream():
+        current = message
+        try:
+            yield b"data: " + orjson.dumps(current, option=orjson.OPT_NON_STR_KEYS) + b"\n\n"
+            while current.get("status") not in TERMINAL_STATUSES:
+                try:
+                    current = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # 長時間沒有更新時送出註解行，避免連線被代理視為閒置而中斷
+                    yield b": keep-alive\n\n"
+                    continue
+                yield b"data: " + orjson.dumps(current, option=orjson.OPT_NON_STR_KEYS) + b"\n\n"
+        finally:
+            task_manager.unsubscribe(task_id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# 任務尚未回報進度時的默認值（timestamp 於請求時填入）
+_DEFAULT_PROGRESS = {
+    "stage": "初始化",
+    "percentage": 0,
+    "message": "正在準備處理..."
+}
 
 # API 端點: 獲取任務進度
 @app.get("/api/tasks/{task_id}/progress")
 async def get_task_progress(task_id: str):
-    task = task_manager.get_task(task_id)
-    if not task:
+    # 只取進度欄位的副本，不必為輪詢複製整個任務
+    progress = await asyncio.to_thread(task_manager.get_task_progress, task_id)
+    if progress is None:
         raise HTTPException(status_code=404, detail="任務不存在")
     
-    # 獲取當前進度，如果不存在則使用默認值
-    progress = task.progress or {}
-    
-    # 確保所有必要字段都有有效的默認值
-    default_progress = {
-        "stage": "初始化",
-        "percentage": 0,
-        "message": "正在準備處理...",
-        "timestamp": time.time()
+    # 缺少或為 None 的欄位使用默認值
+    return {
+        **_DEFAULT_PROGRESS,
+        "timestamp": time.time(),
+        **{key: value for key, value in progress.items() if value is not None}
     }
-    
-    # 合併現有進度與默認值
-    for key, value in default_progress.items():
-        if key not in progress or progress[key] is None:
-            progress[key] = value
-    
-    return progress
 
 # API 端點: 獲取所有任務列表
 @app.get("/api/tasks")
 async def list_tasks():
-    return task_manager.get_all_tasks()
+    # 列表不含摘要結果，完整內容請使用 /api/tasks/{task_id}
+    return task_manager.get_all_tasks(include_result=False)
 
 # API 端點: 獲取任務統計
 @app.get("/api/tasks/stats")
@@ -350,7 +624,7 @@ async def download_docx(task_id: str):
         logger.info(f"開始處理 DOCX 下載請求: {task_id}")
         
         # 獲取任務
-        task = task_manager.get_task(task_id)
+        task = await asyncio.to_thread(task_manager.get_task, task_id)
         if not task:
             logger.error(f"任務不存在: {task_id}")
             raise HTTPException(status_code=404, detail="任務不存在")
@@ -381,8 +655,16 @@ async def download_docx(task_id: str):
         # 轉換為 DOCX
         try:
             logger.info("開始轉換 DOCX...")
-            docx_stream = convert_markdown_to_docx(summary_content, title)
-            logger.info(f"DOCX 轉換成功，大小: {len(docx_stream.getvalue())} 字節")
+            # 轉換是 CPU 密集的純 Python 計算，不在事件循環中執行：長篇摘要放到進程池，
+            # 較短的摘要不值得跨進程傳遞的成本，在線程中轉換並可重用本進程的轉換快取
+            if len(summary_content) >= AppConfig.DOCX_PROCESS_MIN_CHARS:
+                loop = asyncio.get_running_loop()
+                docx_bytes = await loop.run_in_executor(
+                    task_manager.get_cpu_executor(), convert_markdown_to_docx_bytes, summary_content, title
+                )
+            else:
+                docx_bytes = await asyncio.to_thread(convert_markdown_to_docx_bytes, summary_content, title)
+            logger.info(f"DOCX 轉換成功，大小: {len(docx_bytes)} 字節")
         except Exception as e:
             logger.error(f"轉換 DOCX 失敗: {e}")
             import traceback
@@ -400,8 +682,8 @@ async def download_docx(task_id: str):
         
         # 返回 DOCX 文件
         return StreamingResponse(
-            iter([docx_stream.getvalue()]),
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            iter([docx_bytes]),
+            media_type=DOCX_MEDIA_TYPE,
             headers={"Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"}
         )
         
@@ -415,10 +697,10 @@ async def download_docx(task_id: str):
 
 # API 端點: 批量處理
 @app.post("/api/batch-summarize")
-async def batch_summarize(request: Request, background_tasks: BackgroundTasks):
+async def batch_summarize(request: Request):
     """批量處理多個 YouTube 影片"""
     try:
-        data = await request.json()
+        data = orjson.loads(await request.body())
         urls = data.get("urls", [])
         keep_audio = data.get("keep_audio", False)
         openai_api_key = data.get("openai_api_key")
@@ -451,23 +733,13 @@ async def batch_summarize(request: Request, background_tasks: BackgroundTasks):
             gemini_model=gemini_model
         )
         
-        # 創建批量處理任務
-        batch_status = batch_processor.create_batch(batch_request)
+        # 創建批量處理任務（與共享存儲往返，在工作線程中進行）
+        batch_status = await asyncio.to_thread(batch_processor.create_batch, batch_request)
         
         # 啟動背景處理
-        for task_id in batch_status.task_ids:
-            task = task_manager.get_task(task_id)
+        for task in await asyncio.to_thread(task_manager.get_tasks, batch_status.task_ids):
             if task:
-                background_tasks.add_task(
-                    process_video,
-                    task_id,
-                    task.url,
-                    task.keep_audio,
-                    openai_api_key=task.openai_api_key,
-                    google_api_key=task.google_api_key,
-                    model_type=task.model_type,
-                    gemini_model=task.gemini_model
-                )
+                schedule_video(task)
         
         return {
             "status": "success",
@@ -503,7 +775,7 @@ async def get_batch_status(batch_id: str):
 @app.post("/api/batch/{batch_id}/cancel")
 async def cancel_batch(batch_id: str):
     """取消批量處理"""
-    if batch_processor.cancel_batch(batch_id):
+    if await asyncio.to_thread(batch_processor.cancel_batch, batch_id):
         return {"status": "success", "message": "批量處理已取消"}
     else:
         return {"status": "error", "message": "無法取消批量處理"}
@@ -512,11 +784,20 @@ async def cancel_batch(batch_id: str):
 @app.get("/api/batch/{batch_id}/results")
 async def get_batch_results(batch_id: str):
     """獲取批量處理結果"""
-    results = batch_processor.get_batch_results(batch_id)
-    if not results:
+    results = batch_processor.iter_batch_results(batch_id)
+    # 第一次取值時才讀取子任務記錄，在工作線程中進行；之後的迭代由 StreamingResponse 在線程池中執行
+    first = await asyncio.to_thread(next, results, None)
+    if first is None:
         raise HTTPException(status_code=404, detail="批量處理結果不存在")
     
-    return {"batch_id": batch_id, "results": results}
+    # 回應格式不變，但逐個任務序列化並串流輸出，不必一次組出包含所有摘要的完整回應
+    def stream_results():
+        yield b'{"batch_id":' + orjson.dumps(batch_id) + b',"results":[' + orjson.dumps(first, option=orjson.OPT_NON_STR_KEYS)
+        for item in results:
+            yield b"," + orjson.dumps(item, option=orjson.OPT_NON_STR_KEYS)
+        yield b"]}"
+    
+    return StreamingResponse(stream_results(), media_type="application/json")
 
 # API 端點: 獲取所有批量處理
 @app.get("/api/batches")
@@ -530,6 +811,11 @@ async def health_check():
     """系統健康檢查"""
     return SystemChecker.get_health_status()
 
+@lru_cache(maxsize=1)
+def _iso_timestamp(second: int) -> str:
+    """同一秒內的指標請求共用同一個 ISO 時間字串"""
+    return datetime.fromtimestamp(second).isoformat()
+
 # API 端點: 系統指標
 @app.get("/api/metrics")
 async def get_metrics():
@@ -540,7 +826,7 @@ async def get_metrics():
     return {
         "system": system_metrics,
         "tasks": task_stats,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": _iso_timestamp(int(time.time()))
     }
 
 # API 端點: 系統信息
@@ -549,16 +835,27 @@ async def get_system_info():
     """獲取系統信息"""
     return SystemChecker.get_system_info()
 
+# API 端點: 刪除摘要快取
+@app.delete("/api/cache/{cache_key}")
+async def delete_summary_cache(cache_key: str):
+    """刪除指定的摘要快取，讓下次提交重新處理影片"""
+    if not SummaryCache.is_valid_key(cache_key):
+        raise HTTPException(status_code=400, detail="無效的快取鍵")
+    if not await asyncio.to_thread(summary_cache.delete, cache_key):
+        raise HTTPException(status_code=404, detail="快取不存在")
+    return {"status": "success", "message": "快取已刪除"}
+
 # 新增: 取消任務端點
 @app.post("/api/tasks/{task_id}/cancel")
 async def cancel_task(task_id: str):
-    if not task_manager.get_task(task_id):
+    task = await asyncio.to_thread(task_manager.get_task, task_id)
+    if not task:
         raise HTTPException(status_code=404, detail="任務不存在")
     
-    if task_manager.cancel_task(task_id):
+    if await asyncio.to_thread(task_manager.cancel_task, task_id):
         return {"status": "success", "message": "已取消任務"}
     else:
-        task = task_manager.get_task(task_id)
+        # 取消失敗表示任務已結束，沿用上面取得的記錄即可
         return {"status": "failed", "message": f"無法取消處理完成的任務 (當前狀態: {task.status})"}
 
 # 健康檢查端點 (對 Zeabur 部署很有用)
@@ -572,1394 +869,46 @@ async def health_check():
         "version": "1.0.0"
     }
 
+_SCRIPT_BLOCK_RE = re.compile(rb"(<script\b.*?</script>)", re.S | re.I)
+
+def _minify_html(html: bytes) -> bytes:
+    """去除標記部分每行的縮排與空行；<script> 區塊原樣保留，其中的多行模板字串（例如 Worker 原始碼）不會被改寫"""
+    minified = []
+    # split 保留捕獲的分隔內容：奇數位置是 <script> 區塊
+    for i, part in enumerate(_SCRIPT_BLOCK_RE.split(html)):
+        if i % 2:
+            minified.append(part)
+        else:
+            markup = b"\n".join(line.strip() for line in part.splitlines() if line.strip())
+            if markup:
+                minified.append(markup)
+    return b"\n".join(minified)
+
+# Web 前端: 首頁內容不依賴請求，在導入時讀取、壓縮並預先 gzip（可用時也預先 brotli）一次
+with open(os.path.join(AppConfig.TEMPLATES_DIR, "index.html"), "rb") as _f:
+    _HOME_HTML_BYTES = _minify_html(_f.read())
+_HOME_HTML_GZ = gzip.compress(_HOME_HTML_BYTES, 9)
+_HOME_HTML_BR = brotli.compress(_HOME_HTML_BYTES, quality=11) if brotli else None
+_HOME_HTML_ETAG = f'"{hashlib.blake2b(_HOME_HTML_BYTES, digest_size=16).hexdigest()}"'
+
 # Web 前端: 首頁
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="zh-TW">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>YouTube 影片摘要服務</title>
-        <!-- 引入 jQuery 和 Marked.js -->
-        <script src="https://code.jquery.com/jquery-3.7.1.min.js"></script>
-        <script src="https://cdn.jsdelivr.net/npm/marked/marked.min.js"></script>
-        <style>
-            body {
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                max-width: 1000px;
-                margin: 0 auto;
-                padding: 20px;
-                line-height: 1.6;
-                color: #333;
-                background-color: #f9f9f9;
-            }
-            h1 {
-                color: #c4302b;
-                text-align: center;
-                margin-bottom: 10px;
-            }
-            h2 {
-                color: #333;
-                border-bottom: 2px solid #ddd;
-                padding-bottom: 10px;
-                margin-top: 30px;
-            }
-            .subtitle {
-                text-align: center;
-                color: #666;
-                margin-top: 0;
-                margin-bottom: 30px;
-            }
-            .container {
-                background: white;
-                border-radius: 8px;
-                box-shadow: 0 4px 8px rgba(0,0,0,0.05);
-                padding: 30px;
-                margin-top: 20px;
-            }
-            form {
-                margin-bottom: 30px;
-                display: flex;
-                flex-direction: column;
-            }
-            input[type="url"], input[type="text"], input[type="password"] {
-                padding: 12px;
-                margin-bottom: 15px;
-                border: 1px solid #ddd;
-                border-radius: 4px;
-                font-size: 16px;
-            }
-            button {
-                padding: 12px 15px;
-                background-color: #c4302b;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                cursor: pointer;
-                font-size: 16px;
-                font-weight: 600;
-                transition: background-color 0.3s;
-            }
-            button:hover {
-                background-color: #a52724;
-            }
-            #results {
-                margin-top: 20px;
-                border: 1px solid #eee;
-                padding: 20px;
-                border-radius: 4px;
-                min-height: 100px;
-                display: none;
-                background-color: #fff;
-            }
-            .summary {
-                white-space: pre-wrap; /* 保留換行符 */
-                background-color: #f9f9f9;
-                padding: 15px;
-                border-radius: 4px;
-                margin-top: 10px;
-                line-height: 1.8;
-                /* Markdown 渲染的基本樣式 */
-                h1, h2, h3, h4, h5, h6 { 
-                    margin-top: 1.2em; 
-                    margin-bottom: 0.6em; 
-                    font-weight: 600; 
-                    line-height: 1.25;
-                    color: #333;
-                }
-                h2 { font-size: 1.5em; border-bottom: 1px solid #eee; padding-bottom: 0.3em; }
-                h3 { font-size: 1.25em; }
-                p { margin-bottom: 1em; }
-                ul, ol { padding-left: 2em; margin-bottom: 1em; }
-                li { margin-bottom: 0.4em; }
-                blockquote { 
-                    padding: 0 1em; 
-                    color: #6a737d; 
-                    border-left: 0.25em solid #dfe2e5; 
-                    margin-left: 0;
-                    margin-right: 0;
-                    margin-bottom: 1em;
-                }
-                code { 
-                    padding: 0.2em 0.4em; 
-                    margin: 0; 
-                    font-size: 85%; 
-                    background-color: rgba(27,31,35,0.05); 
-                    border-radius: 3px; 
-                    font-family: SFMono-Regular, Consolas, 'Liberation Mono', Menlo, Courier, monospace;
-                }
-                pre > code { 
-                    padding: 1em;
-                    display: block;
-                    overflow: auto;
-                }
-                strong { font-weight: 600; }
-                em { font-style: italic; }
-                hr { border: 0; height: 0.25em; padding: 0; margin: 24px 0; background-color: #e1e4e8; }
-            }
-            .loading {
-                text-align: center;
-                margin: 20px 0;
-                padding: 20px;
-                background-color: #f5f5f5;
-                border-radius: 5px;
-            }
-            .switch {
-                position: relative;
-                display: inline-block;
-                width: 60px;
-                height: 34px;
-                margin-bottom: 15px;
-            }
-            .switch input { 
-                opacity: 0;
-                width: 0;
-                height: 0;
-            }
-            .slider {
-                position: absolute;
-                cursor: pointer;
-                top: 0;
-                left: 0;
-                right: 0;
-                bottom: 0;
-                background-color: #ccc;
-                transition: .4s;
-                border-radius: 34px;
-            }
-            .slider:before {
-                position: absolute;
-                content: "";
-                height: 26px;
-                width: 26px;
-                left: 4px;
-                bottom: 4px;
-                background-color: white;
-                transition: .4s;
-                border-radius: 50%;
-            }
-            input:checked + .slider {
-                background-color: #2196F3;
-            }
-            input:checked + .slider:before {
-                transform: translateX(26px);
-            }
-            .option-container {
-                display: flex;
-                align-items: center;
-                margin-bottom: 15px;
-            }
-            .option-label {
-                margin-left: 10px;
-                font-size: 16px;
-            }
-            .api-settings {
-                margin-top: 20px;
-                padding: 20px;
-                border: 1px solid #eee;
-                border-radius: 8px;
-                background-color: #f9f9f9;
-            }
-            .api-settings h3 {
-                margin-top: 0;
-                color: #333;
-                margin-bottom: 15px;
-            }
-            .api-note {
-                font-size: 0.9em;
-                color: #666;
-                margin-top: 5px;
-            }
-            .feature-section {
-                display: flex;
-                flex-wrap: wrap;
-                gap: 20px;
-                margin: 30px 0;
-            }
-            .feature-card {
-                flex: 1;
-                min-width: 250px;
-                background: white;
-                border-radius: 8px;
-                padding: 20px;
-                box-shadow: 0 4px 8px rgba(0,0,0,0.05);
-            }
-            .feature-card h3 {
-                color: #c4302b;
-                margin-top: 0;
-            }
-            .faq-item {
-                margin-bottom: 20px;
-            }
-            .faq-question {
-                font-weight: 600;
-                color: #333;
-                margin-bottom: 8px;
-            }
-            .faq-answer {
-                color: #555;
-                line-height: 1.6;
-            }
-            .footer {
-                text-align: center;
-                margin-top: 50px;
-                padding-top: 20px;
-                border-top: 1px solid #eee;
-                color: #777;
-            }
-            .loading-animation {
-                display: inline-block;
-                position: relative;
-                width: 80px;
-                height: 80px;
-            }
-            .loading-animation div {
-                position: absolute;
-                top: 33px;
-                width: 13px;
-                height: 13px;
-                border-radius: 50%;
-                background: #c4302b;
-                animation-timing-function: cubic-bezier(0, 1, 1, 0);
-            }
-            .loading-animation div:nth-child(1) {
-                left: 8px;
-                animation: loading1 0.6s infinite;
-            }
-            .loading-animation div:nth-child(2) {
-                left: 8px;
-                animation: loading2 0.6s infinite;
-            }
-            .loading-animation div:nth-child(3) {
-                left: 32px;
-                animation: loading2 0.6s infinite;
-            }
-            .loading-animation div:nth-child(4) {
-                left: 56px;
-                animation: loading3 0.6s infinite;
-            }
-            @keyframes loading1 {
-                0% { transform: scale(0); }
-                100% { transform: scale(1); }
-            }
-            @keyframes loading2 {
-                0% { transform: translate(0, 0); }
-                100% { transform: translate(24px, 0); }
-            }
-            @keyframes loading3 {
-                0% { transform: scale(1); }
-                100% { transform: scale(0); }
-            }
-            /* 進度條樣式 */
-            .progress-container {
-                margin-top: 20px;
-                text-align: left;
-                background-color: #f9f9f9;
-                padding: 15px;
-                border-radius: 8px;
-                box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-            }
-            .progress-bar {
-                height: 20px;
-                background-color: #f3f3f3;
-                border-radius: 10px;
-                margin-bottom: 10px;
-                overflow: hidden;
-                box-shadow: inset 0 1px 3px rgba(0,0,0,0.1);
-            }
-            .progress-bar-fill {
-                height: 100%;
-                background-color: #c4302b;
-                border-radius: 10px;
-                width: 0%;
-                transition: width 0.5s ease;
-                position: relative;
-            }
-            .progress-stage {
-                font-weight: bold;
-                margin-bottom: 5px;
-                font-size: 1.1em;
-                color: #333;
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-            }
-            .progress-message {
-                font-size: 0.9em;
-                color: #666;
-                padding: 5px 0;
-                margin-bottom: 10px;
-            }
-            
-            /* 階段指示器 */
-            .stage-indicator {
-                display: flex;
-                justify-content: space-between;
-                margin-bottom: 15px;
-                position: relative;
-                padding-top: 25px;
-            }
-            .stage-indicator::before {
-                content: "";
-                position: absolute;
-                top: 35px;
-                left: 7%;
-                right: 7%;
-                height: 4px;
-                background-color: #eee;
-                z-index: 1;
-            }
-            .stage-step {
-                width: 60px;
-                text-align: center;
-                position: relative;
-                z-index: 2;
-            }
-            .stage-dot {
-                width: 20px;
-                height: 20px;
-                background-color: #ddd;
-                border-radius: 50%;
-                margin: 0 auto 10px;
-                position: relative;
-                z-index: 2;
-                border: 3px solid #f9f9f9;
-            }
-            .stage-name {
-                font-size: 0.8em;
-                color: #888;
-                white-space: nowrap;
-            }
-            .stage-step.active .stage-dot {
-                background-color: #c4302b;
-                box-shadow: 0 0 0 3px rgba(196, 48, 43, 0.2);
-            }
-            .stage-step.active .stage-name {
-                color: #333;
-                font-weight: bold;
-            }
-            .stage-step.completed .stage-dot {
-                background-color: #27ae60;
-            }
-            #download-btn {
-                margin-top: 15px;
-                padding: 8px 15px;
-                background-color: #28a745; /* Green */
-                color: white;
-                border: none;
-                border-radius: 4px;
-                cursor: pointer;
-                font-size: 1em;
-            }
-            #download-btn:hover {
-                background-color: #218838;
-            }
-            /* Style for the summary container */
-            .summary-container {
-                background-color: #fff;
-                padding: 20px;
-                border-radius: 8px;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                margin-top: 20px;
-                border: 1px solid #e0e0e0;
-            }
-            
-            /* Styles for rendered Markdown content - Reduce vertical spacing */
-            .summary-container .summary h1,
-            .summary-container .summary h2,
-            .summary-container .summary h3,
-            .summary-container .summary h4,
-            .summary-container .summary h5,
-            .summary-container .summary h6 {
-                margin-top: 0.8em; /* Reduce top margin for headings */
-                margin-bottom: 0.3em; /* Reduce bottom margin for headings */
-            }
-            
-            .summary-container .summary p {
-                margin-top: 0.3em; /* Reduce top margin for paragraphs */
-                margin-bottom: 0.5em; /* Reduce bottom margin for paragraphs */
-            }
-            
-            .summary-container .summary ul,
-            .summary-container .summary ol {
-                margin-top: 0.3em;
-                margin-bottom: 0.5em;
-                padding-left: 20px; /* Keep padding for indentation */
-            }
-            
-            .summary-container .summary li {
-                margin-top: 0.1em;
-                margin-bottom: 0.1em; /* Tighter list item spacing */
-            }
-            
-            .summary-container .summary hr {
-                margin-top: 0.5em;
-                margin-bottom: 0.5em; /* Reduce space around horizontal rules */
-                border: 0;
-                border-top: 1px solid #eee;
-            }
-            
-            .summary-container .summary blockquote {
-                margin-top: 0.5em;
-                margin-bottom: 0.5em;
-                margin-left: 0; /* Remove default blockquote indent if desired */
-                padding-left: 1em;
-                border-left: 3px solid #ccc;
-                color: #666;
-            }
-            .summary-content {
-                background-color: #f5f5f5;
-                padding: 15px;
-                border-radius: 5px;
-                margin-bottom: 20px;
-                max-height: 500px;
-                overflow-y: auto;
-                white-space: pre-wrap;
-            }
-            .button-group {
-                margin-top: 15px;
-                margin-bottom: 30px;
-            }
-            .btn {
-                padding: 10px 15px;
-                background-color: #c4302b;
-                color: white;
-                border: none;
-                border-radius: 5px;
-                cursor: pointer;
-                margin-right: 10px;
-                font-weight: bold;
-            }
-            .btn:hover {
-                background-color: #aa2a26;
-            }
-            
-            .form-group {
-                margin-top: 15px;
-                margin-bottom: 15px;
-            }
-            
-            .form-group label {
-                display: block;
-                margin-bottom: 5px;
-                font-weight: bold;
-            }
-            
-            select {
-                width: 100%;
-                padding: 10px;
-                border-radius: 5px;
-                border: 1px solid #ddd;
-                background-color: #f8f8f8;
-                margin-bottom: 5px;
-            }
-            
-            .model-info {
-                margin-top: 5px;
-                margin-bottom: 10px;
-                font-size: 0.9em;
-                color: #666;
-                font-style: italic;
-            }
-            
-            .error-alert {
-                padding: 15px;
-                background-color: #f8d7da;
-                color: #721c24;
-                border: 1px solid #f5c6cb;
-                border-radius: 4px;
-                margin-top: 20px;
-                margin-bottom: 20px;
-                display: none;
-                word-wrap: break-word;
-            }
-            .error-alert strong {
-                font-weight: bold;
-                display: block;
-                margin-bottom: 5px;
-            }
-            
-            /* Modal 樣式 */
-            .modal {
-                display: none;
-                position: fixed;
-                z-index: 1000;
-                left: 0;
-                top: 0;
-                width: 100%;
-                height: 100%;
-                background-color: rgba(0,0,0,0.5);
-                overflow: auto;
-            }
-            
-            .modal-content {
-                background-color: #fefefe;
-                margin: 5% auto;
-                padding: 0;
-                border: 1px solid #888;
-                width: 80%;
-                max-width: 700px;
-                border-radius: 8px;
-                box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-                position: relative;
-                animation: animatetop 0.4s;
-            }
-            
-            @keyframes animatetop {
-                from {top: -300px; opacity: 0}
-                to {top: 0; opacity: 1}
-            }
-            
-            .modal-header {
-                padding: 15px 20px;
-                background-color: #f8f9fa;
-                border-bottom: 1px solid #dee2e6;
-                border-radius: 8px 8px 0 0;
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-            }
-            
-            .modal-header h2 {
-                margin: 0;
-                font-size: 1.5rem;
-                border: none;
-                padding: 0;
-            }
-            
-            .close-btn {
-                color: #aaa;
-                font-size: 28px;
-                font-weight: bold;
-                cursor: pointer;
-                transition: color 0.2s;
-            }
-            
-            .close-btn:hover,
-            .close-btn:focus {
-                color: #000;
-                text-decoration: none;
-                cursor: pointer;
-            }
-            
-            .modal-body {
-                padding: 20px 30px;
-            }
-            
-            .step-list {
-                counter-reset: step;
-                list-style: none;
-                padding: 0;
-            }
-            
-            .step-list li {
-                position: relative;
-                padding-left: 50px;
-                margin-bottom: 20px;
-            }
-            
-            .step-list li::before {
-                counter-increment: step;
-                content: counter(step);
-                position: absolute;
-                left: 0;
-                top: 0;
-                width: 35px;
-                height: 35px;
-                background-color: #c4302b;
-                color: white;
-                text-align: center;
-                line-height: 35px;
-                border-radius: 50%;
-                font-weight: bold;
-            }
-            
-            .step-title {
-                font-weight: bold;
-                font-size: 1.1em;
-                margin-bottom: 5px;
-                display: block;
-            }
-            
-            .ref-link {
-                display: inline-block;
-                margin-top: 10px;
-                padding: 8px 15px;
-                background-color: #0366d6;
-                color: white;
-                text-decoration: none;
-                border-radius: 4px;
-                font-weight: bold;
-            }
-            
-            .ref-link:hover {
-                background-color: #0255b3;
-            }
-            
-            .warning-box {
-                background-color: #fff3cd;
-                border: 1px solid #ffeeba;
-                color: #856404;
-                padding: 15px;
-                border-radius: 4px;
-                margin-top: 20px;
-            }
-        </style>
-    </head>
-    <body>
-        <h1>YouTube 影片摘要服務</h1>
-        <p class="subtitle">幫助您快速獲取影片核心內容，節省寶貴時間</p>
-        
-        <div class="container">
-            <h2>開始使用</h2>
-            <form id="videoForm">
-                <input type="url" id="youtubeUrl" name="url" placeholder="輸入 YouTube 影片網址" required>
-                
-                <div class="api-settings">
-                    <h3>API 金鑰設定</h3>
-                    <input type="password" id="openaiKey" name="openai_api_key" placeholder="OpenAI API 金鑰 (必填)">
-                    <p class="api-note">需要 OpenAI API 金鑰才能執行音訊轉錄。即使選擇 Gemini 摘要，仍需要此金鑰。您可以在 <a href="https://platform.openai.com/api-keys" target="_blank">OpenAI 網站</a> 申請免費金鑰。</p>
-                    
-                    <div class="form-group">
-                        <label for="whisperModel">轉錄模型:</label>
-                        <select id="whisperModel" name="whisper_model">
-                            <option value="gpt-4o-transcribe">GPT-4o Transcribe (高品質)</option>
-                            <option value="gpt-4o-mini-transcribe">GPT-4o Mini Transcribe (快速/經濟)</option>
-                        </select>
-                    </div>
-                    
-                    <input type="password" id="googleKey" name="google_api_key" placeholder="Google API 金鑰 (選填)">
-                    <p class="api-note">Google API 金鑰可選，用於 Gemini 模型。若提供，將優先使用 Gemini 進行摘要生成。</p>
-                    
-                    <div class="form-group">
-                        <label for="modelType">優先使用模型:</label>
-                        <select id="modelType" name="model_type">
-                            <option value="auto">自動 (根據可用性)</option>
-                            <option value="openai">OpenAI (GPT)</option>
-                            <option value="gemini">Google (Gemini)</option>
-                        </select>
-                    </div>
-                    
-                    <div class="form-group" id="geminiModelGroup" style="display: none;">
-                        <label for="geminiModel">Gemini 模型選擇:</label>
-                        <select id="geminiModel" name="gemini_model">
-                            <option value="gemini-3-flash-preview">Gemini 3 Flash Preview (快速)</option>
-                            <option value="gemini-3-pro-preview">Gemini 3 Pro Preview (高品質)</option>
-                        </select>
-                    </div>
-                    
-                    <div class="form-group" id="openaiModelGroup" style="display: none;">
-                        <label for="openaiModel">OpenAI 模型選擇:</label>
-                        <select id="openaiModel" name="openai_model">
-                            <option value="gpt-4o">GPT-4o (旗艦聊天模型)</option>
-                            <option value="o1">o1 (推理模型)</option>
-                            <option value="o1-preview">o1-preview (推理模型預覽)</option>
-                            <option value="o1-mini">o1-mini (推理模型 - 快速)</option>
-                            <option value="o3">o3 (推理模型)</option>
-                            <option value="o3-mini">o3-mini (推理模型 - 快速)</option>
-                            <option value="o4-mini">o4-mini (推理模型 - 快速)</option>
-                        </select>
-                    </div>
-                    
-                    <div class="form-group">
-                        <label for="cookiesFile">YouTube Cookies 文件 (選填):</label>
-                        <input type="file" id="cookiesFile" accept=".txt" style="margin-bottom: 10px;">
-                        <div style="display: flex; align-items: center; gap: 10px; margin-top: 5px;">
-                            <div id="cookiesStatus" class="api-note" style="margin: 0;"></div>
-                            <button type="button" id="clearCookiesBtn" style="padding: 2px 8px; font-size: 12px; background-color: #6c757d; display: none;">清除 Cookies</button>
-                        </div>
-                        <p class="api-note">上傳 cookies.txt 文件可以訪問會員內容。<a href="#" onclick="showCookiesHelp()">如何獲取？</a></p>
-                    </div>
-                </div>
-                
-                <div class="option-container">
-                    <label class="switch">
-                        <input type="checkbox" id="keepAudio" name="keep_audio">
-                        <span class="slider"></span>
-                    </label>
-                    <span class="option-label">保留音訊檔案</span>
-                </div>
-                <button type="button" id="submitBtn">取得摘要</button>
-            </form>
-            
-            <div id="loading" class="loading" style="display: none;">
-                <div class="loading-animation"><div></div><div></div><div></div><div></div></div>
-                <p>正在處理中，請稍候...</p>
-                <p>影片下載、轉錄和摘要生成可能需要幾分鐘時間，取決於影片長度</p>
-                
-                <!-- 進度顯示 -->
-                <div class="progress-container">
-                    <!-- 階段指示器 -->
-                    <div class="stage-indicator">
-                        <div class="stage-step" id="stage-init">
-                            <div class="stage-dot"></div>
-                            <div class="stage-name">初始化</div>
-                        </div>
-                        <div class="stage-step" id="stage-download">
-                            <div class="stage-dot"></div>
-                            <div class="stage-name">下載</div>
-                        </div>
-                        <div class="stage-step" id="stage-transcribe">
-                            <div class="stage-dot"></div>
-                            <div class="stage-name">轉錄</div>
-                        </div>
-                        <div class="stage-step" id="stage-summary">
-                            <div class="stage-dot"></div>
-                            <div class="stage-name">摘要</div>
-                        </div>
-                        <div class="stage-step" id="stage-complete">
-                            <div class="stage-dot"></div>
-                            <div class="stage-name">完成</div>
-                        </div>
-                    </div>
-                    
-                    <div class="progress-stage" id="progressStage">初始化中...</div>
-                    <div class="progress-bar">
-                        <div class="progress-bar-fill" id="progressBarFill"></div>
-                    </div>
-                    <div class="progress-message" id="progressMessage">準備處理您的請求...</div>
-                </div>
-            </div>
-            
-            <div id="error-message" class="error-alert"></div>
-            
-            <div id="results" style="display: none;">
-                <h2>處理結果</h2>
-                <p id="taskInfo"></p>
-                <h3 id="title"></h3>
-                <div id="summary" class="summary-content"></div>
-                <div class="button-group">
-                    <button id="download-btn" class="btn" style="display: none;">下載摘要 (MD)</button>
-                    <button id="download-docx-btn" class="btn" style="display: none;">下載 Word 文檔</button>
-                    <button id="download-transcript-btn" class="btn" style="display: none;">下載逐字稿</button>
-                </div>
-            </div>
-        </div>
-
-        <div class="container">
-            <h2>功能介紹</h2>
-            <div class="feature-section">
-                <div class="feature-card">
-                    <h3>影片下載</h3>
-                    <p>自動下載 YouTube 影片並提取音訊內容，支援各種解析度和格式。</p>
-                </div>
-                <div class="feature-card">
-                    <h3>語音轉文字</h3>
-                    <p>使用先進的 AI 模型將影片聲音轉換為文字，支援多種語言。</p>
-                </div>
-                <div class="feature-card">
-                    <h3>智能摘要</h3>
-                    <p>通過 GPT-4 或 Gemini 分析影片內容，生成重點摘要、關鍵洞察和主題標籤。</p>
-                </div>
-            </div>
-        </div>
-
-        <div class="container">
-            <h2>常見問題</h2>
-            <div class="faq-item">
-                <div class="faq-question">這個服務如何保護我的 API 金鑰？</div>
-                <div class="faq-answer">
-                    您的 API 金鑰僅在處理請求時暫時使用，不會被永久儲存在伺服器上。每次提交新請求時都需要重新輸入，確保安全性。
-                </div>
-            </div>
-            <div class="faq-item">
-                <div class="faq-question">支援哪些類型的 YouTube 影片？</div>
-                <div class="faq-answer">
-                    支援大多數公開的 YouTube 影片，包括教學、演講、播客等。不支援私人影片或需要會員訂閱的內容。長度過長的影片可能會被分段處理。
-                </div>
-            </div>
-            <div class="faq-item">
-                <div class="faq-question">為什麼我需要提供自己的 API 金鑰？</div>
-                <div class="faq-answer">
-                    使用自己的 API 金鑰可以確保您的請求優先處理，並且避免與其他用戶共享配額限制。這也讓您可以完全控制成本和使用情況。
-                </div>
-            </div>
-            <div class="faq-item">
-                <div class="faq-question">處理過程需要多長時間？</div>
-                <div class="faq-answer">
-                    處理時間取決於影片長度和伺服器負載。短片通常在 1-3 分鐘內完成，長片可能需要 5-10 分鐘或更長時間。
-                </div>
-            </div>
-        </div>
-
-        <div class="footer">
-            <p>&copy; 2024 YouTube Summarizer. All rights reserved. Developed by Tseng Yao Hsien, Endocrinologist @ Tungs' Taichung MetroHarbor Hospital.</p>
-        </div>
-        
-        <script>
-            $(document).ready(function() {
-                // 初始化 Marked.js
-                marked.use({
-                    breaks: true,
-                    gfm: true
-                });
-                
-                // 檢查 cookies 狀態
-                checkCookiesStatus();
-                
-                // 模型選擇處理
-                function updateModelVisibility() {
-                    const selectedModel = $("#modelType").val();
-                    if (selectedModel === "gemini") {
-                        $("#geminiModelGroup").show();
-                        $("#openaiModelGroup").hide();
-                    } else if (selectedModel === "openai") {
-                        $("#geminiModelGroup").hide();
-                        $("#openaiModelGroup").show();
-                    } else {
-                        $("#geminiModelGroup").hide();
-                        $("#openaiModelGroup").hide();
-                    }
-                }
-                
-                // 頁面加載時檢查初始狀態
-                updateModelVisibility();
-                
-                // 監聽選擇變更
-                $("#modelType").change(updateModelVisibility);
-                
-                // Cookies 文件上傳處理
-                $("#cookiesFile").change(function() {
-                    const file = this.files[0];
-                    if (file) {
-                        uploadCookiesFile(file);
-                    }
-                });
-                
-                // 清除 Cookies 按鈕處理
-                $("#clearCookiesBtn").click(function() {
-                    if (confirm("確定要清除已上傳的 Cookies 嗎？")) {
-                        $.ajax({
-                            url: "/api/cookies",
-                            type: "DELETE",
-                            success: function(data) {
-                                if (data.status === "success") {
-                                    $("#cookiesStatus").html(`<span style="color: #666;">尚未上傳 cookies 文件</span>`);
-                                    $("#clearCookiesBtn").hide();
-                                    $("#cookiesFile").val(''); // 重置文件輸入框
-                                    alert("Cookies 已清除");
-                                } else {
-                                    showError(data.message);
-                                }
-                            },
-                            error: function() {
-                                showError("清除 Cookies 失敗");
-                            }
-                        });
-                    }
-                });
-                
-                function showError(message) {
-                    $("#error-message").html(`<strong>錯誤發生：</strong>${message}`).show();
-                    // 滾動到錯誤訊息
-                    $('html, body').animate({
-                        scrollTop: $("#error-message").offset().top - 100
-                    }, 500);
-                }
+    # 頁面沒有版本化網址，不使用 immutable；快取過期後以 ETag 重新驗證，未變更時只返回 304
+    headers = {"Cache-Control": "public, max-age=3600", "Vary": "Accept-Encoding", "ETag": _HOME_HTML_ETAG}
+    if request.headers.get("if-none-match") == _HOME_HTML_ETAG:
+        return Response(status_code=304, headers=headers)
+    accept_encoding = request.headers.get("accept-encoding", "")
+    if _HOME_HTML_BR is not None and "br" in accept_encoding:
+        headers["Content-Encoding"] = "br"
+        return HTMLResponse(content=_HOME_HTML_BR, headers=headers)
+    if "gzip" in accept_encoding:
+        headers["Content-Encoding"] = "gzip"
+        return HTMLResponse(content=_HOME_HTML_GZ, headers=headers)
+    return HTMLResponse(content=_HOME_HTML_BYTES, headers=headers)
 
-                // 顯示處理中的UI函數
-                function showProcessingUI() {
-                    $("#loading").show();
-                    $("#results").hide();
-                    $("#error-message").hide(); // 隱藏之前的錯誤
-                    
-                    // 重置進度條
-                    $("#progressStage").text("初始化中...");
-                    $("#progressBarFill").css("width", "0%");
-                    $("#progressBarFill").css("background-color", "#6c757d"); // 灰色
-                    $("#progressMessage").text("準備處理您的請求...");
-                    
-                    // 重置階段指示器
-                    $(".stage-step").removeClass("active completed");
-                    $("#stage-init").addClass("active");
-                }
-                
-                // 處理摘要按鈕點擊
-                $("#submitBtn").click(function(e) {
-                    // 防止表單提交導致頁面重新載入
-                    e.preventDefault();
-                    
-                    // 獲取表單數據
-                    const youtubeUrl = $("#youtubeUrl").val();
-                    const keepAudio = $("#keepAudio").prop("checked");
-                    const openaiApiKey = $("#openaiKey").val();
-                    const googleApiKey = $("#googleKey").val();
-                    const modelType = $("#modelType").val();
-                    const geminiModel = $("#geminiModel").val();
-                    
-                    if (!youtubeUrl) {
-                        showError("請輸入 YouTube 網址");
-                        return;
-                    }
-                    
-                    if (!openaiApiKey) {
-                        showError("請輸入 OpenAI API 金鑰");
-                        return;
-                    }
-                    
-                    // 顯示處理中的UI
-                    showProcessingUI();
-                    
-                    // 獲取 OpenAI 模型選擇
-                    const openaiModel = $("#openaiModel").val() || "gpt-4o";
-                    const whisperModel = $("#whisperModel").val() || "gpt-4o-transcribe";
-                    
-                    // 創建請求數據
-                    const requestData = {
-                        url: youtubeUrl,
-                        keep_audio: keepAudio,
-                        openai_api_key: openaiApiKey,
-                        google_api_key: googleApiKey,
-                        model_type: modelType,
-                        gemini_model: geminiModel,
-                        openai_model: openaiModel,
-                        whisper_model: whisperModel
-                    };
-                    
-                    // 發送AJAX請求
-                    $.ajax({
-                        url: "/api/summarize",
-                        type: "POST",
-                        contentType: "application/json",
-                        data: JSON.stringify(requestData),
-                        success: function(data) {
-                            if (data.task_id) {
-                                pollTaskStatus(data.task_id);
-                            } else {
-                                showError("請求失敗: 無效的回應");
-                                $("#loading").hide();
-                            }
-                        },
-                        error: function(xhr, status, error) {
-                            showError("錯誤: " + (xhr.responseJSON?.message || xhr.responseJSON?.detail || error || "未知錯誤"));
-                            $("#loading").hide();
-                        }
-                    });
-                });
-
-                // 獲取 Cookie 幫助 Modal 元素
-                const modal = document.getElementById("cookieHelpModal");
-                const closeBtn = document.getElementsByClassName("close-btn")[0];
-                
-                // 關閉 Modal
-                if (closeBtn) {
-                    closeBtn.onclick = function() {
-                        modal.style.display = "none";
-                    }
-                }
-                
-                // 點擊 Modal 外部關閉
-                window.onclick = function(event) {
-                    if (event.target == modal) {
-                        modal.style.display = "none";
-                    }
-                }
-                
-                // 顯示 cookies 幫助信息
-                window.showCookiesHelp = function() {
-                    $("#cookieHelpModal").show();
-                }
-                
-                // 防止表單默認提交行為
-                $("#videoForm").on("submit", function(e) {
-                    e.preventDefault();
-                    return false;
-                });
-                
-                // 輪詢任務狀態函數
-                function pollTaskStatus(taskId) {
-                    let previousPercentage = 0;
-                    let previousTimestamp = 0;
-                    let failedPolls = 0;
-                    const MAX_FAILED_POLLS = 5;
-
-                    // 狀態檢查函數
-                    const checkStatus = function() {
-                        // 檢查任務進度 - 使用獨立的 AJAX 調用獲取進度信息
-                        $.ajax({
-                            url: `/api/tasks/${taskId}/progress`,
-                            type: "GET",
-                            cache: false,  // 禁用緩存
-                            dataType: 'json',
-                            headers: {
-                                'Cache-Control': 'no-cache, no-store, must-revalidate',
-                                'Pragma': 'no-cache',
-                                'Expires': '0'
-                            }, 
-                            data: { _t: new Date().getTime() },  // 防止緩存
-                            success: function(progressData) {
-                                // 檢查數據是否有更新（使用時間戳或百分比變化檢測）
-                                const currentTimestamp = progressData.timestamp || 0;
-                                const hasUpdate = (currentTimestamp > previousTimestamp) || 
-                                                  (progressData.percentage !== previousPercentage);
-                                
-                                // 無論是否有更新，都刷新顯示（確保用戶能看到最新狀態）
-                                updateProgress(progressData);
-                                console.log(`進度更新: ${progressData.stage} ${progressData.percentage}% - ${progressData.message} (時間戳: ${currentTimestamp})`);
-                                
-                                if (hasUpdate) {
-                                    previousPercentage = progressData.percentage || 0;
-                                    previousTimestamp = currentTimestamp;
-                                    failedPolls = 0; // 重置失敗計數
-                                }
-                            },
-                            error: function() {
-                                console.error("獲取進度信息失敗");
-                                failedPolls++; // 增加失敗計數
-                                if (failedPolls > MAX_FAILED_POLLS) {
-                                    console.error("多次獲取進度失敗，停止輪詢");
-                                    clearInterval(pollInterval);
-                                }
-                            }
-                        });
-                        
-                        // 獨立檢查任務狀態
-                        $.ajax({
-                            url: `/api/tasks/${taskId}`,
-                            type: "GET",
-                            cache: false,  // 禁用緩存
-                            dataType: 'json',
-                            headers: {
-                                'Cache-Control': 'no-cache, no-store, must-revalidate',
-                                'Pragma': 'no-cache',
-                                'Expires': '0'
-                            },
-                            data: { _t: new Date().getTime() },  // 防止緩存
-                            success: function(taskData) {
-                                if (taskData.status === "complete") {
-                                    // 確保進度顯示為100%
-                                    updateProgress({
-                                        stage: "完成",
-                                        percentage: 100,
-                                        message: "摘要生成完成！",
-                                        timestamp: new Date().getTime()
-                                    });
-                                    
-                                    // 顯示結果
-                                    setTimeout(() => {
-                                        displayResults(taskData);
-                                        $("#loading").hide();
-                                        $("#results").show();
-                                        clearInterval(pollInterval);
-                                    }, 500); // 稍微延遲顯示結果，讓用戶看到100%完成狀態
-                                    
-                                } else if (taskData.status === "error") {
-                                    showError("處理失敗: " + (taskData.error || "未知錯誤"));
-                                    $("#loading").hide();
-                                    clearInterval(pollInterval);
-                                }
-                            },
-                            error: function() {
-                                console.error("輪詢任務狀態失敗");
-                                failedPolls++; // 增加失敗計數
-                            }
-                        });
-                    };
-                    
-                    // 定時檢查狀態（每0.3秒檢查一次，提高進度更新頻率）
-                    const pollInterval = setInterval(checkStatus, 300);
-                    
-                    // 立即檢查一次
-                    checkStatus();
-                }
-                
-                // 更新進度顯示函數
-                function updateProgress(progress) {
-                    if (!progress) return;
-                    
-                    const stage = progress.stage || "處理中";
-                    const percentage = progress.percentage || 0;
-                    const message = progress.message || "請稍候...";
-                    
-                    // 更新文字信息
-                    $("#progressStage").text(`${stage} (${percentage}%)`);
-                    $("#progressMessage").text(message);
-                    
-                    // 以更快的動畫方式更新進度條，讓變化更流暢
-                    $("#progressBarFill").stop(true, true).animate({
-                        width: `${percentage}%`
-                    }, 200); // 減少動畫時間以更快地反應變化
-                    
-                    // 根據不同階段更新顏色和階段指示器
-                    let stageColor = "#c4302b"; // 默認紅色
-                    
-                    // 重置所有階段指示器
-                    $(".stage-step").removeClass("active completed");
-                    
-                    // 根據當前階段更新階段指示器
-                    if (stage === "初始化" || stage.includes("初始化")) {
-                        stageColor = "#6c757d"; // 灰色
-                        $("#stage-init").addClass("active");
-                    } else if (stage === "下載") {
-                        stageColor = "#3498db"; // 藍色
-                        $("#stage-init").addClass("completed");
-                        $("#stage-download").addClass("active");
-                    } else if (stage === "轉錄") {
-                        stageColor = "#2ecc71"; // 綠色
-                        $("#stage-init, #stage-download").addClass("completed");
-                        $("#stage-transcribe").addClass("active");
-                    } else if (stage === "摘要") {
-                        stageColor = "#f39c12"; // 橙色
-                        $("#stage-init, #stage-download, #stage-transcribe").addClass("completed");
-                        $("#stage-summary").addClass("active");
-                    } else if (stage === "完成") {
-                        stageColor = "#27ae60"; // 深綠色
-                        $("#stage-init, #stage-download, #stage-transcribe, #stage-summary").addClass("completed");
-                        $("#stage-complete").addClass("active");
-                    }
-                    
-                    // 更新進度條顏色
-                    $("#progressBarFill").css("background-color", stageColor);
-                    
-                    // 添加處理階段的詳細描述
-                    let stageDetail = "";
-                    if (stage === "下載") {
-                        if (percentage < 30) {
-                            stageDetail = "下載影片中...";
-                        } else {
-                            stageDetail = "提取音訊中...";
-                        }
-                    } else if (stage === "轉錄") {
-                        if (percentage < 50) {
-                            stageDetail = "準備轉錄中...";
-                        } else {
-                            stageDetail = "影片內容轉文字中...";
-                        }
-                    } else if (stage === "摘要") {
-                        if (percentage < 85) {
-                            stageDetail = "分析內容中...";
-                        } else {
-                            stageDetail = "生成摘要中...";
-                        }
-                    }
-                    
-                    // 如果有詳細描述則更新
-                    if (stageDetail && !message.includes(stageDetail)) {
-                        $("#progressMessage").text(`${message} (${stageDetail})`);
-                    }
-                }
-                
-                // 顯示結果函數
-                function displayResults(taskData) {
-                    const result = taskData.result;
-                    
-                    // 顯示基本資訊
-                    $("#taskInfo").text(`任務 ID: ${taskData.id}, 處理時間: ${formatTime(result.processing_time)}`);
-                    $("#title").text(result.title || "無標題");
-                    
-                    // 先移除任何已存在的模型信息
-                    $(".model-info").remove();
-                    
-                    // 顯示使用的模型信息（只添加一次）
-                    const modelInfo = $("<div>").addClass("model-info").text(`使用模型: ${result.model_used || "未知"}`);
-                    $("#title").after(modelInfo);
-                    
-                    // 渲染摘要內容
-                    const summaryContent = result.summary || "無摘要內容";
-                    $("#summary").html(marked.parse(summaryContent));
-                    
-                    // 顯示下載按鈕
-                    $("#download-btn").show();
-                    $("#download-docx-btn").show();
-                    $("#download-transcript-btn").show();
-                    
-                    // 下載摘要按鈕點擊處理
-                    $("#download-btn").off("click").on("click", function(e) {
-                        e.preventDefault();
-                        downloadAsFile(summaryContent, (result.title || "summary"), "md", "text/markdown");
-                        return false;
-                    });
-                    
-                    // 下載 Word 文檔按鈕點擊處理
-                    $("#download-docx-btn").off("click").on("click", function(e) {
-                        e.preventDefault();
-                        downloadDocx(taskData.id);
-                        return false;
-                    });
-                    
-                    // 下載逐字稿按鈕點擊處理
-                    $("#download-transcript-btn").off("click").on("click", function(e) {
-                        e.preventDefault();
-                        
-                        if (!result.transcript) {
-                            alert("找不到逐字稿內容");
-                            return false;
-                        }
-                        
-                        downloadAsFile(result.transcript, (result.title || "transcript"), "txt", "text/plain", "_逐字稿");
-                        return false;
-                    });
-                }
-                
-                // 通用下載文件函數
-                function downloadAsFile(content, title, extension, mimeType, suffix = "") {
-                    try {
-                        // 清理檔名，只保留基本字母數字和空格
-                        const safeTitle = title.replace(/[^\\w\\s-]/g, "").trim().replace(/\\s+/g, "_");
-                        const filename = `${safeTitle}${suffix}.${extension}`;
-                        
-                        // 處理可能的編碼問題，確保內容為 UTF-8
-                        const encoder = new TextEncoder();
-                        const data = encoder.encode(content);
-                        
-                        // 創建 Blob 物件，明確指定 UTF-8 編碼
-                        const blob = new Blob([data], {type: `${mimeType};charset=utf-8`});
-                        const url = window.URL.createObjectURL(blob);
-                        
-                        // 創建並點擊下載連結
-                        const a = document.createElement("a");
-                        a.href = url;
-                        a.download = filename;
-                        a.style.display = "none";
-                        
-                        // 加入到文檔，點擊後移除
-                        document.body.appendChild(a);
-                        a.click();
-                        
-                        // 清理資源
-                        setTimeout(function() {
-                            document.body.removeChild(a);
-                            window.URL.revokeObjectURL(url);
-                        }, 100);
-                    } catch (error) {
-                        console.error("下載檔案失敗:", error);
-                        alert("下載失敗: " + error.message);
-                    }
-                }
-                
-                // DOCX 下載函數
-                function downloadDocx(taskId) {
-                    try {
-                        // 創建下載連結
-                        const downloadUrl = `/api/download-docx/${taskId}`;
-                        
-                        // 創建臨時 a 標籤進行下載
-                        const a = document.createElement("a");
-                        a.href = downloadUrl;
-                        a.style.display = "none";
-                        
-                        // 加入到文檔，點擊後移除
-                        document.body.appendChild(a);
-                        a.click();
-                        
-                        // 清理資源
-                        setTimeout(function() {
-                            document.body.removeChild(a);
-                        }, 100);
-                        
-                    } catch (error) {
-                        console.error("下載 DOCX 失敗:", error);
-                        alert("下載 Word 文檔失敗: " + error.message);
-                    }
-                }
-                
-                // 格式化時間函數
-                function formatTime(seconds) {
-                    if (!seconds) return "未知時間";
-                    return `${Math.floor(seconds / 60)}分 ${Math.round(seconds % 60)}秒`;
-                }
-                
-                // 檢查 cookies 狀態
-                function checkCookiesStatus() {
-                    $.ajax({
-                        url: "/api/cookies-status",
-                        type: "GET",
-                        success: function(data) {
-                            if (data.status === "available") {
-                                $("#cookiesStatus").html(`<span style="color: green;">✓ Cookies 已上傳 (${data.upload_time})</span>`);
-                                $("#clearCookiesBtn").show();
-                            } else {
-                                $("#cookiesStatus").html(`<span style="color: #666;">尚未上傳 cookies 文件</span>`);
-                                $("#clearCookiesBtn").hide();
-                            }
-                        },
-                        error: function() {
-                            $("#cookiesStatus").html(`<span style="color: #666;">無法檢查 cookies 狀態</span>`);
-                        }
-                    });
-                }
-                
-                // 上傳 cookies 文件
-                function uploadCookiesFile(file) {
-                    const formData = new FormData();
-                    formData.append('cookies_file', file);
-                    
-                    $("#cookiesStatus").html(`<span style="color: blue;">正在上傳...</span>`);
-                    
-                    $.ajax({
-                        url: "/api/upload-cookies",
-                        type: "POST",
-                        data: formData,
-                        processData: false,
-                        contentType: false,
-                        success: function(data) {
-                            if (data.status === "success") {
-                                $("#cookiesStatus").html(`<span style="color: green;">✓ ${data.message}</span>`);
-                                $("#clearCookiesBtn").show();
-                            } else {
-                                $("#cookiesStatus").html(`<span style="color: red;">✗ ${data.message}</span>`);
-                                $("#clearCookiesBtn").hide();
-                            }
-                        },
-                        error: function() {
-                            $("#cookiesStatus").html(`<span style="color: red;">✗ 上傳失敗</span>`);
-                        }
-                    });
-                }
-                
-            });
-    </script>
-
-    <!-- Cookies 幫助 Modal -->
-    <div id="cookieHelpModal" class="modal">
-        <div class="modal-content">
-            <div class="modal-header">
-                <h2>如何獲取 YouTube Cookies</h2>
-                <span class="close-btn">&times;</span>
-            </div>
-            <div class="modal-body">
-                <p>為了讀取會員專屬影片或有年齡限制的內容，需要提供您的 YouTube Cookies。請按照以下步驟操作：</p>
-                
-                <ol class="step-list">
-                    <li>
-                        <span class="step-title">安裝瀏覽器擴展</span>
-                        我們推薦使用開源安全的 <strong>Get-cookies.txt-LOCALLY</strong> 擴展。
-                        <div style="margin-top: 10px;">
-                            <a href="https://github.com/kairi003/Get-cookies.txt-LOCALLY" target="_blank" class="ref-link">
-                                前往 GitHub 下載擴展
-                            </a>
-                        </div>
-                        <p style="font-size: 0.9em; color: #666; margin-top: 8px;">
-                            支援 Chrome、Edge、Firefox 等主流瀏覽器。如果不熟悉 GitHub，請查看該頁面下方的 "Installation" 說明。
-                        </p>
-                    </li>
-                    <li>
-                        <span class="step-title">登入 YouTube</span>
-                        在安裝了擴展的瀏覽器中，前往 <a href="https://www.youtube.com" target="_blank">YouTube</a> 並確認您已登入帳號。
-                    </li>
-                    <li>
-                        <span class="step-title">導出 Cookies</span>
-                        點擊瀏覽器工具列上的 Cookies 擴展圖示，然後點擊 "Export" 按鈕。這將下載一個 <code>cookies.txt</code> 文件到您的電腦。
-                    </li>
-                    <li>
-                        <span class="step-title">上傳文件</span>
-                        回到本頁面，在 "YouTube Cookies 文件" 區域點擊 "選擇檔案"，上傳剛才下載的 <code>cookies.txt</code>。
-                    </li>
-                </ol>
-                
-                <div class="warning-box">
-                    <strong>⚠️ 安全提示：</strong>
-                    Cookies 文件包含您的登入憑證。本服務僅在伺服器端暫時使用它來讀取影片內容，不會永久儲存或洩漏給第三方。請勿將 Cookies 文件分享給不信任的人。
-                </div>
-            </div>
-        </div>
-    </div>
-</body>
-</html>
-    """
-    return HTMLResponse(content=html_content)
+# 上傳 cookies 時每次讀取的位元組數
+_COOKIE_UPLOAD_CHUNK_SIZE = 64 * 1024
 
 # 新增：Cookies 上傳端點
 @app.post("/api/upload-cookies")
@@ -1974,36 +923,48 @@ async def upload_cookies(cookies_file: UploadFile = File(...)):
         if not file_validation["valid"]:
             return {"status": "error", "message": file_validation["error"]}
         
-        # 讀取文件內容
-        content = await cookies_file.read()
-        content_str = content.decode('utf-8')
-        
-        # 驗證 cookies 文件內容
-        content_validation = CookiesValidator.validate_cookies_content(content_str)
-        if not content_validation["valid"]:
-            return {"status": "error", "message": content_validation["error"]}
-        
-        # 保存 cookies 文件（固定為 cookies.txt 以便系統識別）
-        # 即使使用者上傳任意檔名，我們統一存儲為 cookies.txt，確保被系統正確識別
-        target_filename = "cookies.txt"
-        
-        # 清理現有的 cookies 文件
-        existing_files = [f for f in os.listdir(AppConfig.COOKIES_DIR) 
-                         if not f.startswith('.') and os.path.isfile(os.path.join(AppConfig.COOKIES_DIR, f))]
-        for old_file in existing_files:
-            try:
-                os.remove(os.path.join(AppConfig.COOKIES_DIR, old_file))
-                logger.info(f"刪除舊的 cookies 文件: {old_file}")
-            except Exception as e:
-                logger.warning(f"刪除舊 cookies 文件失敗: {e}")
-        
-        cookies_path = os.path.join(AppConfig.COOKIES_DIR, target_filename)
-        
-        with open(cookies_path, "w", encoding="utf-8") as f:
-            f.write(content_str)
+        # 分塊讀取並寫入暫存檔，同時逐塊驗證內容，不需在記憶體中保留整個文件；
+        # 暫存檔以 . 開頭，不會被當作 cookies 文件使用
+        tmp_path = os.path.join(AppConfig.COOKIES_DIR, f".upload-{uuid.uuid4().hex}.tmp")
+        parser = CookiesContentParser()
+        received = 0
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                while chunk := await cookies_file.read(_COOKIE_UPLOAD_CHUNK_SIZE):
+                    # 客戶端未提供檔案大小時，仍以實際讀取的位元組數限制大小
+                    received += len(chunk)
+                    if received > AppConfig.MAX_FILE_SIZE:
+                        return {"status": "error", "message": f"檔案大小超過限制 ({AppConfig.MAX_FILE_SIZE} bytes)"}
+                    f.write(parser.feed(chunk))
+            
+            # 驗證 cookies 文件內容
+            content_validation = parser.finalize()
+            if not content_validation["valid"]:
+                return {"status": "error", "message": content_validation["error"]}
+            
+            # 保存 cookies 文件（固定為 cookies.txt 以便系統識別）
+            # 即使使用者上傳任意檔名，我們統一存儲為 cookies.txt，確保被系統正確識別
+            target_filename = "cookies.txt"
+            
+            # 清理現有的 cookies 文件
+            existing_files = [f for f in os.listdir(AppConfig.COOKIES_DIR) 
+                             if not f.startswith('.') and os.path.isfile(os.path.join(AppConfig.COOKIES_DIR, f))]
+            for old_file in existing_files:
+                try:
+                    os.remove(os.path.join(AppConfig.COOKIES_DIR, old_file))
+                    logger.info(f"刪除舊的 cookies 文件: {old_file}")
+                except Exception as e:
+                    logger.warning(f"刪除舊 cookies 文件失敗: {e}")
+            
+            cookies_path = os.path.join(AppConfig.COOKIES_DIR, target_filename)
+            os.replace(tmp_path, cookies_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
         
         # 清理 cookies 文件
         CookiesValidator.sanitize_cookies_file(cookies_path)
+        invalidate_cookie_path()
         
         logger.info(f"Cookies 文件上傳成功: {cookies_path}")
         
@@ -2021,7 +982,18 @@ async def upload_cookies(cookies_file: UploadFile = File(...)):
 # 檢查 cookies 狀態端點
 @app.get("/api/cookies-status")
 async def get_cookies_status():
-    """檢查當前 cookies 文件狀態"""
+    """檢查當前 cookies 文件狀態（結果快取 _COOKIE_STATUS_TTL 秒，頁面載入時的連續請求不必重複讀取目錄）"""
+    global _cookie_status_cache
+    now = time.monotonic()
+    if _cookie_status_cache is not None and now - _cookie_status_cache[0] < _COOKIE_STATUS_TTL:
+        return _cookie_status_cache[1]
+    
+    status = _read_cookies_status()
+    _cookie_status_cache = (now, status)
+    return status
+
+def _read_cookies_status() -> Dict[str, Any]:
+    """讀取 cookies 目錄，返回目前的 cookies 文件狀態"""
     # 檢查 cookies 目錄中的任何 .txt 文件
     if os.path.exists(AppConfig.COOKIES_DIR):
         all_files = [f for f in os.listdir(AppConfig.COOKIES_DIR) 
@@ -2070,6 +1042,7 @@ async def delete_cookies():
                 os.remove(cookies_path)
                 deleted_files.append(name)
                 logger.info(f"已刪除 cookies 文件: {name}")
+            invalidate_cookie_path()
         
         if deleted_files:
             return {"status": "success", "message": f"已刪除 cookies 文件: {', '.join(deleted_files)}"}
@@ -2117,9 +1090,18 @@ if __name__ == "__main__":
         # 確保必要目錄存在
         AppConfig.ensure_directories()
             
-        print("正在啟動 uvicorn 服務器...")
+        # 多 worker 模式下各進程不共享記憶體，需要 Redis 共享任務狀態
+        if AppConfig.WORKERS > 1 and not AppConfig.REDIS_URL:
+            print("警告: 未設定 REDIS_URL，多個 worker 之間無法共享任務狀態")
+        
+        print(f"正在啟動 uvicorn 服務器 (env: {AppConfig.ENV}, workers: {AppConfig.WORKERS})...")
+        # reload 與多 worker 不相容，只在開發環境單 worker 的除錯模式下啟用
+        # loop/http="auto" 在已安裝 uvloop、httptools 時使用 C 實作，否則退回 asyncio、h11
+        # 生產環境關閉存取日誌，省去每個請求（包括輪詢）的日誌處理
         uvicorn.run("main:app", host=AppConfig.HOST, port=AppConfig.PORT, 
-                   reload=AppConfig.DEBUG, log_level="info")
+                   reload=AppConfig.DEBUG and not AppConfig.IS_PRODUCTION and AppConfig.WORKERS == 1,
+                   workers=AppConfig.WORKERS, loop="auto", http="auto", log_level="info",
+                   access_log=not AppConfig.IS_PRODUCTION)
         print("服務器已關閉")
     except Exception as e:
         print(f"啟動服務器失敗: {e}")
@@ -3,10 +3,12 @@
 """
 import re
 import os
+import codecs
 import hashlib
 import secrets
 from urllib.parse import urlparse
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple
 import logging
 from config import AppConfig
 
@@ -24,35 +26,37 @@ class SecurityValidator:
         r'^https?://(?:www\.)?youtube\.com/shorts/[\w\-_]+',
     ]
     
+    # 預先編譯為單一正則，每個 URL 只需匹配一次
+    _YOUTUBE_URL_RE = re.compile("|".join(f"(?:{pattern})" for pattern in YOUTUBE_URL_PATTERNS), re.IGNORECASE)
+    
+    # 從各種 YouTube URL 形式中提取 11 位影片 ID
+    _YOUTUBE_ID_RE = re.compile(r"(?:youtu\.be/|[?&]v=|/shorts/|/embed/|/v/)([A-Za-z0-9_-]{11})")
+    
     # OpenAI API 金鑰模式
     OPENAI_API_KEY_PATTERN = r'^sk-[a-zA-Z0-9]{48}$'
     
     # Google API 金鑰模式
     GOOGLE_API_KEY_PATTERN = r'^[a-zA-Z0-9\-_]{39}$'
     
+    # API 金鑰允許的字符
+    _API_KEY_CHARS_RE = re.compile(r'[a-zA-Z0-9\-_]+')
+    
     @classmethod
     def validate_youtube_url(cls, url: str) -> Dict[str, Any]:
-        """驗證 YouTube URL"""
-        if not url:
-            return {"valid": False, "error": "URL 不能為空"}
-        
-        if len(url) > AppConfig.MAX_URL_LENGTH:
-            return {"valid": False, "error": "URL 長度超過限制"}
-        
-        # 檢查 URL 格式
-        try:
-            parsed = urlparse(url)
-            if not parsed.scheme or not parsed.netloc:
-                return {"valid": False, "error": "無效的 URL 格式"}
-        except Exception:
-            return {"valid": False, "error": "URL 解析失敗"}
-        
-        # 檢查是否為 YouTube URL
-        for pattern in cls.YOUTUBE_URL_PATTERNS:
-            if re.match(pattern, url, re.IGNORECASE):
-                return {"valid": True, "normalized_url": url.strip()}
-        
-        return {"valid": False, "error": "請提供有效的 YouTube URL"}
+        """驗證 YouTube URL（結果經 LRU 快取，每次返回新的 dict）"""
+        # 請求內容中的 URL 可能不是字串（例如列表），不能交給快取函數處理
+        if not isinstance(url, str):
+            return {"valid": False, "error": "URL 不能為空" if not url else "URL 必須是字串"}
+        valid, value = _check_youtube_url(url)
+        if valid:
+            return {"valid": True, "normalized_url": value}
+        return {"valid": False, "error": value}
+    
+    @classmethod
+    def canonical_video_key(cls, url: str) -> str:
+        """以影片 ID 作為影片的唯一標識，忽略分享連結中的時間戳、來源等參數"""
+        match = cls._YOUTUBE_ID_RE.search(url)
+        return f"yt:{match.group(1)}" if match else url.strip().lower()
     
     @classmethod
     def validate_openai_api_key(cls, api_key: str) -> Dict[str, Any]:
@@ -70,7 +74,7 @@ class SecurityValidator:
             return {"valid": False, "error": "OpenAI API 金鑰格式錯誤"}
         
         # 檢查是否包含危險字符
-        if not re.match(r'^[a-zA-Z0-9\-_]+$', api_key):
+        if not cls._API_KEY_CHARS_RE.fullmatch(api_key):
             return {"valid": False, "error": "API 金鑰包含無效字符"}
         
         return {"valid": True, "sanitized_key": api_key}
@@ -87,7 +91,7 @@ class SecurityValidator:
             return {"valid": False, "error": "Google API 金鑰長度不足"}
         
         # 檢查是否包含危險字符
-        if not re.match(r'^[a-zA-Z0-9\-_]+$', api_key):
+        if not cls._API_KEY_CHARS_RE.fullmatch(api_key):
             return {"valid": False, "error": "Google API 金鑰包含無效字符"}
         
         return {"valid": True, "sanitized_key": api_key}
@@ -144,101 +148,73 @@ class SecurityValidator:
         return hashlib.sha256(data.encode()).hexdigest()[:16]
 
 
+@lru_cache(maxsize=1024)
+def _check_youtube_url(url: str) -> Tuple[bool, str]:
+    """驗證 YouTube URL，返回 (是否有效, 標準化 URL 或錯誤訊息)；批量請求中重複的 URL 只需驗證一次"""
+    if not url:
+        return False, "URL 不能為空"
+    
+    if len(url) > AppConfig.MAX_URL_LENGTH:
+        return False, "URL 長度超過限制"
+    
+    # 檢查 URL 格式
+    try:
+        parsed = urlparse(url)
+        if not parsed.scheme or not parsed.netloc:
+            return False, "無效的 URL 格式"
+    except Exception:
+        return False, "URL 解析失敗"
+    
+    # 檢查是否為 YouTube URL
+    if SecurityValidator._YOUTUBE_URL_RE.match(url):
+        return True, url.strip()
+    
+    return False, "請提供有效的 YouTube URL"
+
+
 class CookiesValidator:
     """Cookies 文件驗證器"""
     
     REQUIRED_YOUTUBE_DOMAINS = ['.youtube.com', 'youtube.com']
     REQUIRED_COOKIES = ['VISITOR_INFO1_LIVE', 'YSC']
     
-    @classmethod
     @classmethod
     def validate_cookies_content(cls, content: str) -> Dict[str, Any]:
         """驗證 cookies 文件內容 (支援 Netscape 和 JSON 格式)"""
-        if not content:
-            return {"valid": False, "error": "Cookies 文件內容為空"}
-        
-        # 嘗試解析為 JSON 格式 (例如 EditThisCookie 導出的格式)
-        if content.strip().startswith('[') or content.strip().startswith('{'):
-            try:
-                import json
-                cookies_data = json.loads(content)
-                if isinstance(cookies_data, dict):
-                    # 某些格式可能包裹在一個對象中
-                    if 'cookies' in cookies_data:
-                        cookies_data = cookies_data['cookies']
-                    else:
-                        # 單個 cookie 對象?
-                        cookies_data = [cookies_data]
-                
-                if not isinstance(cookies_data, list):
-                    pass # 不是列表，繼續嘗試文本解析
-                else:
-                    valid_entries = 0
-                    has_youtube_domain = False
-                    has_required_cookies = False
-                    
-                    for cookie in cookies_data:
-                        if not isinstance(cookie, dict):
-                            continue
-                            
-                        domain = cookie.get('domain', '')
-                        name = cookie.get('name', '')
-                        
-                        # 檢查 YouTube 域名
-                        if any(yt_domain in domain for yt_domain in cls.REQUIRED_YOUTUBE_DOMAINS):
-                            has_youtube_domain = True
-                        
-                        # 檢查必要的 cookies
-                        if name in cls.REQUIRED_COOKIES:
-                            has_required_cookies = True
-                            
-                        valid_entries += 1
-                    
-                    if valid_entries > 0:
-                        if not has_youtube_domain:
-                            return {"valid": False, "error": "Cookies (JSON) 不包含 YouTube 域名"}
-                        
-                        return {
-                            "valid": True,
-                            "entries_count": valid_entries,
-                            "has_youtube_domain": has_youtube_domain,
-                            "has_required_cookies": has_required_cookies,
-                            "format": "json"
-                        }
-            except Exception:
-                # JSON 解析失敗，回退到文本解析
-                pass
-
+        parser = CookiesContentParser()
+        parser.feed_text(content)
+        return parser.finalize()
+    
+    @classmethod
+    def _validate_json_content(cls, content: str) -> Optional[Dict[str, Any]]:
+        """以 JSON 格式驗證 (例如 EditThisCookie 導出的格式)，不是有效的 cookies JSON 時返回 None"""
         try:
-            lines = content.strip().split('\n')
+            import json
+            cookies_data = json.loads(content)
+            if isinstance(cookies_data, dict):
+                # 某些格式可能包裹在一個對象中
+                if 'cookies' in cookies_data:
+                    cookies_data = cookies_data['cookies']
+                else:
+                    # 單個 cookie 對象?
+                    cookies_data = [cookies_data]
+            
+            if not isinstance(cookies_data, list):
+                return None  # 不是列表，繼續嘗試文本解析
+            
             valid_entries = 0
             has_youtube_domain = False
             has_required_cookies = False
             
-            for line in lines:
-                line = line.strip()
-                # 修正: 支援 #HttpOnly_ 前綴的 cookies，不要跳過它們
-                if not line or (line.startswith('#') and not line.startswith('#HttpOnly_')):
+            for cookie in cookies_data:
+                if not isinstance(cookie, dict):
                     continue
                 
-                # 解析 cookies 格式
-                parts = line.split('\t')
-                
-                # 有些編輯器可能會把 tab 轉成 spaces，做一些寬容處理?
-                # 但標準 Netscape 必須是 tab。yt-dlp 對格式要求較嚴格。
-                # 如果 split('\t') 失敗，且看起來像是用空格分隔的，可以嘗試處理 (風險較大，暫不處理)
-                
-                if len(parts) < 6:
-                    continue
-                
-                domain = parts[0]
-                # 對於 HttpOnly cookies，域名可能帶有 #HttpOnly_ 前綴，檢查時應考慮
-                clean_domain = domain.replace('#HttpOnly_', '')
-                
-                name = parts[5] if len(parts) > 5 else ""
+                domain = cookie.get('domain', '')
+                name = cookie.get('name', '')
                 
                 # 檢查 YouTube 域名
-                if any(yt_domain in clean_domain for yt_domain in cls.REQUIRED_YOUTUBE_DOMAINS):
+                if any(yt_domain in domain for yt_domain in cls.REQUIRED_YOUTUBE_DOMAINS):
                     has_youtube_domain = True
                 
                 # 檢查必要的 cookies
@@ -248,22 +224,21 @@ class CookiesValidator:
                 valid_entries += 1
             
             if valid_entries == 0:
-                return {"valid": False, "error": "找不到有效的 cookies 條目 (請確保使用 Netscape 格式或 JSON 格式)"}
+                return None
             
             if not has_youtube_domain:
-                return {"valid": False, "error": "Cookies 文件不包含 YouTube 域名"}
+                return {"valid": False, "error": "Cookies (JSON) 不包含 YouTube 域名"}
             
             return {
                 "valid": True,
                 "entries_count": valid_entries,
                 "has_youtube_domain": has_youtube_domain,
                 "has_required_cookies": has_required_cookies,
-                "format": "netscape"
+                "format": "json"
             }
-            
-        except Exception as e:
-            logger.error(f"驗證 cookies 內容時發生錯誤: {e}")
-            return {"valid": False, "error": "Cookies 文件格式錯誤"}
+        except Exception:
+            # JSON 解析失敗，回退到文本解析
+            return None
     
     @classmethod
     def sanitize_cookies_file(cls, file_path: str) -> bool:
@@ -292,4 +267,112 @@ class CookiesValidator:
             
         except Exception as e:
             logger.error(f"清理 cookies 文件時發生錯誤: {e}")
-            return False
\ No newline at end of file
+            return False
+
+
+class CookiesContentParser:
+    """逐塊驗證上傳的 cookies 內容
+    
+    Netscape 格式逐行統計，不需保留整個文件；JSON 格式須取得完整內容才能解析，會暫存已讀取的文字
+    """
+    
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._is_json: Optional[bool] = None
+        self._json_parts: List[str] = []
+        self._pending = ""
+        self._received = False
+        self.valid_entries = 0
+        self.has_youtube_domain = False
+        self.has_required_cookies = False
+    
+    def feed(self, chunk: bytes) -> str:
+        """解碼並處理一段原始位元組，返回解碼後的文字（UTF-8 無效時拋出 UnicodeDecodeError）"""
+        text = self._decoder.decode(chunk)
+        self.feed_text(text)
+        return text
+    
+    def feed_text(self, text: str):
+        """處理一段文字"""
+        self._received = self._received or bool(text)
+        if self._is_json is None:
+            stripped = text.lstrip()
+            if not stripped:
+                self._pending += text
+                return
+            self._is_json = stripped[0] in "[{"
+        
+        if self._is_json:
+            self._json_parts.append(text)
+            return
+        
+        lines = (self._pending + text).split('\n')
+        self._pending = lines.pop()
+        for line in lines:
+            self._process_line(line)
+    
+    def _process_line(self, line: str):
+        """統計一行 Netscape 格式的 cookie"""
+        line = line.strip()
+        # 修正: 支援 #HttpOnly_ 前綴的 cookies，不要跳過它們
+        if not line or (line.startswith('#') and not line.startswith('#HttpOnly_')):
+            return
+        
+        # 解析 cookies 格式（標準 Netscape 必須以 tab 分隔，yt-dlp 對格式要求較嚴格）
+        parts = line.split('\t')
+        if len(parts) < 6:
+            return
+        
+        # 對於 HttpOnly cookies，域名可能帶有 #HttpOnly_ 前綴，檢查時應考慮
+        clean_domain = parts[0].replace('#HttpOnly_', '')
+        name = parts[5]
+        
+        # 檢查 YouTube 域名
+        if any(yt_domain in clean_domain for yt_domain in CookiesValidator.REQUIRED_YOUTUBE_DOMAINS):
+            self.has_youtube_domain = True
+        
+        # 檢查必要的 cookies
+        if name in CookiesValidator.REQUIRED_COOKIES:
+            self.has_required_cookies = True
+        
+        self.valid_entries += 1
+    
+    def finalize(self) -> Dict[str, Any]:
+        """結束輸入並返回與 CookiesValidator.validate_cookies_content 相同格式的驗證結果"""
+        try:
+            self.feed_text(self._decoder.decode(b"", final=True))
+            
+            if not self._received:
+                return {"valid": False, "error": "Cookies 文件內容為空"}
+            
+            if self._is_json:
+                content = "".join(self._json_parts)
+                self._json_parts = []
+                result = CookiesValidator._validate_json_content(content)
+                if result is not None:
+                    return result
+                # 不是有效的 cookies JSON，改以 Netscape 格式逐行解析
+                self._is_json = False
+                self.feed_text(content)
+            
+            if self._pending:
+                self._process_line(self._pending)
+                self._pending = ""
+            
+            if self.valid_entries == 0:
+                return {"valid": False, "error": "找不到有效的 cookies 條目 (請確保使用 Netscape 格式或 JSON 格式)"}
+            
+            if not self.has_youtube_domain:
+                return {"valid": False, "error": "Cookies 文件不包含 YouTube 域名"}
+            
+            return {
+                "valid": True,
+                "entries_count": self.valid_entries,
+                "has_youtube_domain": self.has_youtube_domain,
+                "has_required_cookies": self.has_required_cookies,
+                "format": "netscape"
+            }
+            
+        except Exception as e:
+            logger.error(f"驗證 cookies 內容時發生錯誤: {e}")
+            return {"valid": False, "error": "Cookies 文件格式錯誤"}
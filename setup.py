@@ -1,11 +1,20 @@
+import os
 from setuptools import setup, find_packages
 
 with open('requirements.txt') as f:
     requirements = f.read().splitlines()
 
+# 可選：設定 YT_SUMMARIZE_MYPYC=1 時以 mypyc 編譯 DOCX 轉換器（需要安裝 mypy）
+# 編譯後的擴展模組會優先於同名 .py 被導入，未編譯時照常使用純 Python 版本
+ext_modules = []
+if os.getenv("YT_SUMMARIZE_MYPYC") == "1":
+    from mypyc.build import mypycify
+    ext_modules = mypycify(["improved_md_to_docx.py"])
+
 setup(
     name="yt_summarize",
     version="0.1.0",
     packages=find_packages(),
     install_requires=requirements,
-) 
\ No newline at end of file
+    ext_modules=ext_modules,
+)
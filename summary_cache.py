@@ -0,0 +1,78 @@
+"""
+摘要結果快取
+以影片 URL 與模型選項為鍵，將完成的摘要保存為 JSON 檔案，重複提交同一影片時直接返回結果
+"""
+import os
+import re
+import time
+import hashlib
+import logging
+import orjson
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_KEY_RE = re.compile(r"[0-9a-f]{64}")
+
+
+class SummaryCache:
+    """以檔案保存摘要結果，每個鍵對應一個 JSON 檔案並在 TTL 後失效"""
+
+    def __init__(self, cache_dir: str, ttl: int):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(url: str, **options) -> str:
+        """由標準化 URL 與影響結果的選項計算快取鍵"""
+        payload = orjson.dumps({"url": url, **options}, option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(payload).hexdigest()
+
+    @staticmethod
+    def is_valid_key(key: str) -> bool:
+        """檢查快取鍵格式，避免路徑穿越"""
+        return bool(_KEY_RE.fullmatch(key))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """讀取未過期的快取結果"""
+        if self.ttl <= 0:
+            return None
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                self.delete(key)
+                return None
+            with open(path, "rb") as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"讀取摘要快取失敗: {key} - {e}")
+            return None
+
+    def set(self, key: str, result: Dict[str, Any]):
+        """寫入快取結果（先寫暫存檔再替換，避免讀到不完整的檔案）"""
+        if self.ttl <= 0:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(orjson.dumps(result))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"寫入摘要快取失敗: {key} - {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def delete(self, key: str) -> bool:
+        """刪除快取結果"""
+        try:
+            os.remove(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
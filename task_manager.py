@@ -2,19 +2,28 @@
 任務管理器
 """
 import time
+import asyncio
+import hashlib
+import orjson
 import threading
 import logging
-from typing import Dict, Any, Optional, List
+import multiprocessing
+from typing import Dict, Any, Optional, List, Tuple, Callable
+from collections import OrderedDict, Counter
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from dataclasses import dataclass, field
-import json
 import os
 from config import AppConfig
+from task_store import RedisTaskStore
+from task_writer import TaskFileWriter, write_tasks_file
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# 終止狀態：進入這些狀態後任務不會再變化
+TERMINAL_STATUSES = ("complete", "error", "cancelled")
+
+@dataclass(slots=True)
 class Task:
     """任務數據類"""
     id: str
@@ -32,6 +41,7 @@ class Task:
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
     is_cancelled: bool = False
+    batch_id: str = ""  # 所屬批量處理 ID，單一任務為空
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
     
@@ -51,24 +61,170 @@ class Task:
             "result": self.result,
             "error": self.error,
             "is_cancelled": self.is_cancelled,
+            "batch_id": self.batch_id,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat()
         }
+    
+    @classmethod
+    def from_dict(cls, task_data: Dict[str, Any]) -> "Task":
+        """從字典還原任務"""
+        task = cls(
+            id=task_data['id'],
+            status=task_data['status'],
+            url=task_data['url'],
+            timestamp=task_data['timestamp'],
+            keep_audio=task_data.get('keep_audio', False),
+            openai_api_key=task_data.get('openai_api_key', ''),
+            google_api_key=task_data.get('google_api_key', ''),
+            model_type=task_data.get('model_type', 'auto'),
+            gemini_model=task_data.get('gemini_model', 'gemini-3-flash-preview'),
+            openai_model=task_data.get('openai_model', 'gpt-4o'),
+            whisper_model=task_data.get('whisper_model', 'gpt-4o-transcribe'),
+            progress=task_data.get('progress', {}),
+            result=task_data.get('result'),
+            error=task_data.get('error'),
+            is_cancelled=task_data.get('is_cancelled', False),
+            batch_id=task_data.get('batch_id', '')
+        )
+        
+        # 恢復時間戳
+        if 'created_at' in task_data:
+            task.created_at = datetime.fromisoformat(task_data['created_at'])
+        if 'updated_at' in task_data:
+            task.updated_at = datetime.fromisoformat(task_data['updated_at'])
+        
+        return task
 
 
 class TaskManager:
     """任務管理器"""
     
     def __init__(self):
-        self.tasks: Dict[str, Task] = {}
-        self.executor = ThreadPoolExecutor(max_workers=AppConfig.MAX_CONCURRENT_TASKS)
+        # 按最近使用順序排列，超過 MAX_TASKS 時淘汰最舊的已結束任務
+        self.tasks: "OrderedDict[str, Task]" = OrderedDict()
+        # 任務結果序列化後的大小，任務數量之外也按總位元組數淘汰
+        self._result_sizes: Dict[str, int] = {}
+        self._result_bytes = 0
+        # 各狀態的任務數量，隨狀態轉換增減，統計時無需掃描所有任務
+        self._status_counts: Counter = Counter()
+        # 任務序列化後的 JSON 與 ETag，任務被修改時失效
+        self._snapshot_cache: Dict[str, Tuple[str, bytes]] = {}
+        # 執行中任務的取消事件，處理線程在檢查點查詢，取消時立即設置
+        self._cancel_events: Dict[str, threading.Event] = {}
+        # 上次向共享存儲查詢遠端取消的時間（monotonic），避免每次進度回調都查詢 Redis
+        self._cancel_checked_at: Dict[str, float] = {}
+        # 從共享存儲讀取的其他 worker 任務: task_id -> (讀取時間, 任務)，短時間內重複查詢直接重用
+        self._remote_cache: "OrderedDict[str, Tuple[float, Task]]" = OrderedDict()
+        # 摘要處理專用線程池，與 FastAPI/AnyIO 的共用線程池分開
+        self.executor = ThreadPoolExecutor(max_workers=AppConfig.MAX_CONCURRENT_TASKS,
+                                           thread_name_prefix="summary")
+        # 受 GIL 限制的純 Python 計算放到獨立進程，首次使用時才建立（見 get_cpu_executor）
+        self._cpu_executor: Optional[ProcessPoolExecutor] = None
+        self._cpu_executor_lock = threading.Lock()
         self.cleanup_thread = None
         self.running = False
         self.lock = threading.RLock()
+        # 任務狀態訂閱者: task_id -> [(事件循環, 佇列)]
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        # 任務進入終止狀態時的回調，例如批量處理器的計數更新
+        self._terminal_listeners: List[Callable[[Task], None]] = []
+        # 共享任務存儲（可選），本地字典仍作為本 worker 的快取
+        self.store = self._create_store()
+        # 任務檔案的背景寫入器（由 enable_autosave 啟用）
+        self.writer: Optional[TaskFileWriter] = None
         
         # 啟動清理線程
         self.start_cleanup_thread()
     
+    def _create_store(self) -> Optional[RedisTaskStore]:
+        """根據配置建立共享任務存儲"""
+        if not AppConfig.REDIS_URL:
+            return None
+        try:
+            store = RedisTaskStore(AppConfig.REDIS_URL, AppConfig.TASK_RECORD_TTL)
+            logger.info("已啟用 Redis 任務存儲")
+            return store
+        except Exception as e:
+            logger.error(f"初始化 Redis 任務存儲失敗，改用本地存儲: {e}")
+            return None
+    
+    def get_cpu_executor(self) -> ProcessPoolExecutor:
+        """取得 CPU 密集工作的進程池
+        
+        以 spawn 啟動子進程：本進程已有寫入線程、處理線程池與事件循環，
+        fork 會把其他線程持有的鎖以鎖定狀態複製到子進程
+        """
+        with self._cpu_executor_lock:
+            if self._cpu_executor is None:
+                self._cpu_executor = ProcessPoolExecutor(
+                    max_workers=AppConfig.CPU_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._cpu_executor
+    
+    def shutdown_cpu_executor(self):
+        """關閉進程池（未建立時不做任何事）"""
+        with self._cpu_executor_lock:
+            executor, self._cpu_executor = self._cpu_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+    
+    def _persist(self, task_id: str, **fields):
+        """將任務欄位寫入共享存儲並標記任務檔案待保存，失敗時僅記錄日誌
+        
+        會與 Redis 往返，不可在持有 self.lock 時調用，以免存儲延遲阻塞所有任務的讀寫
+        """
+        self._mark_dirty()
+        if self.store is None:
+            return
+        try:
+            if fields.get("status") == "complete" and "result" in fields:
+                self.store.mark_completed(task_id, fields.pop("result"))
+                fields.pop("status")
+            self.store.update(task_id, **fields)
+        except Exception as e:
+            logger.warning(f"寫入共享任務存儲失敗: {task_id} - {e}")
+    
+    def _mark_dirty(self):
+        """通知背景寫入器任務已變更"""
+        if self.writer is not None:
+            self.writer.mark_dirty()
+    
+    def enable_autosave(self, file_path: str, interval: float = 0.5):
+        """任務變更後由背景線程合併寫入檔案，進程意外結束時也不會遺失任務"""
+        if self.writer is None:
+            self.writer = TaskFileWriter(file_path, self._snapshot_all, interval)
+            self.writer.start()
+    
+    def _snapshot_all(self) -> List[Dict[str, Any]]:
+        """在鎖內取得所有任務的字典快照"""
+        with self.lock:
+            return [task.to_dict() for task in self.tasks.values()]
+    
+    def _load_from_store(self, task_id: str) -> Optional[Task]:
+        """從共享存儲讀取其他 worker 建立的任務；REMOTE_TASK_CACHE_TTL 秒內的重複查詢直接返回上次的結果"""
+        if self.store is None:
+            return None
+        now = time.monotonic()
+        with self.lock:
+            cached = self._remote_cache.get(task_id)
+            if cached is not None and now - cached[0] < AppConfig.REMOTE_TASK_CACHE_TTL:
+                return cached[1]
+        try:
+            task_data = self.store.get(task_id)
+        except Exception as e:
+            logger.warning(f"讀取共享任務存儲失敗: {task_id} - {e}")
+            return None
+        task = Task.from_dict(task_data) if task_data else None
+        if task is not None:
+            with self.lock:
+                self._remote_cache[task_id] = (now, task)
+                self._remote_cache.move_to_end(task_id)
+                while len(self._remote_cache) > AppConfig.MAX_TASKS:
+                    self._remote_cache.popitem(last=False)
+        return task
+    
     def start_cleanup_thread(self):
         """啟動清理線程"""
         if self.cleanup_thread is None or not self.cleanup_thread.is_alive():
@@ -101,22 +257,73 @@ class TaskManager:
             expired_tasks = []
             
             for task_id, task in self.tasks.items():
-                if task.status in ["complete", "error", "cancelled"]:
+                if task.status in TERMINAL_STATUSES:
                     age = current_time - task.updated_at
                     if age.total_seconds() > AppConfig.MAX_TASK_AGE:
                         expired_tasks.append(task_id)
             
             for task_id in expired_tasks:
-                del self.tasks[task_id]
+                self._remove_task(task_id)
                 logger.info(f"已清理過期任務: {task_id}")
             
             if expired_tasks:
                 logger.info(f"共清理了 {len(expired_tasks)} 個過期任務")
     
+    def _add_task(self, task: Task):
+        """加入或替換記憶體中的任務並更新狀態計數（須持有鎖）"""
+        previous = self.tasks.get(task.id)
+        if previous is not None:
+            self._status_counts[previous.status] -= 1
+        self.tasks[task.id] = task
+        self._status_counts[task.status] += 1
+    
+    def _set_status(self, task: Task, status: str):
+        """變更任務狀態並更新狀態計數（須持有鎖）"""
+        self._status_counts[task.status] -= 1
+        self._status_counts[status] += 1
+        task.status = status
+    
+    def _remove_task(self, task_id: str):
+        """從記憶體移除任務並扣除其結果大小（須持有鎖）"""
+        task = self.tasks.pop(task_id)
+        self._status_counts[task.status] -= 1
+        self._result_bytes -= self._result_sizes.pop(task_id, 0)
+        self._snapshot_cache.pop(task_id, None)
+        self._cancel_events.pop(task_id, None)
+        self._cancel_checked_at.pop(task_id, None)
+        self._mark_dirty()
+    
+    def _track_result_size(self, task: Task):
+        """記錄任務結果序列化後的大小（須持有鎖）"""
+        size = len(orjson.dumps(task.result)) if task.result else 0
+        self._result_bytes += size - self._result_sizes.get(task.id, 0)
+        if size:
+            self._result_sizes[task.id] = size
+        else:
+            self._result_sizes.pop(task.id, None)
+    
+    def _evict_if_needed(self, keep: Optional[str] = None):
+        """超過數量或記憶體上限時淘汰最久未使用的已結束任務（須持有鎖）
+        
+        keep 指定的任務（剛寫入結果的任務）不會被淘汰
+        """
+        while (len(self.tasks) > AppConfig.MAX_TASKS
+               or self._result_bytes > AppConfig.MAX_TASK_CACHE_BYTES):
+            victim = next(
+                (task_id for task_id, task in self.tasks.items()
+                 if task.status in TERMINAL_STATUSES and task_id != keep),
+                None
+            )
+            if victim is None:
+                break  # 其餘都是進行中的任務，不淘汰
+            self._remove_task(victim)
+            logger.info(f"任務快取超過上限，已淘汰任務: {victim}")
+    
     def create_task(self, task_id: str, url: str, keep_audio: bool = False, 
                    openai_api_key: str = "", google_api_key: str = "", 
                    model_type: str = "auto", gemini_model: str = "gemini-3-flash-preview",
-                   openai_model: str = "gpt-4o", whisper_model: str = "gpt-4o-transcribe") -> Task:
+                   openai_model: str = "gpt-4o", whisper_model: str = "gpt-4o-transcribe",
+                   batch_id: str = "") -> Task:
         """創建新任務"""
         with self.lock:
             task = Task(
@@ -130,33 +337,147 @@ class TaskManager:
                 model_type=model_type,
                 gemini_model=gemini_model,
                 openai_model=openai_model,
-                whisper_model=whisper_model
+                whisper_model=whisper_model,
+                batch_id=batch_id
             )
-            self.tasks[task_id] = task
-            logger.info(f"創建新任務: {task_id}")
-            return task
+            self._add_task(task)
+            self._evict_if_needed()
+            fields = task.to_dict()
+        
+        self._persist(task_id, **fields)
+        logger.info(f"創建新任務: {task_id}")
+        return task
+    
+    def create_tasks_bulk(self, specs: List[Dict[str, Any]]) -> List[Task]:
+        """批量創建任務，只取一次鎖；共享存儲以單次 pipeline 寫入
+        
+        specs 中每項為 create_task 的關鍵字參數
+        """
+        with self.lock:
+            now = time.time()
+            tasks = []
+            for spec in specs:
+                fields = dict(spec)
+                task = Task(id=fields.pop("task_id"), status="pending", timestamp=now, **fields)
+                self._add_task(task)
+                tasks.append(task)
+            self._evict_if_needed()
+            records = {task.id: task.to_dict() for task in tasks}
+        
+        self._mark_dirty()
+        if self.store is not None:
+            try:
+                self.store.update_many(records)
+            except Exception as e:
+                logger.warning(f"批量寫入共享任務存儲失敗: {e}")
+        logger.info(f"批量創建 {len(tasks)} 個任務")
+        return tasks
     
     def get_task(self, task_id: str) -> Optional[Task]:
         """獲取任務"""
         with self.lock:
-            return self.tasks.get(task_id)
+            task = self.tasks.get(task_id)
+            if task:
+                self.tasks.move_to_end(task_id)
+        return task or self._load_from_store(task_id)
+    
+    def get_task_snapshot(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """在鎖內取得任務的字典快照，避免讀到背景線程更新到一半的欄位"""
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task:
+                self.tasks.move_to_end(task_id)
+                return task.to_dict()
+        
+        task = self._load_from_store(task_id)
+        return task.to_dict() if task else None
+    
+    def get_task_progress(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """只複製任務的進度欄位，任務不存在時返回 None"""
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task:
+                self.tasks.move_to_end(task_id)
+                return dict(task.progress or {})
+        
+        task = self._load_from_store(task_id)
+        return dict(task.progress or {}) if task else None
+    
+    @staticmethod
+    def _encode_snapshot(task: Task) -> Tuple[str, bytes]:
+        """序列化任務並計算 ETag"""
+        body = orjson.dumps(task.to_dict(), option=orjson.OPT_NON_STR_KEYS)
+        return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"', body
+    
+    def get_task_json(self, task_id: str) -> Optional[Tuple[str, bytes]]:
+        """取得任務的 ETag 與 JSON 位元組；任務未變更時直接重用上次的序列化結果"""
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task:
+                self.tasks.move_to_end(task_id)
+                snapshot = self._snapshot_cache.get(task_id)
+                if snapshot is None:
+                    snapshot = self._encode_snapshot(task)
+                    self._snapshot_cache[task_id] = snapshot
+                return snapshot
+        
+        task = self._load_from_store(task_id)
+        return self._encode_snapshot(task) if task else None
+    
+    def get_tasks(self, task_ids: List[str]) -> List[Optional[Task]]:
+        """批量獲取任務，只取一次鎖；本地缺少的任務以單次 pipeline 從共享存儲讀取"""
+        with self.lock:
+            tasks = [self.tasks.get(task_id) for task_id in task_ids]
+        
+        missing = [task_id for task_id, task in zip(task_ids, tasks) if task is None]
+        if missing and self.store is not None:
+            try:
+                loaded = dict(zip(missing, self.store.get_many(missing)))
+                tasks = [
+                    task or (Task.from_dict(loaded[task_id]) if loaded.get(task_id) else None)
+                    for task_id, task in zip(task_ids, tasks)
+                ]
+            except Exception as e:
+                logger.warning(f"批量讀取共享任務存儲失敗: {e}")
+        return tasks
     
     def update_task_status(self, task_id: str, status: str, **kwargs):
         """更新任務狀態"""
+        changed = None
         with self.lock:
             if task_id in self.tasks:
                 task = self.tasks[task_id]
-                task.status = status
+                previous_status = task.status
+                self._set_status(task, status)
                 task.updated_at = datetime.now()
+                self._snapshot_cache.pop(task_id, None)
                 
+                changed = {"status": status, "updated_at": task.updated_at.isoformat()}
                 for key, value in kwargs.items():
                     if hasattr(task, key):
                         setattr(task, key, value)
+                        changed[key] = value
+                
+                if "result" in changed:
+                    self._track_result_size(task)
+                    self._evict_if_needed(keep=task_id)
+                
+                if status in TERMINAL_STATUSES:
+                    self._cancel_events.pop(task_id, None)
+                    self._cancel_checked_at.pop(task_id, None)
                 
-                logger.info(f"更新任務狀態: {task_id} -> {status}")
+                # 終止狀態推送完整記錄（含結果），其餘只推送變更的欄位
+                self._publish(task_id, task.to_dict() if status in TERMINAL_STATUSES else changed)
+                self._notify_terminal(task, previous_status)
+        
+        # 共享存儲的寫入在釋放鎖之後進行
+        if changed is not None:
+            self._persist(task_id, **changed)
+            logger.info(f"更新任務狀態: {task_id} -> {status}")
     
     def update_task_progress(self, task_id: str, stage: str, percentage: int, message: str):
         """更新任務進度"""
+        changed = None
         with self.lock:
             if task_id in self.tasks:
                 task = self.tasks[task_id]
@@ -167,60 +488,170 @@ class TaskManager:
                     "timestamp": time.time()
                 }
                 task.updated_at = datetime.now()
-                logger.debug(f"更新任務進度: {task_id} -> {stage} {percentage}%")
+                self._snapshot_cache.pop(task_id, None)
+                changed = {"progress": task.progress, "updated_at": task.updated_at.isoformat()}
+                self._publish(task_id, {"status": task.status, "progress": task.progress})
+        
+        if changed is not None:
+            self._persist(task_id, **changed)
+            logger.debug(f"更新任務進度: {task_id} -> {stage} {percentage}%")
+    
+    def _mark_cancelled(self, task: Task) -> bool:
+        """將進行中的本地任務標記為已取消，並推送狀態、通知終止狀態監聽者（須持有鎖）
+        
+        任務已結束時不做任何事並返回 False，確保取消事件只發出一次
+        """
+        if task.status not in ["pending", "processing"]:
+            return False
+        previous_status = task.status
+        task.is_cancelled = True
+        self._set_status(task, "cancelled")
+        task.updated_at = datetime.now()
+        self._snapshot_cache.pop(task.id, None)
+        self._cancel_checked_at.pop(task.id, None)
+        cancel_event = self._cancel_events.pop(task.id, None)
+        if cancel_event is not None:
+            cancel_event.set()
+        self._publish(task.id, task.to_dict())
+        self._notify_terminal(task, previous_status)
+        return True
     
     def cancel_task(self, task_id: str) -> bool:
         """取消任務"""
         with self.lock:
-            if task_id in self.tasks:
-                task = self.tasks[task_id]
-                if task.status in ["pending", "processing"]:
-                    task.is_cancelled = True
-                    task.status = "cancelled"
-                    task.updated_at = datetime.now()
-                    logger.info(f"任務已取消: {task_id}")
-                    return True
+            task = self.tasks.get(task_id)
+            if task is not None:
+                if not self._mark_cancelled(task):
+                    return False
+                updated_at = task.updated_at.isoformat()
+        
+        if task is not None:
+            self._persist(task_id, status="cancelled", is_cancelled=True, updated_at=updated_at)
+            logger.info(f"任務已取消: {task_id}")
+            return True
+        
+        # 任務可能由其他 worker 處理，透過共享存儲通知取消（略過本地快取，以最新狀態判斷）
+        with self.lock:
+            self._remote_cache.pop(task_id, None)
+        task = self._load_from_store(task_id)
+        if task and task.status in ["pending", "processing"]:
+            self._persist(task_id, status="cancelled", is_cancelled=True,
+                          updated_at=datetime.now().isoformat())
+            with self.lock:
+                self._remote_cache.pop(task_id, None)
+            logger.info(f"已透過共享存儲取消任務: {task_id}")
+            return True
         return False
     
-    def get_all_tasks(self) -> List[Dict[str, Any]]:
-        """獲取所有任務"""
+    def subscribe(self, task_id: str) -> asyncio.Queue:
+        """訂閱任務狀態變更（需在事件循環中調用）"""
+        queue: asyncio.Queue = asyncio.Queue()
         with self.lock:
-            return [task.to_dict() for task in self.tasks.values()]
+            self._subscribers.setdefault(task_id, []).append((asyncio.get_running_loop(), queue))
+        return queue
+    
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue):
+        """取消訂閱任務狀態變更"""
+        with self.lock:
+            subscribers = self._subscribers.get(task_id, [])
+            self._subscribers[task_id] = [s for s in subscribers if s[1] is not queue]
+            if not self._subscribers[task_id]:
+                del self._subscribers[task_id]
+    
+    def add_terminal_listener(self, listener: Callable[[Task], None]):
+        """註冊任務進入終止狀態時的回調"""
+        self._terminal_listeners.append(listener)
+    
+    def _notify_terminal(self, task: Task, previous_status: str):
+        """任務首次進入終止狀態時通知監聽者（須持有鎖）"""
+        if previous_status in TERMINAL_STATUSES or task.status not in TERMINAL_STATUSES:
+            return
+        for listener in self._terminal_listeners:
+            try:
+                listener(task)
+            except Exception as e:
+                logger.warning(f"任務狀態回調失敗: {task.id} - {e}")
+    
+    def _publish(self, task_id: str, message: Dict[str, Any]):
+        """推送狀態變更給訂閱者（可能在工作線程中調用，須持有鎖）"""
+        for loop, queue in self._subscribers.get(task_id, ()):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                pass  # 事件循環已關閉
+    
+    def get_all_tasks(self, include_result: bool = True) -> List[Dict[str, Any]]:
+        """獲取所有任務；列表檢視可省略體積較大的結果欄位"""
+        with self.lock:
+            tasks = [task.to_dict() for task in self.tasks.values()]
+        if not include_result:
+            for task_data in tasks:
+                del task_data["result"]
+        return tasks
     
     def get_task_stats(self) -> Dict[str, Any]:
         """獲取任務統計"""
         with self.lock:
-            stats = {
+            return {
                 "total": len(self.tasks),
-                "pending": 0,
-                "processing": 0,
-                "complete": 0,
-                "error": 0,
-                "cancelled": 0
+                "pending": self._status_counts["pending"],
+                "processing": self._status_counts["processing"],
+                "complete": self._status_counts["complete"],
+                "error": self._status_counts["error"],
+                "cancelled": self._status_counts["cancelled"]
             }
-            
-            for task in self.tasks.values():
-                if task.status in stats:
-                    stats[task.status] += 1
-            
-            return stats
+    
+    def get_cancel_event(self, task_id: str) -> threading.Event:
+        """取得任務的取消事件，供處理線程在長時間操作中檢查"""
+        with self.lock:
+            cancel_event = self._cancel_events.get(task_id)
+            if cancel_event is None:
+                cancel_event = threading.Event()
+                task = self.tasks.get(task_id)
+                if task is not None and task.is_cancelled:
+                    cancel_event.set()
+                else:
+                    self._cancel_events[task_id] = cancel_event
+            return cancel_event
     
     def is_task_cancelled(self, task_id: str) -> bool:
-        """檢查任務是否已取消"""
+        """檢查任務是否已取消
+        
+        其他 worker 可能已在共享存儲中標記取消；遠端查詢每 REMOTE_CANCEL_CHECK_INTERVAL 秒最多一次
+        """
         with self.lock:
-            if task_id in self.tasks:
-                return self.tasks[task_id].is_cancelled
-        return False
+            task = self.tasks.get(task_id)
+            if task and task.is_cancelled:
+                return True
+            if task is None or self.store is None or task.status in TERMINAL_STATUSES:
+                return False
+            now = time.monotonic()
+            if now - self._cancel_checked_at.get(task_id, 0.0) < AppConfig.REMOTE_CANCEL_CHECK_INTERVAL:
+                return False
+            self._cancel_checked_at[task_id] = now
+        
+        try:
+            cancelled = self.store.is_cancelled(task_id)
+        except Exception as e:
+            logger.warning(f"讀取共享任務存儲失敗: {task_id} - {e}")
+            return False
+        
+        if not cancelled:
+            return False
+        # 查詢期間任務可能已在本地結束或被取消，由 _mark_cancelled 判斷是否仍需發出取消事件
+        with self.lock:
+            marked = self._mark_cancelled(task)
+            cancelled = task.is_cancelled
+        if marked:
+            self._mark_dirty()
+            logger.info(f"任務已在其他 worker 取消: {task_id}")
+        return cancelled
     
     def save_tasks_to_file(self, file_path: str):
         """將任務保存到檔案"""
         try:
-            with self.lock:
-                tasks_data = [task.to_dict() for task in self.tasks.values()]
-                
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(tasks_data, f, ensure_ascii=False, indent=2)
-                
+            write_tasks_file(file_path, self._snapshot_all())
+            
             logger.info(f"任務已保存到檔案: {file_path}")
             
         except Exception as e:
@@ -232,34 +663,15 @@ class TaskManager:
             if not os.path.exists(file_path):
                 return
                 
-            with open(file_path, 'r', encoding='utf-8') as f:
-                tasks_data = json.load(f)
+            with open(file_path, 'rb') as f:
+                tasks_data = orjson.loads(f.read())
             
             with self.lock:
                 for task_data in tasks_data:
-                    task = Task(
-                        id=task_data['id'],
-                        status=task_data['status'],
-                        url=task_data['url'],
-                        timestamp=task_data['timestamp'],
-                        keep_audio=task_data.get('keep_audio', False),
-                        openai_api_key=task_data.get('openai_api_key', ''),
-                        google_api_key=task_data.get('google_api_key', ''),
-                        model_type=task_data.get('model_type', 'auto'),
-                        whisper_model=task_data.get('whisper_model', 'gpt-4o-transcribe'),
-                        progress=task_data.get('progress', {}),
-                        result=task_data.get('result'),
-                        error=task_data.get('error'),
-                        is_cancelled=task_data.get('is_cancelled', False)
-                    )
-                    
-                    # 恢復時間戳
-                    if 'created_at' in task_data:
-                        task.created_at = datetime.fromisoformat(task_data['created_at'])
-                    if 'updated_at' in task_data:
-                        task.updated_at = datetime.fromisoformat(task_data['updated_at'])
-                    
-                    self.tasks[task.id] = task
+                    task = Task.from_dict(task_data)
+                    self._add_task(task)
+                    self._track_result_size(task)
+                self._evict_if_needed()
             
             logger.info(f"從檔案載入了 {len(tasks_data)} 個任務")
             
@@ -271,6 +683,11 @@ class TaskManager:
         logger.info("正在關閉任務管理器...")
         self.stop_cleanup_thread()
         self.executor.shutdown(wait=True)
+        self.shutdown_cpu_executor()
+        # 執行中的任務都結束、背景寫入器停止後，才寫入最後一次快照
+        if self.writer is not None:
+            self.writer.stop()
+            self.save_tasks_to_file(self.writer.file_path)
         logger.info("任務管理器已關閉")
 
 
@@ -0,0 +1,124 @@
+"""
+Redis 任務存儲
+每個任務對應一個 Redis hash 並設置 TTL，讓多個 uvicorn worker 共享任務狀態
+"""
+import logging
+import orjson
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+
+logger = logging.getLogger(__name__)
+
+# 原子地標記任務完成：寫入狀態、結果、完成時間並刷新 TTL
+_MARK_COMPLETED_SCRIPT = """
+redis.call('HSET', KEYS[1], 'status', ARGV[1], 'result', ARGV[2],
+           'completed_at', ARGV[3], 'updated_at', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+
+class RedisTaskStore:
+    """以 Redis hash 保存任務記錄"""
+
+    KEY_PREFIX = "yt_summarize:task:"
+
+    def __init__(self, url: str, record_ttl: int):
+        import redis  # 可選依賴，只有設定 REDIS_URL 時才需要
+
+        self._redis = redis
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.record_ttl = record_ttl
+        self._mark_completed_sha: Optional[str] = None
+
+    def _key(self, task_id: str) -> str:
+        return f"{self.KEY_PREFIX}{task_id}"
+
+    @staticmethod
+    def _convert_to_redis_value(value: Any) -> str:
+        """將欄位值編碼為 JSON 字串，保留原始類型"""
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    @staticmethod
+    def _convert_to_original_type(value: str) -> Any:
+        """將 Redis 中的 JSON 字串還原為原始類型"""
+        try:
+            return orjson.loads(value)
+        except (TypeError, ValueError):
+            return value
+
+    def update(self, task_id: str, **fields):
+        """更新任務欄位並刷新 TTL"""
+        if not fields:
+            return
+
+        key = self._key(task_id)
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping={
+            name: self._convert_to_redis_value(value) for name, value in fields.items()
+        })
+        pipe.expire(key, self.record_ttl)
+        pipe.execute()
+
+    def update_many(self, records: Dict[str, Dict[str, Any]]):
+        """以單一 pipeline 寫入多個任務記錄並刷新 TTL"""
+        if not records:
+            return
+
+        pipe = self.client.pipeline()
+        for task_id, fields in records.items():
+            key = self._key(task_id)
+            pipe.hset(key, mapping={
+                name: self._convert_to_redis_value(value) for name, value in fields.items()
+            })
+            pipe.expire(key, self.record_ttl)
+        pipe.execute()
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """獲取任務記錄，不存在時返回 None"""
+        data = self.client.hgetall(self._key(task_id))
+        if not data:
+            return None
+        return {name: self._convert_to_original_type(value) for name, value in data.items()}
+
+    def is_cancelled(self, task_id: str) -> bool:
+        """只讀取取消標記，不取回整個任務記錄"""
+        value = self.client.hget(self._key(task_id), "is_cancelled")
+        return bool(value and self._convert_to_original_type(value))
+
+    def get_many(self, task_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """以單一 pipeline 批量獲取任務記錄，順序與 task_ids 一致"""
+        if not task_ids:
+            return []
+
+        pipe = self.client.pipeline()
+        for task_id in task_ids:
+            pipe.hgetall(self._key(task_id))
+        return [
+            {name: self._convert_to_original_type(value) for name, value in data.items()}
+            if data else None
+            for data in pipe.execute()
+        ]
+
+    def mark_completed(self, task_id: str, result: Optional[Dict[str, Any]]):
+        """原子地標記任務完成"""
+        args = (
+            self._convert_to_redis_value("complete"),
+            self._convert_to_redis_value(result),
+            self._convert_to_redis_value(datetime.now().isoformat()),
+            self.record_ttl
+        )
+
+        if self._mark_completed_sha is None:
+            self._mark_completed_sha = self.client.script_load(_MARK_COMPLETED_SCRIPT)
+
+        try:
+            self.client.evalsha(self._mark_completed_sha, 1, self._key(task_id), *args)
+        except self._redis.exceptions.NoScriptError:
+            # Redis 重啟後腳本快取會遺失，重新載入一次
+            self._mark_completed_sha = self.client.script_load(_MARK_COMPLETED_SCRIPT)
+            self.client.evalsha(self._mark_completed_sha, 1, self._key(task_id), *args)
+
+    def delete(self, task_id: str):
+        """刪除任務記錄"""
+        self.client.delete(self._key(task_id))
@@ -0,0 +1,86 @@
+"""
+任務檔案寫入器
+合併短時間內的多次任務變更，由背景線程將任務快照一次寫入檔案
+"""
+import os
+import tempfile
+import threading
+import logging
+import orjson
+from typing import Dict, Any, List, Callable
+
+logger = logging.getLogger(__name__)
+
+
+# 背景寫入器與關閉時的最後保存可能同時寫檔，寫入與替換需依序進行
+_write_lock = threading.Lock()
+
+
+def write_tasks_file(file_path: str, tasks_data: List[Dict[str, Any]]):
+    """先寫入唯一的暫存檔再替換，避免中途失敗或同時寫入留下不完整的檔案"""
+    data = orjson.dumps(tasks_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    directory = os.path.dirname(os.path.abspath(file_path))
+    with _write_lock:
+        f = tempfile.NamedTemporaryFile(dir=directory, prefix=f".{os.path.basename(file_path)}.",
+                                        suffix=".tmp", delete=False)
+        try:
+            with f:
+                f.write(data)
+            os.replace(f.name, file_path)
+        except Exception:
+            os.remove(f.name)
+            raise
+
+
+class TaskFileWriter:
+    """標記任務變更後，在 interval 秒內合併所有變更並寫入一次"""
+
+    def __init__(self, file_path: str, snapshot: Callable[[], List[Dict[str, Any]]], interval: float = 0.5):
+        self.file_path = file_path
+        self.snapshot = snapshot
+        self.interval = interval
+        self._dirty = threading.Event()
+        # 停止時設置，讓等待中的寫入線程立即醒來
+        self._stop_event = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        """啟動寫入線程"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="task-writer", daemon=True)
+            self._thread.start()
+
+    def mark_dirty(self):
+        """標記任務已變更，由寫入線程稍後保存"""
+        self._dirty.set()
+
+    def _run(self):
+        while True:
+            self._dirty.wait()
+            if self._stopping:
+                return
+            # 等待一段時間，讓連續的進度更新合併為一次寫入
+            self._stop_event.wait(self.interval)
+            # 等待期間已停止時不再寫入，最後一次保存由關閉流程負責
+            if self._stopping:
+                return
+            self._dirty.clear()
+            self.flush()
+
+    def flush(self):
+        """立即將目前的任務快照寫入檔案"""
+        try:
+            write_tasks_file(self.file_path, self.snapshot())
+        except Exception as e:
+            logger.error(f"保存任務到檔案時發生錯誤: {e}")
+
+    def stop(self):
+        """停止寫入線程並等待進行中的寫入完成；之後的保存不會與寫入線程同時進行"""
+        self._stopping = True
+        self._stop_event.set()
+        self._dirty.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=5)
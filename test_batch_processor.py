@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+"""
+批量處理器測試
+"""
+
+import pytest
+
+from batch_processor import BatchProcessor, BatchRequest, BatchStatus
+from config import AppConfig
+from task_manager import task_manager
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    monkeypatch.setattr(AppConfig, "MAX_BATCHES", 2)
+    return BatchProcessor()
+
+
+def add_batch(processor, batch_id, finished):
+    """加入一個含兩個子任務的批量，finished 為已結束的子任務數"""
+    with processor.lock:
+        processor.batches[batch_id] = BatchStatus(batch_id=batch_id, total_tasks=2, completed_tasks=finished)
+        processor._evict_batches()
+
+
+def test_eviction_skips_running_batches(processor):
+    add_batch(processor, "running", 0)
+    add_batch(processor, "done", 2)
+    add_batch(processor, "new", 0)
+
+    assert list(processor.batches) == ["running", "new"]
+
+
+def test_all_running_batches_go_over_the_cap(processor):
+    for batch_id in ("b1", "b2", "b3"):
+        add_batch(processor, batch_id, 1)
+
+    assert list(processor.batches) == ["b1", "b2", "b3"]
+
+    # 其中一個完成後，下次淘汰時移除它
+    processor.batches["b2"].completed_tasks = 2
+    add_batch(processor, "b4", 0)
+    assert list(processor.batches) == ["b1", "b3", "b4"]
+
+
+def test_terminal_listener_counts_each_task_once(processor):
+    urls = [f"https://www.youtube.com/watch?v={video_id}" for video_id in ("dQw4w9WgXcQ", "9bZkp7q5f8g", "kJQP7kiw5Fk")]
+    batch = processor.create_batch(BatchRequest(urls=urls, openai_api_key="sk-test"))
+    done_id, failed_id, cancelled_id = batch.task_ids
+    try:
+        task_manager.update_task_status(done_id, "processing")
+        task_manager.update_task_status(done_id, "complete", result={"summary": "ok"})
+        task_manager.update_task_status(failed_id, "error", error="boom")
+        assert (batch.completed_tasks, batch.failed_tasks, batch.cancelled_tasks) == (1, 1, 0)
+        assert not batch.is_complete
+
+        task_manager.cancel_task(cancelled_id)
+        # 已結束的任務再次寫入終止狀態時不重複計數
+        task_manager.update_task_status(done_id, "complete", result={"summary": "again"})
+        task_manager.update_task_status(failed_id, "error", error="boom")
+        assert task_manager.cancel_task(cancelled_id) is False
+
+        assert (batch.completed_tasks, batch.failed_tasks, batch.cancelled_tasks) == (1, 1, 1)
+        assert batch.is_complete
+        assert batch.progress_percentage == 100
+    finally:
+        with task_manager.lock:
+            for task_id in batch.task_ids:
+                task_manager._remove_task(task_id)
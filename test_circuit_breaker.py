@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""
+斷路器與摘要處理流程的重試測試
+"""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from error_handler import CircuitBreaker, CircuitOpenError, ErrorHandler, RetryConfig
+from task_manager import task_manager
+
+
+@pytest.fixture
+def summary(monkeypatch):
+    """以假的 run_summary_process 取代實際處理流程，記錄每次調用"""
+    state = SimpleNamespace(
+        calls=0,
+        result={"status": "error", "message": "connection timeout while downloading"}
+    )
+
+    def fake_run_summary_process(**kwargs):
+        state.calls += 1
+        return state.result
+
+    monkeypatch.setattr(main, "run_summary_process", fake_run_summary_process)
+    monkeypatch.setattr(main, "summary_breaker",
+                        CircuitBreaker(2, 60, is_failure=ErrorHandler.is_retryable))
+    monkeypatch.setattr(main.summary_cache, "ttl", 0)
+    # 重試之間不等待
+    monkeypatch.setattr(RetryConfig, "wait_time", lambda self, delay: 0)
+    return state
+
+
+def run_task() -> str:
+    """建立任務並執行一次 process_video，返回任務 ID"""
+    task_id = f"test-{uuid.uuid4()}"
+    url = f"https://www.youtube.com/watch?v={task_id[-11:]}"
+    task_manager.create_task(task_id, url)
+    asyncio.run(main.process_video(task_id, url, False, "sk-test"))
+    return task_id
+
+
+def test_error_result_is_retried_and_marks_task_error(summary):
+    task_id = run_task()
+
+    task = task_manager.get_task(task_id)
+    assert task.status == "error"
+    assert task.error == "connection timeout while downloading"
+    assert summary.calls == 3  # RetryConfig(max_attempts=3)
+
+
+def test_breaker_opens_after_failed_runs(summary):
+    run_task()
+    run_task()
+    assert main.summary_breaker.state == "OPEN"
+    attempts = summary.calls
+
+    task_id = run_task()
+
+    task = task_manager.get_task(task_id)
+    assert task.status == "error"
+    assert task.error == "服務暫時不可用，請稍後再試"
+    assert summary.calls == attempts  # 斷路器開啟期間不再調用處理流程
+
+
+def test_non_retryable_error_does_not_open_breaker(summary):
+    summary.result = {"status": "error", "message": "影片不存在或已被刪除"}
+
+    for _ in range(3):
+        task_id = run_task()
+
+    assert main.summary_breaker.state == "CLOSED"
+    assert summary.calls == 3  # 不重試
+    assert task_manager.get_task(task_id).error == "影片不存在或已被刪除"
+
+
+def test_success_result_completes_task(summary):
+    summary.result = {"status": "success", "title": "t", "summary": "s"}
+
+    task_id = run_task()
+
+    task = task_manager.get_task(task_id)
+    assert task.status == "complete"
+    assert task.result == summary.result
+
+
+def test_breaker_state_transitions_through_call_async():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+
+    async def fail():
+        raise ConnectionError("connection refused")
+
+    async def succeed():
+        return "ok"
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await breaker.call_async(fail)
+        assert breaker.state == "OPEN"
+
+        # 恢復時間內直接拒絕，不調用函數
+        with pytest.raises(CircuitOpenError):
+            await breaker.call_async(succeed)
+
+        # 超過恢復時間後進入半開狀態，試探失敗會再次開啟
+        breaker.last_failure_time -= 61
+        with pytest.raises(ConnectionError):
+            await breaker.call_async(fail)
+        assert breaker.state == "OPEN"
+
+        # 再次超過恢復時間，試探成功則恢復為關閉並重置計數
+        breaker.last_failure_time -= 61
+        assert await breaker.call_async(succeed) == "ok"
+        assert breaker.state == "CLOSED"
+        assert breaker.failure_count == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+"""
+錯誤分類測試
+"""
+
+import random
+
+import pytest
+
+from error_handler import ErrorHandler, ErrorType
+
+
+def classify_by_scanning(message: str) -> ErrorType:
+    """原本的分類方式：按類型順序逐一檢查每個關鍵字"""
+    message = message.lower()
+    for error_type, keywords in ErrorHandler.ERROR_KEYWORDS.items():
+        if any(keyword in message for keyword in keywords):
+            return error_type
+    return ErrorType.UNKNOWN_ERROR
+
+
+@pytest.mark.parametrize("message", [
+    "Connection reset by peer",
+    "Read TIMEOUT after 30s",
+    "API rate limit exceeded",
+    "Invalid file format",
+    "file not found: /tmp/a.mp3",
+    "decode error in system codec",
+    "Out of memory",
+    "影片不存在或已被刪除",
+    "",
+    # 重疊的關鍵字：較後類型的關鍵字先出現，仍以類型順序較前者為準
+    "invalid request to the api over https",
+    "processing failed: socket closed",
+])
+def test_matches_keyword_scan(message):
+    assert ErrorHandler.classify_error(Exception(message)) == classify_by_scanning(message)
+
+
+def test_matches_keyword_scan_on_random_messages():
+    rng = random.Random(0)
+    keywords = [keyword for keywords in ErrorHandler.ERROR_KEYWORDS.values() for keyword in keywords]
+    fillers = ["error", "while", "the", "錯誤", "x", "HTTPS", "Platform", "-", "osmosis"]
+
+    for _ in range(500):
+        words = rng.sample(keywords, rng.randint(0, 3)) + rng.sample(fillers, rng.randint(0, 4))
+        rng.shuffle(words)
+        message = " ".join(word.upper() if rng.random() < 0.3 else word for word in words)
+        assert ErrorHandler.classify_error(Exception(message)) == classify_by_scanning(message), message
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+"""
+Gemini 金鑰配置閘門測試
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import yt_summarizer
+from yt_summarizer import TaskCancelledError, _GeminiKeyGate
+
+
+@pytest.fixture
+def configured(monkeypatch):
+    """記錄 genai.configure 配置過的金鑰"""
+    keys = []
+    monkeypatch.setattr(yt_summarizer, "genai", SimpleNamespace(configure=lambda api_key: keys.append(api_key)))
+    monkeypatch.setattr(_GeminiKeyGate, "POLL_INTERVAL", 0.01)
+    return keys
+
+
+def hold(gate, api_key, entered, release, **kwargs):
+    """在背景線程中以指定金鑰進入閘門，直到 release 被設置"""
+    def run():
+        with gate.using(api_key, **kwargs):
+            entered.append(api_key)
+            release.wait()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def wait_until(predicate, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end, "timed out"
+        time.sleep(0.005)
+
+
+def test_waiters_enter_in_arrival_order(configured):
+    gate = _GeminiKeyGate()
+    entered = []
+    release_a, release_b, release_c = threading.Event(), threading.Event(), threading.Event()
+
+    a = hold(gate, "key-a", entered, release_a)
+    wait_until(lambda: entered == ["key-a"])
+    b = hold(gate, "key-b", entered, release_b)
+    wait_until(lambda: len(gate._waiters) == 1)
+    # 與正在使用的金鑰相同，但排在等待換金鑰的請求之後，不可插隊
+    c = hold(gate, "key-a", entered, release_c)
+    wait_until(lambda: len(gate._waiters) == 2)
+    time.sleep(0.05)
+    assert entered == ["key-a"]
+
+    release_a.set()
+    a.join()
+    wait_until(lambda: entered == ["key-a", "key-b"])
+    release_b.set()
+    b.join()
+    wait_until(lambda: entered == ["key-a", "key-b", "key-a"])
+    release_c.set()
+    c.join()
+
+    assert configured == ["key-a", "key-b", "key-a"]
+    assert not gate._waiters
+
+
+def test_cancelled_waiter_stops_waiting(configured):
+    gate = _GeminiKeyGate()
+    release = threading.Event()
+    holder = hold(gate, "key-a", [], release)
+    wait_until(lambda: gate._active == 1)
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    with pytest.raises(TaskCancelledError):
+        with gate.using("key-b", cancel_event=cancel_event):
+            pass
+
+    assert not gate._waiters
+    release.set()
+    holder.join()
+
+
+def test_waiter_gives_up_at_deadline(configured):
+    gate = _GeminiKeyGate()
+    release = threading.Event()
+    holder = hold(gate, "key-a", [], release)
+    wait_until(lambda: gate._active == 1)
+
+    start = time.monotonic()
+    with pytest.raises(TaskCancelledError):
+        with gate.using("key-b", deadline=start + 0.1):
+            pass
+
+    assert time.monotonic() - start < 1.0
+    assert not gate._waiters
+    release.set()
+    holder.join()
+    # 放棄等待的請求不影響之後的請求
+    with gate.using("key-b"):
+        pass
+    assert configured == ["key-a", "key-b"]
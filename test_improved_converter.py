@@ -50,6 +50,15 @@ def test_improved_converter():
         traceback.print_exc()
         return False
 
+def test_reference_link_defined_in_later_block():
+    """Reference-style links resolve even when the definition is in a later block"""
+    from docx import Document
+
+    markdown = "see [x][1]\n\nmore text\n\n[1]: http://example.com\n"
+    doc = Document(convert_markdown_to_docx_improved(markdown, "文檔"))
+
+    assert [p.text for p in doc.paragraphs] == ["see x", "more text"]
+
 if __name__ == "__main__":
     success = test_improved_converter()
     sys.exit(0 if success else 1)
\ No newline at end of file
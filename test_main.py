@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+"""
+API 端點與首頁測試
+"""
+
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import main
+from config import AppConfig
+from task_manager import task_manager
+
+OPENAI_KEY = "sk-" + "a" * 40
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """不啟動 lifespan（結束時會關閉全域 task_manager），也不真正處理影片"""
+    monkeypatch.setattr(main, "schedule_video", lambda task: None)
+    created = []
+    original_create = task_manager.create_task
+
+    def create_task(*args, **kwargs):
+        task = original_create(*args, **kwargs)
+        created.append(task.id)
+        return task
+
+    monkeypatch.setattr(task_manager, "create_task", create_task)
+    yield TestClient(main.app)
+
+    for task_id in created:
+        task_manager.update_task_status(task_id, "cancelled")
+        with task_manager.lock:
+            if task_id in task_manager.tasks:
+                task_manager._remove_task(task_id)
+
+
+def test_minify_keeps_script_blocks_verbatim():
+    html = (b"<html>\n    <body>\n        <p>text</p>\n\n"
+            b"        <script>\n            const SRC = `\n                line one\n            `;\n        </script>\n"
+            b"    </body>\n</html>\n")
+
+    assert main._minify_html(html) == (
+        b"<html>\n<body>\n<p>text</p>\n"
+        b"<script>\n            const SRC = `\n                line one\n            `;\n        </script>\n"
+        b"</body>\n</html>"
+    )
+
+
+def test_home_page_keeps_worker_source_intact():
+    with open(f"{AppConfig.TEMPLATES_DIR}/index.html", "rb") as f:
+        page = f.read()
+    worker_source = re.search(rb"const MARKED_WORKER_SOURCE = `.*?`;", page, re.S).group(0)
+
+    assert worker_source in main._HOME_HTML_BYTES
+
+
+def test_duplicate_submission_reuses_the_running_task(client):
+    payload = {"url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "openai_api_key": OPENAI_KEY}
+    first = client.post("/api/summarize", json=payload).json()
+    # 同一影片的其他網址形式也視為相同請求
+    second = client.post("/api/summarize", json={**payload, "url": "https://youtu.be/dQw4w9WgXcQ?t=30"}).json()
+
+    assert "task_id" in first
+    assert second == {"task_id": first["task_id"], "message": "existing task"}
+
+    # 任務結束後釋放，再次提交建立新任務
+    task_manager.update_task_status(first["task_id"], "complete", result={"summary": "ok"})
+    third = client.post("/api/summarize", json=payload).json()
+    assert third["task_id"] != first["task_id"]
+    assert "message" not in third
+
+
+def test_task_status_revalidates_with_etag(client):
+    task = task_manager.create_task("etag-task", "https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+
+    first = client.get(f"/api/tasks/{task.id}")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.json()["id"] == task.id
+
+    unchanged = client.get(f"/api/tasks/{task.id}", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["etag"] == etag
+    assert unchanged.content == b""
+
+    task_manager.update_task_progress(task.id, "transcribing", 40, "轉錄中")
+    changed = client.get(f"/api/tasks/{task.id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["progress"]["percentage"] == 40
+
+
+def test_unknown_task_status_is_404(client):
+    assert client.get("/api/tasks/missing").status_code == 404
+
+
+def test_websocket_pushes_updates_until_terminal(client):
+    task = task_manager.create_task("ws-task", "https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+
+    with client.websocket_connect(f"/ws/tasks/{task.id}") as ws:
+        assert ws.receive_json()["status"] == "pending"
+
+        task_manager.update_task_progress(task.id, "downloading", 10, "下載中")
+        pushed = ws.receive_json()
+        assert pushed["progress"]["stage"] == "downloading"
+
+        task_manager.update_task_status(task.id, "complete", result={"summary": "ok"})
+        final = ws.receive_json()
+        assert final["status"] == "complete"
+        assert final["result"] == {"summary": "ok"}
+
+        # 終止狀態後伺服器主動關閉連線
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            ws.receive_json()
+        assert exc_info.value.code == 1000
+
+    assert task.id not in task_manager._subscribers
+
+
+def test_websocket_rejects_unknown_task(client):
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect("/ws/tasks/missing"):
+            pass
+    assert exc_info.value.code == 4404
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+"""
+安全驗證模組測試
+"""
+
+import pytest
+
+from security import CookiesContentParser, SecurityValidator
+
+
+@pytest.mark.parametrize("url", [["https://youtu.be/dQw4w9WgXcQ"], {"url": "x"}, 123])
+def test_non_string_url_is_rejected(url):
+    result = SecurityValidator.validate_youtube_url(url)
+
+    assert result == {"valid": False, "error": "URL 必須是字串"}
+
+
+@pytest.mark.parametrize("url", [None, [], ""])
+def test_empty_url_is_rejected(url):
+    result = SecurityValidator.validate_youtube_url(url)
+
+    assert result == {"valid": False, "error": "URL 不能為空"}
+
+
+def test_valid_url_is_accepted():
+    result = SecurityValidator.validate_youtube_url("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+
+    assert result["valid"] is True
+    assert result["normalized_url"] == "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+def test_cookies_parser_handles_multibyte_character_split_across_chunks():
+    content = (
+        "# Netscape HTTP Cookie File 測試\n"
+        ".youtube.com\tTRUE\t/\tTRUE\t0\tYSC\t值\n"
+        ".youtube.com\tTRUE\t/\tTRUE\t0\tVISITOR_INFO1_LIVE\tabc"
+    ).encode("utf-8")
+    split = content.index("值".encode("utf-8")) + 1  # 切在「值」的 UTF-8 位元組中間
+
+    parser = CookiesContentParser()
+    text = "".join(parser.feed(chunk) for chunk in (content[:split], content[split:split + 1],
+                                                    content[split + 1:]))
+    result = parser.finalize()
+
+    assert text == content.decode("utf-8")
+    assert result["valid"] is True
+    assert result["entries_count"] == 2
+    assert result["has_required_cookies"] is True
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://youtube.com/watch?v=dQw4w9WgXcQ&t=42s",
+    "https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ",
+    "https://youtu.be/dQw4w9WgXcQ?si=abcdef",
+    "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+    "https://www.youtube.com/embed/dQw4w9WgXcQ",
+])
+def test_canonical_video_key_ignores_url_form(url):
+    assert SecurityValidator.canonical_video_key(url) == "yt:dQw4w9WgXcQ"
+
+
+def test_canonical_video_key_falls_back_to_normalized_url():
+    assert SecurityValidator.canonical_video_key(" https://www.YouTube.com/channel/X ") == \
+        "https://www.youtube.com/channel/x"
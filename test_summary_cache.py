@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+"""
+摘要結果快取測試
+"""
+
+import os
+import time
+
+from summary_cache import SummaryCache
+
+
+def test_entry_expires_after_ttl(tmp_path):
+    cache = SummaryCache(str(tmp_path), ttl=60)
+    key = SummaryCache.make_key("yt:dQw4w9WgXcQ", model_type="auto")
+    result = {"status": "success", "summary": "摘要"}
+    cache.set(key, result)
+
+    assert cache.get(key) == result
+
+    # 將檔案修改時間調到 TTL 之前，模擬已過期的快取
+    path = os.path.join(str(tmp_path), f"{key}.json")
+    expired = time.time() - 61
+    os.utime(path, (expired, expired))
+
+    assert cache.get(key) is None
+    assert not os.path.exists(path)
+
+
+def test_zero_ttl_disables_cache(tmp_path):
+    cache = SummaryCache(str(tmp_path), ttl=0)
+    key = SummaryCache.make_key("yt:dQw4w9WgXcQ")
+    cache.set(key, {"status": "success"})
+
+    assert cache.get(key) is None
+    assert os.listdir(str(tmp_path)) == []
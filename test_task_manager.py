@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+"""
+任務管理器測試
+"""
+
+import asyncio
+import random
+from collections import Counter
+from datetime import timedelta
+
+import orjson
+import pytest
+
+from config import AppConfig
+from task_manager import TaskManager
+
+
+@pytest.fixture
+def make_manager(monkeypatch):
+    """建立測試用的 TaskManager，測試結束時關閉"""
+    # 清理線程在每次清理後休眠，縮短間隔讓關閉時不必等待
+    monkeypatch.setattr(AppConfig, "TASK_CLEANUP_INTERVAL", 0.05)
+    managers = []
+
+    def factory() -> TaskManager:
+        manager = TaskManager()
+        managers.append(manager)
+        return manager
+
+    yield factory
+    for manager in managers:
+        manager.shutdown()
+
+
+@pytest.fixture
+def shared_store(monkeypatch, make_manager):
+    """讓新建立的 TaskManager 共用同一個記憶體中的 Redis，模擬多個 worker"""
+    fakeredis = pytest.importorskip("fakeredis")
+    import redis
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(AppConfig, "REDIS_URL", "redis://test")
+    monkeypatch.setattr(redis.Redis, "from_url",
+                        staticmethod(lambda url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs)))
+    monkeypatch.setattr(AppConfig, "REMOTE_CANCEL_CHECK_INTERVAL", 0)
+    return make_manager
+
+
+def test_store_init_failure_falls_back_to_local(monkeypatch, make_manager):
+    import redis
+
+    def refuse(url, **kwargs):
+        raise redis.ConnectionError("connection refused")
+
+    monkeypatch.setattr(AppConfig, "REDIS_URL", "redis://test")
+    monkeypatch.setattr(redis.Redis, "from_url", staticmethod(refuse))
+
+    manager = make_manager()
+    manager.create_task("t1", "https://youtu.be/dQw4w9WgXcQ")
+
+    assert manager.store is None
+    assert manager.get_task("t1").status == "pending"
+
+
+def test_unreachable_store_keeps_local_tasks_working(monkeypatch, make_manager):
+    import redis
+
+    class UnreachableRedis:
+        """所有命令都因連線失敗而拋出異常"""
+
+        def __getattr__(self, name):
+            def command(*args, **kwargs):
+                raise redis.ConnectionError("connection refused")
+            return command
+
+    monkeypatch.setattr(AppConfig, "REDIS_URL", "redis://test")
+    monkeypatch.setattr(AppConfig, "REMOTE_CANCEL_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(redis.Redis, "from_url", staticmethod(lambda url, **kwargs: UnreachableRedis()))
+
+    manager = make_manager()
+    assert manager.store is not None
+    manager.create_task("t1", "https://youtu.be/dQw4w9WgXcQ")
+    manager.update_task_status("t1", "processing")
+    manager.update_task_progress("t1", "下載", 30, "下載中")
+
+    assert manager.is_task_cancelled("t1") is False
+    assert manager.get_task("t1").progress["percentage"] == 30
+    assert manager.get_task("missing") is None
+    assert manager.cancel_task("t1")
+    assert manager.get_task("t1").status == "cancelled"
+
+
+def test_shutdown_saves_final_state_after_stopping_writer(tmp_path, make_manager):
+    path = str(tmp_path / "tasks.json")
+    manager = make_manager()
+    # 寫入間隔遠大於測試時間，檔案只會由關閉流程寫入
+    manager.enable_autosave(path, interval=60)
+    manager.create_task("t1", "https://youtu.be/dQw4w9WgXcQ")
+    manager.update_task_status("t1", "complete", result={"summary": "摘要"})
+
+    manager.shutdown()
+
+    assert not manager.writer._thread.is_alive()
+    with open(path, "rb") as f:
+        tasks = orjson.loads(f.read())
+    assert [(t["id"], t["status"]) for t in tasks] == [("t1", "complete")]
+
+
+def test_remote_cancel_publishes_and_notifies_once(shared_store):
+    worker, other = shared_store(), shared_store()
+    finished = []
+    worker.add_terminal_listener(finished.append)
+    worker.create_task("t1", "https://youtu.be/dQw4w9WgXcQ")
+    worker.update_task_status("t1", "processing")
+    cancel_event = worker.get_cancel_event("t1")
+
+    async def scenario():
+        queue = worker.subscribe("t1")
+        assert other.cancel_task("t1")
+        assert worker.is_task_cancelled("t1")
+        assert worker.is_task_cancelled("t1")
+        await asyncio.sleep(0)
+        messages = []
+        while not queue.empty():
+            messages.append(queue.get_nowait())
+        return messages
+
+    messages = asyncio.run(scenario())
+
+    assert [m["status"] for m in messages] == ["cancelled"]
+    assert [task.id for task in finished] == ["t1"]
+    assert cancel_event.is_set()
+    assert worker.get_task_stats()["cancelled"] == 1
+
+
+def test_count_eviction_drops_least_recently_used_finished_task(monkeypatch, make_manager):
+    monkeypatch.setattr(AppConfig, "MAX_TASKS", 3)
+    manager = make_manager()
+    for task_id in ("running", "old", "recent"):
+        manager.create_task(task_id, "https://youtu.be/dQw4w9WgXcQ")
+    manager.update_task_status("running", "processing")
+    manager.update_task_status("old", "complete", result={"summary": "a"})
+    manager.update_task_status("recent", "complete", result={"summary": "b"})
+    # 讀取會將任務移到最近使用的位置
+    manager.get_task("old")
+
+    manager.create_task("new", "https://youtu.be/dQw4w9WgXcQ")
+
+    assert list(manager.tasks) == ["running", "old", "new"]
+
+    # 其餘都在執行時不淘汰，暫時超過上限
+    manager.update_task_status("new", "processing")
+    manager.create_task("newer", "https://youtu.be/dQw4w9WgXcQ")
+    manager.create_task("newest", "https://youtu.be/dQw4w9WgXcQ")
+    assert list(manager.tasks) == ["running", "new", "newer", "newest"]
+
+
+def test_byte_eviction_keeps_the_task_just_written(monkeypatch, make_manager):
+    monkeypatch.setattr(AppConfig, "MAX_TASK_CACHE_BYTES", 2500)
+    manager = make_manager()
+    for task_id in ("a", "b", "c"):
+        manager.create_task(task_id, "https://youtu.be/dQw4w9WgXcQ")
+        manager.update_task_status(task_id, "complete", result={"summary": "x" * 1000})
+
+    # 第三份結果超過上限，淘汰最舊的 a
+    assert list(manager.tasks) == ["b", "c"]
+    assert manager._result_bytes == sum(manager._result_sizes.values())
+
+    # 單份結果就超過上限時，剛寫入的任務仍保留
+    manager.create_task("big", "https://youtu.be/dQw4w9WgXcQ")
+    manager.update_task_status("big", "complete", result={"summary": "x" * 5000})
+    assert list(manager.tasks) == ["big"]
+    assert manager._result_bytes == manager._result_sizes["big"]
+
+
+def test_status_counts_match_a_full_scan(monkeypatch, make_manager):
+    """隨機的建立、狀態轉換、取消、淘汰與清理後，增量計數與掃描所有任務的結果一致"""
+    monkeypatch.setattr(AppConfig, "MAX_TASKS", 20)
+    manager = make_manager()
+    rng = random.Random(0)
+    statuses = ["pending", "processing", "complete", "error", "cancelled"]
+
+    def scanned():
+        counts = Counter(task.status for task in manager.tasks.values())
+        return {"total": len(manager.tasks), **{status: counts[status] for status in statuses}}
+
+    for i in range(500):
+        action = rng.random()
+        task_ids = list(manager.tasks)
+        if action < 0.3 or not task_ids:
+            manager.create_task(f"t{i}", "https://youtu.be/dQw4w9WgXcQ")
+        elif action < 0.7:
+            manager.update_task_status(rng.choice(task_ids), rng.choice(statuses))
+        elif action < 0.85:
+            manager.cancel_task(rng.choice(task_ids))
+        elif action < 0.95:
+            task_id = rng.choice(task_ids)
+            manager.update_task_status(task_id, "complete", result={"summary": "x" * rng.randint(1, 100)})
+        else:
+            # 讓部分已結束的任務過期並清理
+            for task in manager.tasks.values():
+                if rng.random() < 0.3:
+                    task.updated_at -= timedelta(seconds=AppConfig.MAX_TASK_AGE + 1)
+            manager.cleanup_old_tasks()
+
+        assert manager.get_task_stats() == scanned(), i
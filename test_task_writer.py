@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+"""
+任務檔案寫入器測試
+"""
+
+import os
+import threading
+import time
+
+import orjson
+
+from task_writer import TaskFileWriter
+
+
+class RecordingSnapshot:
+    """記錄快照被取用的次數，可在取用時暫停以模擬進行中的寫入"""
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+        self.tasks = [{"id": "t1", "status": "pending"}]
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return list(self.tasks)
+
+
+def read_tasks(path):
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+
+def test_changes_within_interval_are_written_once(tmp_path):
+    path = str(tmp_path / "tasks.json")
+    snapshot = RecordingSnapshot()
+    writer = TaskFileWriter(path, snapshot, interval=0.2)
+    writer.start()
+
+    for _ in range(5):
+        writer.mark_dirty()
+    time.sleep(0.5)
+    writer.stop()
+
+    assert snapshot.calls == 1
+    assert read_tasks(path) == snapshot.tasks
+    assert os.listdir(str(tmp_path)) == ["tasks.json"]  # 沒有殘留的暫存檔
+
+
+def test_stop_during_interval_skips_pending_write(tmp_path):
+    path = str(tmp_path / "tasks.json")
+    snapshot = RecordingSnapshot()
+    writer = TaskFileWriter(path, snapshot, interval=0.3)
+    writer.start()
+
+    writer.mark_dirty()
+    time.sleep(0.05)
+    writer.stop()
+
+    assert snapshot.calls == 0
+    assert not os.path.exists(path)
+
+
+def test_stop_waits_for_write_in_progress(tmp_path):
+    path = str(tmp_path / "tasks.json")
+    snapshot = RecordingSnapshot(delay=0.3)
+    writer = TaskFileWriter(path, snapshot, interval=0.01)
+    writer.start()
+
+    writer.mark_dirty()
+    time.sleep(0.1)  # 寫入線程正在取用快照
+    writer.stop()
+
+    # stop 返回時寫入已完成，之後的最後一次保存不會被舊快照覆蓋
+    assert snapshot.calls == 1
+    assert read_tasks(path) == snapshot.tasks
+    snapshot.tasks = [{"id": "t1", "status": "complete"}]
+    writer.flush()
+    writer.mark_dirty()
+    time.sleep(0.1)
+    assert read_tasks(path) == snapshot.tasks
+    assert snapshot.calls == 2
+
+
+def test_concurrent_flushes_leave_a_complete_file(tmp_path):
+    path = str(tmp_path / "tasks.json")
+    snapshot = RecordingSnapshot()
+    snapshot.tasks = [{"id": f"t{i}", "status": "complete"} for i in range(200)]
+    writer = TaskFileWriter(path, snapshot)
+
+    threads = [threading.Thread(target=writer.flush) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert read_tasks(path) == snapshot.tasks
+    assert os.listdir(str(tmp_path)) == ["tasks.json"]
@@ -8,6 +8,7 @@ import logging
 from typing import Dict, Any, Optional
 # import psutil  # 暫時註釋以進行測試
 import time
+import threading
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -136,6 +137,8 @@ class MetricsCollector:
     """指標收集器"""
     
     def __init__(self):
+        # 背景處理線程與請求處理可能同時更新指標
+        self.lock = threading.Lock()
         self.metrics = {
             "requests_total": 0,
             "requests_success": 0,
@@ -146,29 +149,32 @@ class MetricsCollector:
     
     def record_request(self, success: bool, processing_time: float = 0.0):
         """記錄請求指標"""
-        self.metrics["requests_total"] += 1
-        if success:
-            self.metrics["requests_success"] += 1
-        else:
-            self.metrics["requests_error"] += 1
-        self.metrics["processing_time_total"] += processing_time
+        with self.lock:
+            self.metrics["requests_total"] += 1
+            if success:
+                self.metrics["requests_success"] += 1
+            else:
+                self.metrics["requests_error"] += 1
+            self.metrics["processing_time_total"] += processing_time
     
     def get_metrics(self) -> Dict[str, Any]:
         """獲取指標"""
-        uptime = time.time() - self.metrics["start_time"]
+        with self.lock:
+            metrics = dict(self.metrics)
+        uptime = time.time() - metrics["start_time"]
         
         return {
             "uptime_seconds": uptime,
-            "requests_total": self.metrics["requests_total"],
-            "requests_success": self.metrics["requests_success"],
-            "requests_error": self.metrics["requests_error"],
+            "requests_total": metrics["requests_total"],
+            "requests_success": metrics["requests_success"],
+            "requests_error": metrics["requests_error"],
             "success_rate": (
-                self.metrics["requests_success"] / self.metrics["requests_total"]
-                if self.metrics["requests_total"] > 0 else 0.0
+                metrics["requests_success"] / metrics["requests_total"]
+                if metrics["requests_total"] > 0 else 0.0
             ),
             "average_processing_time": (
-                self.metrics["processing_time_total"] / self.metrics["requests_success"]
-                if self.metrics["requests_success"] > 0 else 0.0
+                metrics["processing_time_total"] / metrics["requests_success"]
+                if metrics["requests_success"] > 0 else 0.0
             )
         }
 
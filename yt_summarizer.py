@@ -6,7 +6,10 @@ import time
 import subprocess
 import json
 from datetime import datetime
-from typing import Dict, Any, Optional, Callable
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Any, Optional, Callable
 import yt_dlp
 
 # 導入 Google Generative AI 模組
@@ -30,6 +33,82 @@ logging.basicConfig(
 load_dotenv()
 
 
+class TaskCancelledError(Exception):
+    """任務在處理途中被取消"""
+
+    def __init__(self, message: str = "任務已被取消"):
+        super().__init__(message)
+
+
+class _GeminiKeyGate:
+    """
+    genai.configure 是進程全域設定，無法按請求傳入金鑰。
+    使用相同金鑰的請求可並行；需要換金鑰時，等待使用舊金鑰的請求結束後再重新配置。
+    請求按到達順序進入：排在前面的請求等待換金鑰時，之後到達的請求即使金鑰相同也不會插隊，
+    因此不會因其他金鑰持續有請求而一直等待。
+    """
+
+    # 等待期間檢查取消事件與期限的間隔（秒）
+    POLL_INTERVAL = 0.5
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._key: Optional[str] = None
+        self._active = 0
+        # 等待進入的請求，按到達順序排列
+        self._waiters: Deque[object] = deque()
+
+    @contextmanager
+    def using(self, api_key: str, cancel_event: Optional[threading.Event] = None,
+              deadline: Optional[float] = None):
+        """
+        以指定金鑰使用 Gemini；等待期間取消或超過 deadline（time.monotonic 時間）時拋出 TaskCancelledError
+        """
+        ticket = object()
+        with self._cond:
+            self._waiters.append(ticket)
+            try:
+                while self._waiters[0] is not ticket or (self._active and self._key != api_key):
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise TaskCancelledError()
+                    timeout = self.POLL_INTERVAL
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise TaskCancelledError("等待 Gemini 金鑰配置已超過處理時間上限")
+                        timeout = min(timeout, remaining)
+                    self._cond.wait(timeout)
+            except BaseException:
+                self._waiters.remove(ticket)
+                self._cond.notify_all()
+                raise
+            self._waiters.popleft()
+            if self._key != api_key:
+                genai.configure(api_key=api_key)
+                self._key = api_key
+            self._active += 1
+            # 下一個請求可能使用相同金鑰，可以直接進入
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                if not self._active:
+                    self._cond.notify_all()
+
+
+_gemini_gate = _GeminiKeyGate()
+
+
+class SummaryProcessError(Exception):
+    """摘要流程以錯誤結果結束（下載、轉錄或摘要階段失敗），result 為 run_summary_process 返回的錯誤結果"""
+
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__(result.get('message') or "摘要處理失敗")
+        self.result = result
+
+
 class YouTubeSummarizer:
     # 定義模型名稱常數
     WHISPER_MODEL = "gpt-4o-transcribe"
@@ -49,7 +128,9 @@ class YouTubeSummarizer:
                  model_preference: str = 'auto',
                  gemini_model: str = 'gemini-3-flash-preview',
                  openai_model: str = 'gpt-4o',
-                 whisper_model: str = 'gpt-4o-transcribe'):
+                 whisper_model: str = 'gpt-4o-transcribe',
+                 cancel_event: Optional[threading.Event] = None,
+                 deadline: Optional[float] = None):
         """
         初始化 YouTube 摘要器
         
@@ -63,6 +144,8 @@ class YouTubeSummarizer:
             gemini_model (str): 使用的 Gemini 模型名稱
             openai_model (str): 使用的 OpenAI 模型名稱
             whisper_model (str): 使用的 Whisper 模型名稱
+            cancel_event (Optional[threading.Event]): 設置後在下一個檢查點中止處理
+            deadline (Optional[float]): 處理期限（time.monotonic 時間），等待 Gemini 金鑰配置時不會超過此期限
         """
         self.api_keys = api_keys or {}
         if 'openai' not in self.api_keys:
@@ -76,6 +159,8 @@ class YouTubeSummarizer:
         self.gemini_model = gemini_model
         self.openai_model = openai_model
         self.whisper_model = whisper_model
+        self.cancel_event = cancel_event
+        self.deadline = deadline
         self.cookie_file_path = cookie_file_path
         if self.cookie_file_path and not os.path.exists(self.cookie_file_path):
             logging.warning(f"提供的 Cookie 檔案路徑不存在: {self.cookie_file_path}")
@@ -102,17 +187,9 @@ class YouTubeSummarizer:
             self.openai_client = OpenAI(api_key=self.api_keys['openai'])
         else:
             self.openai_client = None # Ensure client is None if key is missing
-        if self.api_keys.get('gemini') and genai:
-            try:
-                if not getattr(genai, '_configured', False):
-                    genai.configure(api_key=self.api_keys['gemini'])
-                    setattr(genai, '_configured', True)  # Mark as configured
-                    logging.info("Google Generative AI 已配置 API 金鑰")
-                else:
-                    logging.info("Google Generative AI 已配置，跳過重複配置")
-            except Exception as e:
-                logging.error(f"配置 Google Generative AI 時出錯: {e}")
-                self.api_keys['gemini'] = None  # Mark Gemini as unavailable
+        if self.api_keys.get('gemini') and not genai:
+            logging.warning("未安裝 google.generativeai，無法使用 Gemini 模型")
+            self.api_keys['gemini'] = None  # Mark Gemini as unavailable
         # Check ffmpeg/ffprobe availability
         try:
             subprocess.run([self.ffmpeg_path, '-version'], 
@@ -181,8 +258,15 @@ class YouTubeSummarizer:
         except IOError as e:
             logging.error(f"儲存 metadata 失敗 ({file_path}): {e}")
 
+    def check_cancelled(self):
+        """任務已取消時拋出 TaskCancelledError"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise TaskCancelledError()
+
     def download_progress_hook(self, d):
         """下載進度回調"""
+        # yt-dlp 在下載每個區塊後調用此回調，拋出例外即可中止下載
+        self.check_cancelled()
         if d['status'] == 'downloading':
             if not self.pbar:
                 try:
@@ -420,6 +504,7 @@ class YouTubeSummarizer:
             }
         
         except Exception as e:
+            self.check_cancelled()
             logging.error(f"下載影片時發生錯誤: {str(e)}")
             self.progress_callback("下載", 100, f"下載失敗: {str(e)}")
             return {
@@ -491,6 +576,7 @@ class YouTubeSummarizer:
                 
                 # 處理多個音訊段
                 for idx, segment_path in enumerate(segments):
+                    self.check_cancelled()
                     segment_start_percent = 25 + (idx / len(segments)) * 55
                     self.progress_callback("轉錄", int(segment_start_percent), 
                                           f"轉錄第 {idx+1}/{len(segments)} 段音訊...")
@@ -734,9 +820,7 @@ class YouTubeSummarizer:
                         logging.info(f"使用 Google Gemini 模型 ({self.gemini_model})...")
                         self.progress_callback("摘要", 18, f"使用 Google Gemini 模型 ({self.gemini_model})...")
                         
-                        # 設置模型
                         self.progress_callback("摘要", 20, "初始化 Gemini 模型...")
-                        genai_model = genai.GenerativeModel(self.gemini_model)
                         
                         # 構建生成配置
                         self.progress_callback("摘要", 22, "設置 Gemini 生成參數...")
@@ -750,11 +834,13 @@ class YouTubeSummarizer:
                         self.progress_callback("摘要", 25, "準備向 Gemini 發送請求...")
                         self.progress_callback("摘要", 30, "向 Gemini 發送請求...")
                         
-                        # 發送請求
-                        response = genai_model.generate_content(
-                            prompt,
-                            generation_config=generation_config
-                        )
+                        # 以本請求的金鑰建立模型並發送請求，避免沿用其他請求配置的金鑰
+                        with _gemini_gate.using(self.api_keys['gemini'], self.cancel_event, self.deadline):
+                            genai_model = genai.GenerativeModel(self.gemini_model)
+                            response = genai_model.generate_content(
+                                prompt,
+                                generation_config=generation_config
+                            )
                         
                         self.progress_callback("摘要", 50, "Gemini 已回應，開始處理回應...")
                         self.progress_callback("摘要", 60, "處理 Gemini 回應中...")
@@ -766,6 +852,9 @@ class YouTubeSummarizer:
                         
                         self.progress_callback("摘要", 80, "Gemini 摘要生成成功!")
                         
+                    except TaskCancelledError:
+                        # 等待金鑰配置期間取消或超過期限，不再改用 OpenAI
+                        raise
                     except Exception as e:
                         logging.warning(f"使用 Gemini 生成摘要失敗: {e}")
                         self.progress_callback("摘要", 22, f"Gemini 模型失敗: {str(e)}")
@@ -890,6 +979,8 @@ class YouTubeSummarizer:
                 "model_used": model_used
             }
             
+        except TaskCancelledError:
+            raise
         except Exception as e:
             error_msg = f"生成摘要時發生錯誤: {str(e)}"
             logging.error(error_msg)
@@ -946,7 +1037,9 @@ def run_summary_process(url: str, keep_audio: bool = False,
                         model_type: str = 'auto',
                         gemini_model: str = 'gemini-3-flash-preview',
                         openai_model: str = 'gpt-4o',
-                        whisper_model: str = 'gpt-4o-transcribe') -> Dict[str, Any]:
+                        whisper_model: str = 'gpt-4o-transcribe',
+                        cancel_event: Optional[threading.Event] = None,
+                        deadline: Optional[float] = None) -> Dict[str, Any]:
     """
     執行完整的摘要處理流程
     
@@ -961,6 +1054,8 @@ def run_summary_process(url: str, keep_audio: bool = False,
         gemini_model (str): 使用的 Gemini 模型名稱
         openai_model (str): 使用的 OpenAI 模型名稱
         whisper_model (str): 使用的 Whisper 模型名稱
+        cancel_event (Optional[threading.Event]): 設置後在下一個檢查點拋出 TaskCancelledError
+        deadline (Optional[float]): 處理期限（time.monotonic 時間），用於限制等待 Gemini 金鑰配置的時間
     返回:
         Dict: 包含處理結果的字典
     """
@@ -993,11 +1088,14 @@ def run_summary_process(url: str, keep_audio: bool = False,
             model_preference=model_type,
             gemini_model=gemini_model,
             openai_model=openai_model,
-            whisper_model=whisper_model
+            whisper_model=whisper_model,
+            cancel_event=cancel_event,
+            deadline=deadline
         )
         
         # 下載影片並提取音訊
         download_result = summarizer.download_video(url)
+        summarizer.check_cancelled()
         
         if download_result.get('status') == 'error':
             logging.error(f"下載階段失敗: {download_result.get('message')}")
@@ -1018,6 +1116,7 @@ def run_summary_process(url: str, keep_audio: bool = False,
 
         # 轉錄音訊
         transcribe_result = summarizer.transcribe_audio(audio_path)
+        summarizer.check_cancelled()
         
         if transcribe_result.get('status') == 'error':
             logging.error(f"轉錄階段失敗: {transcribe_result.get('message')}")
@@ -1035,6 +1134,7 @@ def run_summary_process(url: str, keep_audio: bool = False,
         
         # 生成摘要
         summary_result = summarizer.generate_summary(transcript, video_title)
+        summarizer.check_cancelled()
         
         if summary_result.get('status') == 'error':
             logging.error(f"摘要階段失敗: {summary_result.get('message')}")
@@ -1063,7 +1163,13 @@ def run_summary_process(url: str, keep_audio: bool = False,
             'status': 'success'
         }
 
+    except TaskCancelledError:
+        logging.info(f"處理 URL {url} 的任務已取消")
+        raise
     except Exception as e:
+        # 取消可能以其他例外的形式中斷處理（例如 yt-dlp 包裝的下載錯誤）
+        if cancel_event is not None and cancel_event.is_set():
+            raise TaskCancelledError() from e
         logging.critical(f"處理 URL {url} 時發生未預期錯誤: {e}", exc_info=True)
         
         # 計算總處理時間（即使失敗）